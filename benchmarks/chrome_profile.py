@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Memory and wall-clock cost of a search with the default and the lean Chrome profile
+
+Starts the scraper's headless Chrome once per profile (with the ChromeDriver of
+modules/chromedriver.py) and loads the results page of every query. Reports
+the browser start time, the p50/max time to load a results page
+(driver.get until document.readyState is 'complete') and the peak memory of
+the browser's process tree. Memory is the sum of the PSS of chromedriver and
+all Chrome processes (RSS where PSS is not available), read from /proc, so it
+is only measured on Linux.
+
+--local serves a gallery page of large generated JPEGs and a web font from a
+local server instead of Google, for repeatable numbers without network access.
+
+Usage:
+    python3 benchmarks/chrome_profile.py --local
+    python3 benchmarks/chrome_profile.py --queries "electric car" "heat pump" --json chrome.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from urllib.parse import quote_plus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from modules.chromedriver import resolve_chromedriver, chrome_arguments, block_requests
+
+GOOGLE_IMAGES_URL = 'https://www.google.com/search?q={query}&tbm=isch'
+DEFAULT_QUERIES = ['electric vehicle charging', 'solar roof', 'lithium battery', 'wind turbine', 'heat pump']
+
+
+def process_tree(root_pid):
+    """PIDs of root_pid and all its descendants (Linux)"""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                # The command name may contain spaces; the parent PID follows its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    pids, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+
+def process_memory_kb(pid):
+    """PSS of a process in KB, or its RSS if smaps_rollup is not available"""
+    for path, field in ((f"/proc/{pid}/smaps_rollup", 'Pss:'), (f"/proc/{pid}/status", 'VmRSS:')):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def browser_memory_mb(driver):
+    if not sys.platform.startswith('linux'):
+        return None
+    return sum(process_memory_kb(pid) for pid in process_tree(driver.service.process.pid)) / 1024
+
+
+def start_gallery(images):
+    """Local page with `images` large JPEGs and a web font, served by FakeImageHost"""
+    from fake_services import FakeImageHost
+
+    class GalleryHost(FakeImageHost):
+        def handle(self, method, path, query, body, headers):
+            if path == '/gallery':
+                tiles = ''.join(f'<img src="{self.url}/images/{index}.jpg" width="200">' for index in range(self.pool_size))
+                page = (f"<html><head><style>@font-face {{font-family: f; src: url({self.url}/font.woff2)}}"
+                        f"body {{font-family: f}}</style></head><body><p>{query.get('q', [''])[0]}</p>{tiles}</body></html>")
+                return 200, {'Content-Type': 'text/html', 'Cache-Control': 'max-age=3600'}, page.encode('utf-8')
+            if path == '/font.woff2':
+                return 200, {'Content-Type': 'font/woff2'}, os.urandom(64 * 1024)
+            return super().handle(method, path, query, body, headers)
+
+    host = GalleryHost(images_per_query=images, size=(1600, 1067), pool_size=images)
+    host.start()
+    return host, host.url + '/gallery?q={query}'
+
+
+def measure_profile(lean, driver_path, url_template, queries):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    options = Options()
+    for argument in chrome_arguments(headless=True, lean=lean):
+        options.add_argument(argument)
+    start = time.perf_counter()
+    driver = webdriver.Chrome(service=Service(driver_path), options=options)
+    try:
+        if lean:
+            block_requests(driver)
+        else:
+            driver.set_window_size(1400, 1050)
+        startup = time.perf_counter() - start
+
+        loads, memory = [], []
+        for query in queries:
+            start = time.perf_counter()
+            driver.get(url_template.format(query=quote_plus(query)))
+            while driver.execute_script('return document.readyState') != 'complete':
+                time.sleep(0.01)
+            loads.append(time.perf_counter() - start)
+            memory.append(browser_memory_mb(driver))
+    finally:
+        driver.quit()
+
+    measured = [value for value in memory if value is not None]
+    return {
+        'startup_seconds': round(startup, 3),
+        'load_p50_seconds': round(statistics.median(loads), 3),
+        'load_max_seconds': round(max(loads), 3),
+        'peak_memory_mb': round(max(measured), 1) if measured else None,
+        'loads': len(loads),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', nargs='+', default=DEFAULT_QUERIES, help='Searches to run with each profile')
+    parser.add_argument('--rounds', type=int, default=2, help='Times each query is loaded (later rounds hit the cache)')
+    parser.add_argument('--local', action='store_true', help='Load a local image gallery instead of Google')
+    parser.add_argument('--images', type=int, default=40, help='Images on the local gallery page')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    driver_path = resolve_chromedriver()
+    if not driver_path:
+        sys.exit("No ChromeDriver available; install Chrome and allow CHROMEDRIVER_DOWNLOAD")
+
+    host = None
+    url_template = GOOGLE_IMAGES_URL
+    if args.local:
+        host, url_template = start_gallery(args.images)
+    try:
+        queries = args.queries * args.rounds
+        results = {name: measure_profile(name == 'lean', driver_path, url_template, queries)
+                   for name in ('default', 'lean')}
+    finally:
+        if host:
+            host.stop()
+
+    print(f"{'profile':<10}{'startup s':>11}{'load p50 s':>12}{'load max s':>12}{'peak MB':>10}")
+    for name, result in results.items():
+        peak = f"{result['peak_memory_mb']:.0f}" if result['peak_memory_mb'] is not None else 'n/a'
+        print(f"{name:<10}{result['startup_seconds']:>11.2f}{result['load_p50_seconds']:>12.2f}"
+              f"{result['load_max_seconds']:>12.2f}{peak:>10}")
+    default, lean = results['default'], results['lean']
+    if default['peak_memory_mb'] and lean['peak_memory_mb']:
+        print(f"Lean profile: {default['peak_memory_mb'] - lean['peak_memory_mb']:.0f} MB less memory, "
+              f"{(default['load_p50_seconds'] - lean['load_p50_seconds']) * 1000:.0f} ms faster per search (p50)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results, 'options': vars(args)}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end pipeline benchmark
+
+Runs run_blog_automation for N posts against local stand-ins for Google Sheets,
+the image search, Ollama and WordPress (see fake_services.py), so throughput
+changes can be measured without network access. Reports posts per minute,
+p50/p95 latency of every stage and the peak RSS of the process.
+
+The LLM is usually the bottleneck: with the defaults each article takes about
+4 seconds (0.5s latency + ~1400 tokens at 400 tokens/s). Use --llm-latency 0
+--tokens-per-sec 0 to take generation out of the picture and measure the rest
+of the pipeline.
+
+Usage:
+    python3 benchmarks/e2e_pipeline.py --posts 20
+    python3 benchmarks/e2e_pipeline.py --posts 50 --llm-latency 0 --tokens-per-sec 0 --json e2e.json
+    python3 benchmarks/e2e_pipeline.py --posts 50 --async --post-concurrency 16
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_services import FakeOllama, FakeWordPress, FakeSheet, FakeImageHost
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def configure(args, urls, work_dir):
+    """Point the configuration at the fake services; must run before the pipeline modules are imported"""
+    from config import config
+    config.GOOGLE_SHEETS_CSV_URL = urls['sheet'] + '/spreadsheets/d/{spreadsheet_id}/export?format=csv'
+    config.IMAGE_SEARCH_URL = urls['images'] + '/search'
+    config.IMAGE_SEARCH_BACKENDS = ['http']
+    config.OLLAMA_URL = urls['ollama']
+    config.IMAGE_DOWNLOAD_PATH = os.path.join(work_dir, 'images')
+    config.TEMP_STORAGE_MODE = args.storage_mode
+    config.LOCAL_IMAGE_LIBRARY_MODE = 'off'
+    config.PUBLISHED_IMAGE_INDEX_PATH = None
+    config.PUBLISH_MODE = args.publish_mode
+    config.WORDPRESS_BATCH_PUBLISH = args.batch
+    config.ASYNC_PIPELINE = args.async_pipeline
+    config.ASYNC_POST_CONCURRENCY = args.post_concurrency
+    config.LOG_FILE = os.path.join(work_dir, 'logs', 'benchmark.log')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=10, help='Number of sheet rows to publish')
+    parser.add_argument('--words', type=int, default=1000, help='Article length requested from the LLM')
+    parser.add_argument('--images', type=int, default=3, help='Images per post')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Seconds before the fake LLM starts generating')
+    parser.add_argument('--tokens-per-sec', type=float, default=400.0, help='Fake LLM generation speed (0 = instant)')
+    parser.add_argument('--wp-latency', type=float, default=0.02, help='Seconds added to every WordPress request')
+    parser.add_argument('--image-latency', type=float, default=0.05, help='Seconds added to every image host request')
+    parser.add_argument('--image-size', default='1600x1067', help='Size of the served images, WIDTHxHEIGHT')
+    parser.add_argument('--storage-mode', default='disk', choices=['disk', 'tmpfs', 'memory'])
+    parser.add_argument('--publish-mode', default='direct', choices=['direct', 'draft'])
+    parser.add_argument('--batch', action='store_true', help='Create posts through the REST batch endpoint')
+    parser.add_argument('--async', dest='async_pipeline', action='store_true',
+                        help='Run the asyncio pipeline (needs httpx) instead of the threaded one')
+    parser.add_argument('--post-concurrency', type=int, default=8, help='Posts in progress at once with --async')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true', help='Show the pipeline log')
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.image_size.lower().split('x'))
+    services = {
+        'sheet': FakeSheet(num_posts=args.posts),
+        'images': FakeImageHost(images_per_query=args.images + 3, size=(width, height), latency=args.image_latency),
+        'ollama': FakeOllama(latency=args.llm_latency, tokens_per_sec=args.tokens_per_sec),
+        'wordpress': FakeWordPress(latency=args.wp_latency),
+    }
+    urls = {name: service.start() for name, service in services.items()}
+
+    work_dir = tempfile.mkdtemp(prefix='blog-e2e-')
+    try:
+        configure(args, urls, work_dir)
+        import web_interface
+        from modules import metrics
+        logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+        start = time.perf_counter()
+        web_interface.run_blog_automation(
+            'benchmark-sheet-0001', urls['wordpress'], 'benchmark', 'benchmark',
+            num_images=args.images, article_length=args.words
+        )
+        elapsed = time.perf_counter() - start
+        run = metrics.recent_runs[-1] if metrics.recent_runs else None
+    finally:
+        for service in services.values():
+            service.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    published = len(services['wordpress'].published())
+    results = {
+        'posts_requested': args.posts,
+        'posts_published': published,
+        'elapsed_seconds': round(elapsed, 3),
+        'posts_per_minute': round(published / elapsed * 60, 2) if elapsed else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'media_uploaded_mb': round(services['wordpress'].media_bytes / 1024 / 1024, 2),
+        'stages': {name: {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+                   for name, stats in (run.stage_stats() if run else {}).items()},
+        'options': vars(args),
+    }
+
+    print(f"Published {published}/{args.posts} posts in {elapsed:.2f}s "
+          f"({results['posts_per_minute']:.1f} posts/min), peak RSS {results['peak_rss_mb']:.0f} MB")
+    print(f"{'stage':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for name, stats in sorted(results['stages'].items(), key=lambda item: -item[1]['total']):
+        print(f"{name:<16}{stats['count']:>7}{stats['errors']:>8}{stats['p50'] * 1000:>10.1f}"
+              f"{stats['p95'] * 1000:>10.1f}{stats['total']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the external services of a run
+
+- FakeOllama: Ollama-compatible /api/generate with configurable latency and
+  generation speed (tokens per second)
+- FakeWordPress: WordPress REST stub for /media, /posts (create, update, slug
+  lookup), /categories, /tags and /batch/v1
+- FakeSheet: Google Sheets CSV export of generated rows
+- FakeImageHost: image search results page plus the generated JPEGs it links to
+
+Each service runs a ThreadingHTTPServer on 127.0.0.1 in a daemon thread;
+start() returns its base URL. Used by benchmarks/e2e_pipeline.py.
+"""
+
+import io
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("electric vehicle battery charging range motor inverter grid solar "
+         "lithium efficiency torque regenerative braking infrastructure fleet "
+         "kilowatt hour emissions policy incentive market adoption").split()
+
+
+class FakeService:
+    """Base class: serves handle(method, path, query, body) -> (status, headers, body bytes)"""
+
+    def __init__(self):
+        self.server = None
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                parsed = urlparse(self.path)
+                with service._lock:
+                    service.requests += 1
+                status, headers, payload = service.handle(method, parsed.path, parse_qs(parsed.query), body, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def handle(self, method, path, query, body, headers):
+        raise NotImplementedError
+
+
+def json_response(data, status=200, headers=None):
+    return status, dict({'Content-Type': 'application/json'}, **(headers or {})), json.dumps(data).encode('utf-8')
+
+
+def generate_markdown(title, word_count, rng):
+    """Markdown article of about word_count words in the shape the LLM returns"""
+    parts = [f"# {title}\n"]
+    written = 0
+    section = 0
+    while written < word_count:
+        section += 1
+        parts.append(f"## {' '.join(rng.choices(WORDS, k=4)).title()}\n")
+        for _ in range(3):
+            words = rng.choices(WORDS, k=60)
+            written += len(words)
+            parts.append(' '.join(words) + '\n')
+        parts.append('\n'.join(f"- **{rng.choice(WORDS)}**: {' '.join(rng.choices(WORDS, k=8))}" for _ in range(4)) + '\n')
+    return '\n'.join(parts)
+
+
+class FakeOllama(FakeService):
+    """/api/generate that takes latency + completion tokens / tokens_per_sec seconds"""
+
+    TOKENS_PER_WORD = 1.3
+
+    def __init__(self, latency=0.5, tokens_per_sec=50.0, word_count=None):
+        super().__init__()
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.word_count = word_count
+
+    def handle(self, method, path, query, body, headers):
+        if method != 'POST' or path != '/api/generate':
+            return json_response({'error': 'not found'}, 404)
+        request = json.loads(body)
+        prompt = request.get('prompt', '')
+        title = re.search(r'Title: (.*)', prompt)
+        title = title.group(1) if title else 'Article'
+        words = re.search(r'between (\d+)-(\d+) words', prompt)
+        word_count = self.word_count or (int(words.group(1)) if words else 1000)
+
+        rng = random.Random(hashlib.md5(title.encode('utf-8')).hexdigest())
+        content = generate_markdown(title, word_count, rng)
+        prompt_tokens = int(len(prompt.split()) * self.TOKENS_PER_WORD)
+        completion_tokens = int(len(content.split()) * self.TOKENS_PER_WORD)
+        eval_seconds = completion_tokens / self.tokens_per_sec if self.tokens_per_sec else 0.0
+        time.sleep(self.latency + eval_seconds)
+        return json_response({
+            'model': request.get('model'),
+            'response': content,
+            'done': True,
+            'prompt_eval_count': prompt_tokens,
+            'eval_count': completion_tokens,
+            'eval_duration': int(eval_seconds * 1e9),
+        })
+
+
+class FakeWordPress(FakeService):
+    """In-memory WordPress REST API with optional per-request latency"""
+
+    def __init__(self, latency=0.0, batch=True):
+        super().__init__()
+        self.latency = latency
+        self.batch = batch
+        self.posts = {}
+        self.media = {}
+        self.terms = {'categories': {}, 'tags': {}}
+        self.media_bytes = 0
+        self._ids = iter(range(1, 10 ** 9))
+
+    def _next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def handle(self, method, path, query, body, headers):
+        if self.latency:
+            time.sleep(self.latency)
+        if path == '/wp-json/' and method == 'GET':
+            namespaces = ['wp/v2'] + (['batch/v1'] if self.batch else [])
+            return json_response({'namespaces': namespaces})
+        if path == '/wp-json/batch/v1' and method == 'POST' and self.batch:
+            responses = []
+            for item in json.loads(body)['requests']:
+                status, data = self.route(item['method'], item['path'], {}, item.get('body') or {})
+                responses.append({'status': status, 'headers': {}, 'body': data})
+            return json_response({'responses': responses}, 207)
+        if path.startswith('/wp-json/wp/v2/media') and method == 'POST':
+            return json_response(*self.upload(body, headers))
+        if path.startswith('/wp-json'):
+            data = json.loads(body) if body else {}
+            status, result = self.route(method, path[len('/wp-json'):], query, data)
+            extra = {}
+            if isinstance(result, list):
+                extra = {'X-WP-Total': str(len(result)), 'X-WP-TotalPages': '1'}
+            return json_response(result, status, extra)
+        return json_response({'code': 'rest_no_route'}, 404)
+
+    def upload(self, body, headers):
+        media_id = self._next_id()
+        filename = re.search(r'filename="([^"]+)"', headers.get('Content-Disposition', '')) or None
+        filename = filename.group(1) if filename else f"{media_id}.jpg"
+        item = {'id': media_id, 'slug': filename.rsplit('.', 1)[0],
+                'source_url': f"{self.url}/wp-content/uploads/{filename}", 'title': {'rendered': filename}}
+        with self._lock:
+            self.media[media_id] = item
+            self.media_bytes += len(body)
+        return item, 201
+
+    def route(self, method, path, query, data):
+        """Handle one REST request below /wp-json, returning (status, body)"""
+        match = re.match(r'/wp/v2/posts/(\d+)$', path)
+        if match and method == 'POST':
+            post = self.posts.get(int(match.group(1)))
+            if post is None:
+                return 404, {'code': 'rest_post_invalid_id', 'message': 'Invalid post ID.'}
+            post.update(data)
+            return 200, post
+        if path == '/wp/v2/posts' and method == 'POST':
+            post = dict(data, id=self._next_id())
+            post.setdefault('status', 'draft')
+            with self._lock:
+                self.posts[post['id']] = post
+            return 201, post
+        if path == '/wp/v2/posts' and method == 'GET':
+            slugs = set(','.join(query.get('slug', [])).split(',')) - {''}
+            return 200, [{'id': p['id'], 'slug': p.get('slug'), 'status': p['status'], 'link': ''}
+                         for p in self.posts.values() if not slugs or p.get('slug') in slugs]
+        taxonomy = path.rsplit('/', 1)[-1]
+        if path in ('/wp/v2/categories', '/wp/v2/tags'):
+            if method == 'GET':
+                return 200, list(self.terms[taxonomy].values())
+            term = {'id': self._next_id(), 'name': data['name'], 'slug': data['name'].lower().replace(' ', '-')}
+            self.terms[taxonomy][term['id']] = term
+            return 201, term
+        if path == '/wp/v2/media' and method == 'GET':
+            return 200, list(self.media.values())
+        return 404, {'code': 'rest_no_route', 'message': 'No route was found matching the URL and request method.'}
+
+    def published(self):
+        return [post for post in self.posts.values() if post['status'] in ('publish', 'future')]
+
+
+class FakeSheet(FakeService):
+    """CSV export of num_posts generated rows for any spreadsheet ID"""
+
+    HEADERS = ['title', 'topic name', 'keywords', 'context', 'status', 'must have elements', 'images']
+
+    def __init__(self, num_posts=10, seed=0):
+        super().__init__()
+        rng = random.Random(seed)
+        rows = [','.join(self.HEADERS)]
+        for index in range(num_posts):
+            topic = ' '.join(rng.choices(WORDS, k=2))
+            title = f"{topic.title()} Guide {index + 1}"
+            keywords = ' '.join(rng.choices(WORDS, k=3))
+            rows.append(','.join([title, topic, keywords, f"Benchmark article {index + 1}", '', '', '']))
+        self.csv = ('\n'.join(rows) + '\n').encode('utf-8')
+
+    def handle(self, method, path, query, body, headers):
+        if path.endswith('/export'):
+            return 200, {'Content-Type': 'text/csv'}, self.csv
+        return 404, {}, b''
+
+
+class FakeImageHost(FakeService):
+    """Search page at /search?q=... linking to images_per_query distinct JPEGs under /images/
+
+    The JPEGs are generated once by start() (pool_size of them), so serving them
+    costs no more than a static file. Each query links to a different window of
+    the pool, so the images of one query are never near-duplicates.
+    """
+
+    def __init__(self, images_per_query=8, size=(1200, 800), latency=0.0, quality=85, pool_size=32):
+        super().__init__()
+        self.images_per_query = images_per_query
+        self.size = size
+        self.latency = latency
+        self.quality = quality
+        self.pool_size = max(pool_size, images_per_query)
+        self.pool = []
+
+    def generate_image(self, seed):
+        """JPEG of a random gradient with noise"""
+        import numpy as np
+        from PIL import Image
+        rng = np.random.default_rng(seed)
+        width, height = self.size
+        base = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+        image = Image.fromarray(base).resize((width, height), Image.BICUBIC)
+        noise = rng.integers(0, 24, size=(height, width, 3), dtype=np.uint8)
+        pixels = np.clip(np.asarray(image, dtype=np.int16) + noise, 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, 'JPEG', quality=self.quality)
+        return buffer.getvalue()
+
+    def start(self):
+        self.pool = [self.generate_image(seed) for seed in range(self.pool_size)]
+        return super().start()
+
+    def handle(self, method, path, query, body, headers):
+        if self.latency:
+            time.sleep(self.latency)
+        if path == '/search':
+            offset = int(hashlib.md5(query.get('q', [''])[0].encode('utf-8')).hexdigest()[:8], 16)
+            width, height = self.size
+            entries = ','.join(f'["{self.url}/images/{(offset + index) % self.pool_size}.jpg",{height},{width}]'
+                               for index in range(self.images_per_query))
+            page = f"<html><body><script>var data=[{entries}];</script></body></html>"
+            return 200, {'Content-Type': 'text/html'}, page.encode('utf-8')
+        match = re.match(r'/images/(\d+)\.jpg$', path)
+        if match and int(match.group(1)) < len(self.pool):
+            return 200, {'Content-Type': 'image/jpeg'}, self.pool[int(match.group(1))]
+        return 404, {}, b''
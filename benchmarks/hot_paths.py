@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the CPU-bound content and sheet parsing paths
+
+Times ContentProcessor.convert_markdown_to_html, insert_images, insert_adsense
+and add_required_elements on generated articles of 500 to 10k words, and
+GoogleSheetsManager.parse_csv on sheets of 10 to 100k rows. Each case is run
+in enough loops to take at least --min-time seconds, repeated --repeat times;
+the best and median time per call are reported.
+
+Results can be saved as JSON and compared against an earlier run; cases more
+than --threshold times slower than the baseline are reported as regressions
+and make the script exit with status 1.
+
+Usage:
+    python3 benchmarks/hot_paths.py --json bench-new.json
+    python3 benchmarks/hot_paths.py --compare bench-old.json --threshold 1.15
+    python3 benchmarks/hot_paths.py --quick --filter parse_csv
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from markdown_backends import generate_article, WORDS
+from modules.content_processor import ContentProcessor
+from modules.google_sheets import GoogleSheetsManager
+
+ARTICLE_WORDS = (500, 1000, 2500, 5000, 10000)
+SHEET_ROWS = (10, 100, 1000, 10000, 100000)
+QUICK_ARTICLE_WORDS = (500, 2500)
+QUICK_SHEET_ROWS = (10, 1000)
+
+SHEET_HEADERS = 'title,topic name,keywords,context,status,must have elements,images'
+MEDIA = [{'id': index, 'url': f"https://example.com/wp-content/uploads/image{index}.jpg"} for index in range(3)]
+
+
+def generate_sheet(rows, seed=0):
+    """CSV export with the sheet's columns; every tenth row is short so padding is exercised"""
+    rng = random.Random(seed)
+    lines = [SHEET_HEADERS]
+    for index in range(rows):
+        values = [f"{' '.join(rng.choices(WORDS, k=6)).title()} {index}", ' '.join(rng.choices(WORDS, k=2)),
+                  '"' + ' '.join(rng.choices(WORDS, k=4)) + '"', ' '.join(rng.choices(WORDS, k=12)),
+                  'published ✅' if index % 3 == 0 else '', 'table', '']
+        lines.append(','.join(values[:4] if index % 10 == 0 else values))
+    return '\n'.join(lines) + '\n'
+
+
+def build_cases(article_words, sheet_rows):
+    """Return {name: zero-argument callable}"""
+    processor = ContentProcessor()
+    sheets = GoogleSheetsManager(spreadsheet_id='benchmark')
+    cases = {}
+    for words in article_words:
+        markdown = generate_article(words, seed=words)
+        html = processor.convert_markdown_to_html(markdown)
+        cases[f"convert_markdown_to_html[{words}w]"] = lambda markdown=markdown: processor.convert_markdown_to_html(markdown)
+        cases[f"insert_images[{words}w]"] = lambda html=html: processor.insert_images(html, MEDIA)
+        cases[f"insert_adsense[{words}w]"] = lambda html=html: processor.insert_adsense(html)
+        cases[f"add_required_elements[{words}w]"] = (
+            lambda html=html: processor.add_required_elements(html, ['table', 'bullet_points', 'code_block']))
+    for rows in sheet_rows:
+        text = generate_sheet(rows)
+        cases[f"parse_csv[{rows}rows]"] = lambda text=text: sheets.parse_csv(text)
+    return cases
+
+
+def measure(func, min_time, repeat):
+    """Best and median seconds per call over repeat runs of an auto-sized loop"""
+    func()  # warm up
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed < min_time / 10 else max(2, int(min_time / max(elapsed, 1e-9)) + 1)
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - start) / loops)
+    return {'best': min(timings), 'median': statistics.median(timings), 'loops': loops, 'repeat': repeat}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='Only the smaller article and sheet sizes')
+    parser.add_argument('--filter', help='Only run cases whose name contains this text')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per measured repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='Measured repeats per case')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Slowdown factor of the best time that counts as a regression')
+    args = parser.parse_args()
+
+    # Measure the code itself, not the log output of the pipeline modules
+    logging.basicConfig(level=logging.WARNING)
+
+    cases = build_cases(QUICK_ARTICLE_WORDS if args.quick else ARTICLE_WORDS,
+                        QUICK_SHEET_ROWS if args.quick else SHEET_ROWS)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressions = []
+    print(f"{'case':<38}{'best':>12}{'median':>12}{'vs baseline':>14}")
+    for name, func in cases.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(func, args.min_time, args.repeat)
+        comparison = ''
+        if name in baseline:
+            ratio = results[name]['best'] / baseline[name]['best']
+            comparison = f"{ratio:.2f}x"
+            if ratio > args.threshold:
+                comparison += ' SLOWER'
+                regressions.append(name)
+        print(f"{name:<38}{format_time(results[name]['best']):>12}{format_time(results[name]['median']):>12}"
+              f"{comparison:>14}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold}x: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Import-time budget of the entry points
+
+Imports web_interface and main in fresh interpreters with `python -X importtime`
+and checks that
+
+- none of the heavy dependencies (selenium, PIL, numpy, bs4, the markdown
+  backends, python-dotenv, httpx) is imported at startup; they are imported by the
+  stage that first needs them
+- the cumulative import time of each entry point stays within --budget-ms
+  (best of --repeat runs, after one warm-up run that writes the .pyc files)
+
+The slowest direct imports of each entry point are listed, so a regression
+points at the module that caused it. Exits with status 1 if a check fails.
+
+Usage:
+    python3 benchmarks/import_time.py
+    python3 benchmarks/import_time.py --budget-ms 300 --repeat 5
+    python3 benchmarks/import_time.py --entry-point web_interface --top 20
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ('web_interface', 'main')
+HEAVY_MODULES = ('selenium', 'PIL', 'numpy', 'bs4', 'markdown2', 'markdown_it', 'mistune', 'dotenv', 'httpx')
+
+
+def import_times(module):
+    """Run `import module` under -X importtime; returns [(depth, name, self us, cumulative us)]"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        stripped = name.lstrip()
+        entries.append(((len(name) - len(stripped) - 1) // 2, stripped, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module, repeat):
+    """Best cumulative import time (ms), the imported modules and the direct imports of that run"""
+    import_times(module)  # warm up: compile and cache bytecode
+    best = None
+    for _ in range(repeat):
+        entries = import_times(module)
+        total = next(cumulative for depth, name, _, cumulative in entries if depth == 0 and name == module)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+    imported = {name for _, name, _, _ in entries}
+    direct = sorted(((name, cumulative) for depth, name, _, cumulative in entries if depth == 1),
+                    key=lambda item: -item[1])
+    return total / 1000, imported, direct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entry-point', action='append', choices=ENTRY_POINTS,
+                        help='Entry point to check (default: all)')
+    parser.add_argument('--budget-ms', type=float, default=500.0, help='Maximum cumulative import time per entry point')
+    parser.add_argument('--repeat', type=int, default=3, help='Measured imports per entry point')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest direct imports to list')
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.entry_point or ENTRY_POINTS:
+        total_ms, imported, direct = measure(module, args.repeat)
+        heavy = sorted(name for name in HEAVY_MODULES if name in imported)
+        status = 'ok' if total_ms <= args.budget_ms and not heavy else 'FAIL'
+        print(f"{module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms) {status}")
+        for name, cumulative in direct[:args.top]:
+            print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+        if total_ms > args.budget_ms:
+            failures.append(f"{module} takes {total_ms:.1f} ms to import, above the {args.budget_ms:.0f} ms budget")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at startup")
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
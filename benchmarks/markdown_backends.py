@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Markdown backend benchmark
+
+Compares the throughput of the markdown backends supported by ContentProcessor
+on generated articles, and reports whether their HTML output matches markdown2.
+Outputs are compared with whitespace collapsed.
+
+Usage:
+    python3 benchmarks/markdown_backends.py --articles 200 --words 1500
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.markdown_converter import CONVERTER_BACKENDS, get_converter
+
+WORDS = ("electric vehicle battery charging range motor inverter grid solar "
+         "lithium efficiency torque regenerative braking infrastructure fleet "
+         "kilowatt hour emissions policy incentive market adoption").split()
+
+
+def generate_article(word_count, seed=0):
+    """Generate a markdown article with headings, lists, tables and code blocks"""
+    rng = random.Random(seed)
+    parts = [f"# {' '.join(rng.choices(WORDS, k=5)).title()}\n"]
+    written = 0
+    section = 0
+    while written < word_count:
+        section += 1
+        parts.append(f"## Section {section}: {' '.join(rng.choices(WORDS, k=3))}\n")
+        for _ in range(3):
+            sentence_words = rng.choices(WORDS, k=rng.randint(40, 80))
+            written += len(sentence_words)
+            # Single newlines inside a paragraph exercise break-on-newline
+            parts.append(' '.join(sentence_words[:20]) + '\n' + ' '.join(sentence_words[20:]) + '\n')
+        parts.append('\n'.join(f"- **{rng.choice(WORDS)}**: {' '.join(rng.choices(WORDS, k=8))}" for _ in range(4)) + '\n')
+        if section % 2 == 0:
+            parts.append("| Model | Range | Price |\n|---|---|---|\n" +
+                         '\n'.join(f"| {rng.choice(WORDS)} | {rng.randint(200, 600)} km | ${rng.randint(25, 90)}k |"
+                                   for _ in range(5)) + '\n')
+        if section % 3 == 0:
+            parts.append("```python\ndef range_km(kwh, efficiency):\n    return kwh * efficiency\n```\n")
+    return '\n'.join(parts)
+
+
+def normalize(html):
+    """Collapse whitespace so formatting-only differences are ignored"""
+    return ' '.join(html.split()).replace('> <', '><')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=100, help='number of generated articles')
+    parser.add_argument('--words', type=int, default=1000, help='approximate words per article')
+    parser.add_argument('--backends', default=','.join(CONVERTER_BACKENDS), help='comma separated backend names')
+    args = parser.parse_args()
+
+    articles = [generate_article(args.words, seed=i) for i in range(args.articles)]
+    total_bytes = sum(len(a.encode('utf-8')) for a in articles)
+    reference = None
+
+    print(f"{'backend':<12} {'articles/s':>12} {'MB/s':>8} {'matches markdown2':>18}")
+    for backend in args.backends.split(','):
+        backend = backend.strip()
+        try:
+            converter = get_converter(backend)
+        except Exception as e:
+            print(f"{backend:<12} unavailable: {str(e)}")
+            continue
+        if converter.name != backend:
+            print(f"{backend:<12} not installed")
+            continue
+
+        converter.convert(articles[0])  # warm up
+        start = time.perf_counter()
+        outputs = [converter.convert(article) for article in articles]
+        elapsed = time.perf_counter() - start
+
+        normalized = [normalize(html) for html in outputs]
+        if backend == 'markdown2':
+            reference = normalized
+        matches = f"{sum(a == b for a, b in zip(normalized, reference))}/{len(articles)}" if reference else 'n/a'
+        print(f"{backend:<12} {len(articles) / elapsed:>12.1f} {total_bytes / elapsed / 1e6:>8.2f} {matches:>18}")
+
+
+if __name__ == '__main__':
+    main()
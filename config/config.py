@@ -1,18 +1,55 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+_environment_loaded = False
+
+
+def load_environment():
+    """Load environment variables from .env, once
+
+    Called when a run starts rather than on import, so starting the web interface
+    or importing the configuration does not pay for python-dotenv.
+    """
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+
 
 # Google Sheets Configuration
 GOOGLE_SHEETS_CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'credentials.json')
 SPREADSHEET_ID = ""  # Will be set from web interface
 WORKSHEET_NAME = 'Blog Posts'
+# CSV export of a public sheet; {spreadsheet_id} is filled in
+GOOGLE_SHEETS_CSV_URL = 'https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv'
 
 # WordPress Configuration
 WORDPRESS_URL = ""  # Will be set from web interface
 WORDPRESS_USERNAME = ""  # Will be set from web interface
 WORDPRESS_PASSWORD = ""  # Will be set from web interface
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Media uploads are streamed in chunks of this size
+UPLOAD_CONNECT_TIMEOUT = 10  # Seconds
+UPLOAD_TIMEOUT = 120  # Seconds allowed for sending one media file and for WordPress to answer
+WORDPRESS_TIMEOUT = 60  # Seconds WordPress may take to answer any other REST request (a whole batch included)
+# Create posts through the REST batch endpoint (WordPress 5.6+) in groups of WORDPRESS_BATCH_SIZE (max 25).
+# Sites without batch support get one request per post.
+WORDPRESS_BATCH_PUBLISH = False
+WORDPRESS_BATCH_SIZE = 25
+# 'direct' creates each post as published. 'draft' creates posts as drafts in parallel as soon as
+# their content is ready and publishes all of them in one bulk transition at the end of the run,
+# scheduled for PUBLISH_DATE (ISO 8601, site time) if set.
+PUBLISH_MODE = 'direct'
+PUBLISH_DATE = None
+DRAFT_WORKERS = 4
+PUBLISH_RETRIES = 2  # Extra attempts for posts whose transition to published failed
+# Every sheet row gets a slug derived from its title, and the slugs of all pending rows are looked
+# up on the site before a run. 'skip' leaves rows whose post is already live (drafts left by a failed
+# run are completed), 'update' regenerates and overwrites existing posts, 'off' disables the check.
+EXISTING_POST_POLICY = 'skip'
+# Site categories, tags and media are cached in memory for lookups and refetched after this many seconds.
+# Resources listed in WORDPRESS_METADATA_PRELOAD (e.g. ['categories', 'tags']) are fetched when a run starts.
+WORDPRESS_METADATA_TTL = 600
+WORDPRESS_METADATA_PRELOAD = []
 
 # LLM Configuration
 OLLAMA_URL = 'http://localhost:11434'
@@ -21,12 +58,101 @@ MODEL_NAME = 'gemma3:latest'
 # Image Configuration
 MAX_IMAGES_PER_POST = 3
 IMAGE_DOWNLOAD_PATH = 'temp/images'
+# Images of each run are kept in their own workspace under IMAGE_DOWNLOAD_PATH and removed when the run ends.
+# 'tmpfs' keeps the workspaces in memory under TMPFS_PATH instead of on disk.
+# 'memory' passes images as in-memory buffers from download to upload without writing files.
+TEMP_STORAGE_MODE = 'disk'
+TMPFS_PATH = '/dev/shm'
+TEMP_DISK_QUOTA_MB = 500  # Oldest leftover workspaces are evicted beyond this size
 ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
 DEFAULT_IMAGE_PATH = 'assets/default_images'  # Fallback directory for default images
 
+# Local image library (DEFAULT_IMAGE_PATH): 'first' to prefer it over web search,
+# 'fallback' to use it when web search finds nothing, or 'off'
+LOCAL_IMAGE_LIBRARY_MODE = 'fallback'
+LOCAL_IMAGE_INDEX_PATH = 'assets/default_images_index.json'
+LOCAL_IMAGE_INDEX_WAIT = 5  # Seconds a search waits for the first library scan to finish
+
+# Image search backends, tried in order until one returns results: 'http' (requests + BeautifulSoup), 'selenium'
+IMAGE_SEARCH_BACKENDS = ['http', 'selenium']
+IMAGE_SEARCH_URL = 'https://www.google.com/search'
+IMAGE_SEARCH_TIMEOUT = 10
+IMAGE_DOWNLOAD_TIMEOUT = 10
+IMAGE_DOWNLOAD_WORKERS = 4  # Concurrent image downloads per search
+IMAGE_SEARCH_WORKERS = 2  # Image searches run ahead of the post being generated
+
+# ChromeDriver for the selenium backend is cached per Chrome milestone under modules/webdriver/<milestone>/
+# and only downloaded (from Chrome for Testing) when the installed Chrome has no cached driver yet.
+CHROME_BINARY = None  # Chrome executable used to detect the version; searched on the PATH if None
+CHROMEDRIVER_DOWNLOAD = True  # False never downloads: only cached or manually installed drivers are used
+CHROMEDRIVER_VERSIONS_URL = 'https://googlechromelabs.github.io/chrome-for-testing/latest-versions-per-milestone-with-downloads.json'
+
+# Lean browser profile for the selenium backend (compare with benchmarks/chrome_profile.py): requests
+# matching CHROME_BLOCKED_URLS (images, fonts, trackers; the scraper only reads src attributes) are
+# blocked through CDP, the window is smaller, the HTTP cache on disk is shared by all browser launches
+# and Chrome runs at most CHROME_RENDERER_PROCESS_LIMIT renderer processes.
+CHROME_LEAN_PROFILE = False
+CHROME_BLOCKED_URLS = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+                       '*.woff', '*.woff2', '*.ttf', '*.otf', '*encrypted-tbn*',
+                       '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*']
+CHROME_WINDOW_SIZE = (1024, 768)
+CHROME_DISK_CACHE_DIR = 'temp/chrome-cache'
+CHROME_DISK_CACHE_MB = 100
+CHROME_RENDERER_PROCESS_LIMIT = 2
+
+# Image preprocessing before upload
+IMAGE_PREPROCESS_ENABLED = True
+IMAGE_MAX_WIDTH = 1600  # Images wider than this are downsized (keeping aspect ratio)
+IMAGE_OUTPUT_FORMAT = 'jpeg'  # 'jpeg' (progressive), 'webp' or 'avif'
+IMAGE_QUALITY = 82
+IMAGE_TARGET_BYTES = None  # e.g. 200 * 1024 to lower quality until each image fits
+IMAGE_PREPROCESS_WORKERS = None  # Process pool size, defaults to the CPU count
+
+# Near-duplicate filtering with perceptual hashes
+IMAGE_HASH_ALGORITHM = 'phash'  # 'ahash', 'dhash' or 'phash'
+IMAGE_DUPLICATE_THRESHOLD = 10  # Max differing bits (of 64) for two images to count as duplicates
+PUBLISHED_IMAGE_INDEX_PATH = None  # e.g. 'data/published_images.json' to also skip images already on the site
+
+# Featured image size of the WordPress theme (width, height), used to score candidates
+FEATURED_IMAGE_SIZE = (1200, 628)
+
+# Markdown Configuration
+# Backend used by ContentProcessor: 'markdown2', 'markdown-it' (markdown-it-py) or 'mistune'
+MARKDOWN_BACKEND = 'markdown2'
+
 # Logging Configuration
 LOG_FILE = 'logs/blog_publisher.log'
 LOG_LEVEL = 'INFO'
+# Format of LOG_FILE: 'text', or 'json' for one JSON object per line with the run ID,
+# post and stage of every record. The console and web interface log stay text.
+LOG_FORMAT = 'text'
+
+# Profiling (opt-in per run with main.py --profile or the web form). Results go to
+# <log directory>/profiles/<run id>/. Only spans of PROFILE_STAGES are profiled
+# (all stages if empty), and of each stage only every PROFILE_SAMPLE_EVERY-th one.
+PROFILE_STAGES = ['generate', 'markdown', 'html_assembly', 'image_search', 'image_download', 'media_upload', 'post_create']
+PROFILE_SAMPLE_EVERY = 1
+PROFILE_TOP_ALLOCATIONS = 15
+PROFILE_TRACEMALLOC_FRAMES = 1
+
+# Worker mode: the web interface and main.py queue one job per post in the SQLite file JOB_QUEUE_PATH
+# and worker processes (python -m modules.worker --processes N) publish them, reporting progress back
+# to the run's log. Workers on other machines can share the file on storage with working file locks.
+# The WordPress credentials of a run are kept in the queue file until the run is finished.
+WORKER_MODE = False
+JOB_QUEUE_PATH = 'data/jobs.sqlite3'
+JOB_MAX_ATTEMPTS = 3  # A post that fails this often is marked failed
+WORKER_LEASE_SECONDS = 900  # A job whose worker stops renewing its lease this long is handed to another worker
+WORKER_POLL_INTERVAL = 1.0  # Seconds between checks of an empty queue, and between progress updates
+
+# Asyncio pipeline (needs httpx): the posts of a run are processed concurrently on one event loop, with the
+# requests of each service bounded by these limits instead of one thread per request in flight.
+# It publishes posts directly: with PUBLISH_MODE 'draft' or WORDPRESS_BATCH_PUBLISH the threaded pipeline runs.
+ASYNC_PIPELINE = False
+ASYNC_POST_CONCURRENCY = 8  # Posts in progress at once
+ASYNC_LLM_CONCURRENCY = 2  # Generations in flight; match OLLAMA_NUM_PARALLEL of the Ollama server
+ASYNC_DOWNLOAD_CONCURRENCY = 64  # Image downloads in flight
+ASYNC_WORDPRESS_CONCURRENCY = 16  # WordPress requests (media uploads included) in flight
 
 # Content Configuration
 REQUIRED_ELEMENTS = {
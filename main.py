@@ -1,24 +1,18 @@
-import os
 import logging
+import argparse
 from datetime import datetime
 from modules.google_sheets import GoogleSheetsManager
 from modules.content_processor import ContentProcessor
 from modules.wordpress_integration import WordPressIntegration
 from modules.llm_integration import LLMIntegration
 from modules.image_handler import ImageHandler
-from config.config import LOG_FILE, LOG_LEVEL
-
-def setup_logging():
-    """Setup logging configuration"""
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-    logging.basicConfig(
-        level=LOG_LEVEL,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOG_FILE),
-            logging.StreamHandler()
-        ]
-    )
+from modules.profiling import RunProfiler
+from modules.metrics import RunMetrics
+from modules.job_queue import publish_with_workers
+from modules.publishing import publish_posts
+from modules.async_pipeline import run_async_pipeline, async_pipeline_available
+from modules.logging_setup import setup_logging
+from config.config import WORDPRESS_METADATA_PRELOAD, WORKER_MODE, ASYNC_PIPELINE, load_environment
 
 def clean_sheet_data(post):
     """Clean and format data from Google Sheets"""
@@ -40,10 +34,19 @@ def clean_sheet_data(post):
         'images': image_list
     }
 
-def main():
-    """Main function to orchestrate the blog publishing process"""
+def main(profile=False, wait=True):
+    """Main function to orchestrate the blog publishing process
+
+    With profile=True, cProfile and tracemalloc results of the run are written
+    to the profiles directory next to the log. In worker mode, wait=False
+    returns once the posts are queued instead of following the workers.
+    """
+    profiler = None
+    run_metrics = None
+    image_handler = None
     try:
         # Setup logging
+        load_environment()
         setup_logging()
         logger = logging.getLogger(__name__)
         logger.info("Starting blog publishing process")
@@ -51,9 +54,11 @@ def main():
         # Initialize components
         sheets_manager = GoogleSheetsManager()
         content_processor = ContentProcessor()
-        wordpress = WordPressIntegration()
-        llm = LLMIntegration()
-        image_handler = ImageHandler()
+
+        # Stage timings of this run are collected for the summary at the end
+        run_metrics = RunMetrics.start_run()
+        if profile:
+            profiler = RunProfiler.start_run()
 
         # Get blog data from Google Sheets
         blog_data = sheets_manager.get_blog_data()
@@ -61,96 +66,85 @@ def main():
             logger.warning("No blog data found in Google Sheets")
             return
 
-        # Process each blog post
+        # Clean the rows and keep the posts that still need to be published
+        pending_posts = []
         for post in blog_data:
-            try:
-                # Clean and format the post data
-                post_data = clean_sheet_data(post)
-                logger.info(f"Processing post: {post_data}")
-
-                # Skip if already published
-                if post_data['status'].lower() == 'published ✅':
-                    logger.info(f"Skipping already published post: {post_data['title']}")
-                    continue
-
-                # Skip if title is empty
-                if not post_data['title']:
-                    logger.warning("Skipping post with empty title")
-                    continue
-
-                # Search and download images
-                logger.info(f"Searching for images for: {post_data['title']}")
-                images = image_handler.search_and_download_images(
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords']
-                )
-                
-                if not images:
-                    logger.warning(f"No images found for post: {post_data['title']}")
-                    continue
-
-                # Select featured image
-                featured_image = image_handler.select_featured_image(images)
-                if not featured_image:
-                    logger.warning(f"Could not select featured image for post: {post_data['title']}")
-                    continue
-
-                # Remove featured image from content images
-                content_images = [img for img in images if img != featured_image]
-
-                # Generate content using LLaMA
-                logger.info(f"Generating content for: {post_data['title']}")
-                logger.info(f"Topic: {post_data['topic']}")
-                logger.info(f"Keywords: {post_data['keywords']}")
-                logger.info(f"Context: {post_data['context']}")
-                
-                markdown_content = llm.generate_content(
-                    title=post_data['title'],
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords'],
-                    context=post_data['context']
-                )
-                logger.info("Generated content using LLaMA")
-
-                # Convert markdown to HTML
-                html_content = content_processor.convert_markdown_to_html(markdown_content)
-                logger.info("Converted markdown to HTML")
-
-                # Add required elements if specified
-                if post_data['must_have_elements']:
-                    required_elements = [elem.strip() for elem in post_data['must_have_elements'].split(',')]
-                    logger.info(f"Adding required elements: {required_elements}")
-                    html_content = content_processor.add_required_elements(html_content, required_elements)
-
-                # Insert images into content (excluding featured image)
-                logger.info("Inserting images into content")
-                html_content = content_processor.insert_images(html_content, content_images)
-
-                # Insert AdSense
-                html_content = content_processor.insert_adsense(html_content)
-                logger.info("Added AdSense to content")
-
-                # Publish to WordPress with featured image
-                logger.info(f"Publishing post: {post_data['title']}")
-                post_id = wordpress.publish_post(
-                    title=post_data['title'],
-                    content=html_content,
-                    featured_image_path=featured_image
-                )
-
-                # Log success
-                logger.info(f"Successfully published post: {post_data['title']} (ID: {post_id})")
-                logger.info("Note: Sheet status cannot be updated as the sheet is public")
+            post_data = clean_sheet_data(post)
+            logger.debug("Processing post: %s", post_data)
 
-            except Exception as e:
-                logger.error(f"Error processing post {post_data.get('title', 'Unknown')}: {str(e)}")
+            # Skip if already published
+            if post_data['status'].lower() == 'published ✅':
+                logger.info("Skipping already published post: %s", post_data['title'])
                 continue
 
+            # Skip if title is empty
+            if not post_data['title']:
+                logger.warning("Skipping post with empty title")
+                continue
+
+            pending_posts.append(post_data)
+
+        if not pending_posts:
+            logger.info("No pending posts to publish")
+            return
+
+        # The site is only needed once there is something to publish
+        wordpress = WordPressIntegration()
+
+        # In worker mode the posts are queued for the worker processes, which report their progress here
+        if WORKER_MODE:
+            # Posts created by an earlier run are found by slug in one lookup, before they are queued
+            pending_posts = wordpress.filter_existing_posts(pending_posts)
+            # The workers publish to the WordPress site configured in their own environment
+            run_metrics.run_id = publish_with_workers(pending_posts, {}, logger, wait=wait)
+            return
+
+        # The LLM client and image handler are only needed when this process publishes the posts
+        llm = LLMIntegration()
+        image_handler = ImageHandler()
+
+        # Downloaded images go to a workspace that is removed when the run ends
+        run_metrics.run_id = image_handler.start_run().run_id
+
+        # The asyncio pipeline processes the posts concurrently on one event loop instead of publish_posts(),
+        # and checks for existing posts and preloads the site metadata without blocking
+        if ASYNC_PIPELINE and async_pipeline_available():
+            run_async_pipeline(pending_posts, image_handler)
+            logger.info("Blog publishing process completed")
+            return
+
+        # Posts created by an earlier run are found by slug in one lookup, before any image or LLM work
+        pending_posts = wordpress.filter_existing_posts(pending_posts)
+
+        # Load site categories, tags or media up front so per-post lookups are served from memory
+        if WORDPRESS_METADATA_PRELOAD:
+            try:
+                wordpress.load_site_metadata(WORDPRESS_METADATA_PRELOAD)
+            except Exception as e:
+                logger.warning("Site metadata not preloaded, it will be fetched on first use: %s", e)
+
+        publish_posts(pending_posts, wordpress, llm, image_handler, content_processor)
         logger.info("Blog publishing process completed")
 
     except Exception as e:
-        logger.error(f"Fatal error in main process: {str(e)}")
+        logger.error("Fatal error in main process: %s", e)
         raise
+    finally:
+        # Also after an early return or an error, so neither the browser, the run's workspace
+        # nor tracemalloc outlive the run
+        if image_handler is not None:
+            image_handler.close()
+        if run_metrics is not None:
+            run_metrics.finish()
+        if profiler:
+            profile_dir = profiler.finish(run_metrics.run_id)
+            logger.info("Profile of this run written to %s", profile_dir)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Publish the pending posts of the Google Sheet to WordPress")
+    parser.add_argument('--profile', action='store_true',
+                        help="Capture cProfile and tracemalloc results of the run next to the log")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="In worker mode, exit once the posts are queued instead of following the workers")
+    args = parser.parse_args()
+    main(profile=args.profile, wait=not args.no_wait) 
\ No newline at end of file
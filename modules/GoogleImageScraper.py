@@ -23,11 +23,11 @@ import io
 from PIL import Image
 import re
 
-#custom patch libraries
-from . import patch
+#chromedriver matching the installed chrome, cached per version
+from .chromedriver import resolve_chromedriver, chrome_arguments, block_requests
 
 class GoogleImageScraper():
-    def __init__(self, webdriver_path, image_path, search_key="cat", number_of_images=1, headless=True, min_resolution=(0, 0), max_resolution=(1920, 1080), max_missed=10):
+    def __init__(self, webdriver_path, image_path, search_key="cat", number_of_images=1, headless=True, min_resolution=(0, 0), max_resolution=(1920, 1080), max_missed=10, driver=None, lean_profile=False):
         #check parameter types
         image_path = os.path.join(image_path, search_key)
         if (type(number_of_images)!=int):
@@ -38,32 +38,38 @@ class GoogleImageScraper():
             os.makedirs(image_path)
             
         #check if chromedriver is installed
-        if (not os.path.isfile(webdriver_path)):
-            is_patched = patch.download_lastest_chromedriver()
-            if (not is_patched):
+        if (not webdriver_path or not os.path.isfile(webdriver_path)):
+            webdriver_path = resolve_chromedriver()
+            if (not webdriver_path):
                 exit("[ERR] Please update the chromedriver.exe in the webdriver folder according to your chrome version:https://chromedriver.chromium.org/downloads")
 
-        for i in range(1):
+        #reuse a browser that is already running; the second attempt uses the driver of the browser version
+        for i in range(0 if driver else 2):
             try:
                 #try going to www.google.com
                 options = Options()
-                if(headless):
-                    options.add_argument('--headless')
+                for argument in chrome_arguments(headless, lean_profile):
+                    options.add_argument(argument)
                 service = Service(webdriver_path)
                 driver = webdriver.Chrome(service=service, options=options)
-                driver.set_window_size(1400,1050)
+                if(lean_profile):
+                    #only the src attributes are read, so images, fonts and trackers are never loaded
+                    block_requests(driver)
+                else:
+                    driver.set_window_size(1400,1050)
                 driver.get("https://www.google.com")
                 try:
                     WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "W0wltc"))).click()
                 except Exception as e:
-                    continue
+                    pass
+                break
             except Exception as e:
-                #update chromedriver
+                #use the cached driver of the browser version, downloading it once if needed
                 pattern = r'(\d+\.\d+\.\d+\.\d+)'
                 try:
                     version = list(set(re.findall(pattern, str(e))))[0]
-                    is_patched = patch.download_lastest_chromedriver(version)
-                    if (not is_patched):
+                    webdriver_path = resolve_chromedriver(version)
+                    if (not webdriver_path):
                         exit("[ERR] Please update the chromedriver.exe in the webdriver folder according to your chrome version:https://chromedriver.chromium.org/downloads")
                 except:
                     print("[WARN] Unable to extract version number from error message")
@@ -81,9 +87,10 @@ class GoogleImageScraper():
         self.max_resolution = max_resolution
         self.max_missed = max_missed
 
-    def find_image_urls(self):
+    def find_image_urls(self, quit_driver=True):
         """
             This function search and return a list of image urls based on the search key.
+            Pass quit_driver=False to keep the browser open for another search.
             Example:
                 google_image_scraper = GoogleImageScraper("webdriver_path","image_path","search_key",number_of_photos)
                 image_urls = google_image_scraper.find_image_urls()
@@ -158,13 +165,15 @@ class GoogleImageScraper():
             except Exception:
                 time.sleep(1)
 
-        self.driver.quit()
+        if quit_driver:
+            self.driver.quit()
         print("[INFO] Google search ended")
         return image_urls
 
-    def save_images(self,image_urls, keep_filenames):
+    def save_images(self,image_urls, keep_filenames, duplicate_filter=None):
         """
             This function takes in an array of image urls and save it into the given image path/directory.
+            If a duplicate_filter is given, near-duplicate images are skipped before they are saved.
             Example:
                 google_image_scraper = GoogleImageScraper("webdriver_path","image_path","search_key",number_of_photos)
                 image_urls=["https://example_1.jpg","https://example_2.jpg"]
@@ -182,7 +191,13 @@ class GoogleImageScraper():
                     # Try to open the image
                     try:
                         image_from_web = Image.open(io.BytesIO(image.content))
-                        
+
+                        # Skip near-duplicates of images already saved or published
+                        if duplicate_filter is not None and duplicate_filter.is_duplicate(image_from_web, image_url):
+                            print(f"[INFO] {self.search_key} \t {indx} \t Near-duplicate image skipped")
+                            image_from_web.close()
+                            continue
+
                         # Generate filename
                         if keep_filenames:
                             o = urlparse(image_url)
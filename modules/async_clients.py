@@ -0,0 +1,395 @@
+import asyncio
+import logging
+import httpx
+from config.config import (
+    UPLOAD_TIMEOUT,
+    UPLOAD_CONNECT_TIMEOUT,
+    IMAGE_DOWNLOAD_TIMEOUT,
+    ASYNC_LLM_CONCURRENCY,
+    ASYNC_DOWNLOAD_CONCURRENCY,
+    ASYNC_WORDPRESS_CONCURRENCY,
+    WORDPRESS_TIMEOUT,
+    EXISTING_POST_POLICY
+)
+from .llm_integration import (
+    LLMIntegration,
+    CONNECTION_ERROR,
+    TIMEOUT_ERROR,
+    FALLBACK_CONNECTION,
+    FALLBACK_TIMEOUT,
+    FALLBACK_ERROR_ADVICE
+)
+from .wordpress_integration import (
+    WordPressIntegration,
+    BATCH_NAMESPACE,
+    EXISTING_POSTS_UNCHECKED,
+    assign_slugs,
+    page_params,
+    total_pages,
+    slug_queries
+)
+from .wordpress_cache import METADATA_RESOURCES
+from .google_sheets import GoogleSheetsManager
+from .image_downloader import ImageDownloader
+from .metrics import span
+
+
+class AsyncHttpClient:
+    """httpx.AsyncClient with a semaphore bounding the requests in flight
+
+    The client is created on first use, so it belongs to the event loop that
+    uses it. Callers hold `slots` around a request (and its span, so waiting for
+    a slot is not timed as the request), or use request() which does both.
+    """
+
+    def __init__(self, max_concurrency, timeout=None, auth=None, follow_redirects=False):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.auth = auth
+        self.follow_redirects = follow_redirects
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                auth=self.auth,
+                timeout=self.timeout,
+                follow_redirects=self.follow_redirects,
+                limits=httpx.Limits(max_connections=self.max_concurrency)
+            )
+        return self._client
+
+    async def request(self, method, url, **kwargs):
+        async with self.slots:
+            return await self.client.request(method, url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class AsyncClientMixin:
+    """Async context manager support for the clients below, which keep their AsyncHttpClient in self.http"""
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.aclose()
+
+
+async def _body_chunks(body):
+    """Async iterator over a MultipartFileEncoder, for httpx request content
+
+    Chunks are read in a thread, since the encoder reads media files from disk.
+    """
+    while True:
+        chunk = await asyncio.to_thread(body.read)
+        if not len(chunk):
+            return
+        yield bytes(chunk)
+
+
+class AsyncLLMIntegration(AsyncClientMixin, LLMIntegration):
+    """LLMIntegration with an awaitable generate_content(); at most max_concurrency generations run at once"""
+
+    def __init__(self, max_concurrency=ASYNC_LLM_CONCURRENCY):
+        super().__init__()
+        self.http = AsyncHttpClient(max_concurrency, timeout=60)
+
+    async def generate_content(self, title, topic, keywords, context, word_count=1000):
+        """Generate blog content using Gemma 3"""
+        try:
+            title = self.clean_text(title)
+            topic = self.clean_text(topic)
+            keywords = self.clean_text(keywords)
+            context = self.clean_text(context)
+            prompt = self.build_prompt(title, topic, keywords, context, word_count)
+
+            async with self.http.slots:
+                with span('generate') as stage:
+                    response = await self.http.client.post(f"{self.base_url}/api/generate",
+                                                           json=self.request_body(prompt))
+                    response.raise_for_status()
+                    return self.read_result(response.json(), len(response.content), stage)
+        except httpx.ConnectError:
+            self.logger.error(CONNECTION_ERROR)
+            return self.fallback_content(title, topic, keywords, context, *FALLBACK_CONNECTION)
+        except httpx.TimeoutException:
+            self.logger.error(TIMEOUT_ERROR)
+            return self.fallback_content(title, topic, keywords, context, *FALLBACK_TIMEOUT)
+        except Exception as e:
+            self.logger.error("Error generating content with Gemma: %s", e)
+            return self.fallback_content(title, topic, keywords, context,
+                                         f"This content was generated as a fallback due to an error: {str(e)}",
+                                         FALLBACK_ERROR_ADVICE)
+
+
+class AsyncGoogleSheetsManager(AsyncClientMixin):
+    """Awaitable get_blog_data(); the URL and the CSV parsing come from the GoogleSheetsManager in self.sheet"""
+
+    def __init__(self, spreadsheet_id=None):
+        self.sheet = GoogleSheetsManager(spreadsheet_id)
+        self.logger = self.sheet.logger
+        self.http = AsyncHttpClient(1, follow_redirects=True)
+
+    async def get_blog_data(self):
+        """Fetch blog post data from public Google Sheet"""
+        try:
+            csv_url = self.sheet.csv_url()
+            self.logger.info("Fetching data from Google Sheet: %s", self.sheet.spreadsheet_id)
+
+            async with self.http.slots:
+                with span('sheet_fetch') as stage:
+                    response = await self.http.client.get(csv_url)
+                    response.raise_for_status()
+                    stage.add(nbytes=len(response.content))
+
+            return self.sheet.parse_csv(response.text)
+        except Exception as e:
+            self.logger.error("Error fetching blog data: %s", e)
+            raise
+
+
+class AsyncWordPressIntegration(AsyncClientMixin):
+    """Awaitable requests to one WordPress site, with the methods and arguments of WordPressIntegration
+
+    Only the transport is here: request bodies, media descriptors and the
+    handling of responses come from the blocking client in self.site, which
+    also holds the site's metadata cache. At most max_concurrency requests to
+    the site are in flight; upload_images(), fetch_all() and
+    find_posts_by_slug() send theirs concurrently. Media is streamed from disk
+    or memory in UPLOAD_CHUNK_SIZE pieces as with the blocking client.
+    """
+
+    def __init__(self, wordpress_url=None, wordpress_username=None, wordpress_password=None,
+                 max_concurrency=ASYNC_WORDPRESS_CONCURRENCY):
+        self.setup_logging()
+        self.site = WordPressIntegration(wordpress_url, wordpress_username, wordpress_password)
+        self.http = AsyncHttpClient(max_concurrency, auth=self.site.auth,
+                                    timeout=httpx.Timeout(UPLOAD_TIMEOUT, connect=UPLOAD_CONNECT_TIMEOUT))
+        # REST requests other than uploads get the shorter timeout of the blocking client
+        self.rest_timeout = httpx.Timeout(WORDPRESS_TIMEOUT, connect=UPLOAD_CONNECT_TIMEOUT)
+        self._batch_supported = None
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    async def upload_media(self, image, filename=None, mime_type=None):
+        """Upload an image to WordPress media library; see WordPressIntegration.upload_media()"""
+        image_file = None
+        try:
+            filename, body, headers, image_file = await asyncio.to_thread(
+                self.site.media_request, image, filename, mime_type
+            )
+            # Sent with its length rather than chunked, as requests does for the blocking client
+            headers['Content-Length'] = str(len(body))
+
+            async with self.http.slots:
+                with span('media_upload') as stage:
+                    response = await self.http.client.post(f"{self.site.base_url}/media",
+                                                           content=_body_chunks(body), headers=headers)
+                    stage.add(nbytes=len(body))
+                    if not response.is_success:
+                        stage.status = 'error'
+
+            response.raise_for_status()
+            return self.site.media_descriptor(filename, body, response.json())
+
+        except Exception as e:
+            self.logger.error("Error uploading image %s: %s", filename or image, e)
+            raise
+        finally:
+            if image_file is not None:
+                image_file.close()
+
+    async def upload_images(self, image_paths):
+        """Upload several images (paths or buffers) concurrently and return their media descriptors, skipping failures"""
+        results = await asyncio.gather(*(self.upload_media(path) for path in image_paths), return_exceptions=True)
+        media = []
+        for image_path, result in zip(image_paths, results):
+            if isinstance(result, Exception):
+                self.logger.error("Skipping image %s: %s", image_path, result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                media.append(result)
+        return media
+
+    async def fetch_all(self, endpoint, params=None):
+        """Fetch every item of a collection endpoint; see WordPressIntegration.fetch_all()"""
+        async def fetch_page(page):
+            response = await self.http.request('GET', f"{self.site.base_url}/{endpoint}",
+                                               params=page_params(params, page), timeout=self.rest_timeout)
+            response.raise_for_status()
+            return response
+
+        first = await fetch_page(1)
+        items = first.json()
+        pages = await asyncio.gather(*(fetch_page(page) for page in range(2, total_pages(first) + 1)))
+        for response in pages:
+            items.extend(response.json())
+        return items
+
+    async def load_site_metadata(self, resources=tuple(METADATA_RESOURCES)):
+        """Bulk fetch categories, tags and/or media into the metadata cache, skipping resources still fresh"""
+        for resource, endpoint, fields in self.site.stale_metadata(resources):
+            try:
+                self.site.cache_metadata(resource, await self.fetch_all(endpoint, {'_fields': fields}))
+            except Exception as e:
+                self.logger.error("Error loading %s: %s", resource, e)
+                raise
+
+    async def get_or_create_term(self, taxonomy, name):
+        """ID of the category or tag with this name, creating it if the site does not have it"""
+        await self.load_site_metadata([taxonomy])
+        term = self.site.find_term(taxonomy, name)
+        if term:
+            return term['id']
+        try:
+            response = await self.http.request('POST', f"{self.site.base_url}/{taxonomy}", json={'name': name},
+                                               timeout=self.rest_timeout)
+            return self.site.created_term_id(taxonomy, name, response)
+        except Exception as e:
+            self.logger.error("Error creating %s term %s: %s", taxonomy, name, e)
+            raise
+
+    async def find_posts_by_slug(self, slugs):
+        """Look up posts in any status by slug; see WordPressIntegration.find_posts_by_slug()"""
+        async def find(params):
+            response = await self.http.request('GET', f"{self.site.base_url}/posts", params=params,
+                                               timeout=self.rest_timeout)
+            response.raise_for_status()
+            return response.json()
+
+        found = {}
+        try:
+            for posts in await asyncio.gather(*(find(params) for params in slug_queries(slugs))):
+                for post in posts:
+                    found[post['slug']] = post
+            self.logger.info("Found %s of %s posts already on the site", len(found), len(set(slugs)))
+            return found
+        except Exception as e:
+            self.logger.error("Error looking up existing posts: %s", e)
+            raise
+
+    async def filter_existing_posts(self, posts, policy=EXISTING_POST_POLICY):
+        """Give each sheet row its slug and leave out or mark the posts already on the site;
+        see WordPressIntegration.filter_existing_posts()
+        """
+        assign_slugs(posts)
+        if policy == 'off' or not posts:
+            return posts
+
+        try:
+            existing = await self.find_posts_by_slug([post['slug'] for post in posts])
+        except Exception:
+            self.logger.warning(EXISTING_POSTS_UNCHECKED)
+            return posts
+        return self.site.remaining_posts(posts, existing, policy)
+
+    async def supports_batch(self):
+        """Check once whether the site exposes the REST batch endpoint"""
+        if self._batch_supported is None:
+            try:
+                response = await self.http.request('GET', f"{self.site.rest_url}/", auth=None,
+                                                   timeout=httpx.Timeout(UPLOAD_CONNECT_TIMEOUT))
+                self._batch_supported = self.site.lists_batch_namespace(response)
+            except Exception as e:
+                self.logger.warning("Could not check REST batch support: %s", e)
+                self._batch_supported = False
+            self.logger.info("REST batch requests supported: %s", self._batch_supported)
+        return self._batch_supported
+
+    async def batch_request(self, batch, validation='normal'):
+        """Send up to 25 REST requests in one call to the batch endpoint; see WordPressIntegration.batch_request()"""
+        async with self.http.slots:
+            with span('post_batch'):
+                response = await self.http.client.post(f"{self.site.rest_url}/{BATCH_NAMESPACE}",
+                                                       json={'validation': validation, 'requests': batch},
+                                                       timeout=self.rest_timeout)
+                response.raise_for_status()
+        return self.site.batch_responses(batch, response.json())
+
+    async def create_post(self, title, content, featured_media=None, status='publish', slug=None):
+        """Create a new blog post with optional featured image"""
+        try:
+            post_data = self.site.post_payload(title, content, featured_media, status, slug)
+
+            async with self.http.slots:
+                with span('post_create'):
+                    response = await self.http.client.post(f"{self.site.base_url}/posts", json=post_data,
+                                                           timeout=self.rest_timeout)
+                    response.raise_for_status()
+            return self.site.created_post_id(response.json())
+        except Exception as e:
+            self.logger.error("Error creating post: %s", e)
+            raise
+
+    async def update_post(self, post_id, **fields):
+        """Update fields of an existing post, e.g. status='publish'"""
+        try:
+            async with self.http.slots:
+                with span('post_update'):
+                    response = await self.http.client.post(f"{self.site.base_url}/posts/{post_id}", json=fields,
+                                                           timeout=self.rest_timeout)
+                    response.raise_for_status()
+            self.logger.info("Updated post %s: %s", post_id, ', '.join(fields))
+            return response.json()
+        except Exception as e:
+            self.logger.error("Error updating post %s: %s", post_id, e)
+            raise
+
+    async def publish_post(self, title, content, featured_media=None, slug=None, post_id=None):
+        """Publish a blog post with an uploaded featured image; see WordPressIntegration.publish_post()"""
+        try:
+            featured_media_id = self.site.featured_media_id(featured_media)
+            if post_id:
+                # Update and publish the post created by an earlier run
+                await self.update_post(post_id, **self.site.post_payload(title, content, featured_media_id, slug=slug))
+            else:
+                post_id = await self.create_post(title=title, content=content,
+                                                 featured_media=featured_media_id, slug=slug)
+
+            self.logger.info("Successfully published post with ID: %s", post_id)
+            return post_id
+        except Exception as e:
+            self.logger.error("Error publishing post: %s", e)
+            raise
+
+
+class AsyncImageDownloader(AsyncClientMixin, ImageDownloader):
+    """ImageDownloader whose downloads are awaitable; at most max_concurrency are in flight across all searches
+
+    Validation, duplicate checks and writing the files run in a thread, off the
+    event loop.
+    """
+
+    def __init__(self, timeout=IMAGE_DOWNLOAD_TIMEOUT, max_concurrency=ASYNC_DOWNLOAD_CONCURRENCY):
+        super().__init__(timeout=timeout, max_workers=max_concurrency)
+        self.http = AsyncHttpClient(max_concurrency, timeout=timeout, follow_redirects=True)
+
+    async def fetch(self, url):
+        """Download one URL and return its bytes, or None on failure"""
+        async with self.http.slots:
+            with span('image_download') as stage:
+                try:
+                    response = await self.http.client.get(url)
+                    response.raise_for_status()
+                    stage.add(nbytes=len(response.content))
+                    return response.content
+                except Exception as e:
+                    stage.status = 'error'
+                    self.logger.warning("Failed to download image %s: %s", url, e)
+                    return None
+
+    async def download(self, urls, dest_dir, name_prefix, duplicate_filter=None):
+        """Download images into dest_dir and return the saved paths in URL order; see ImageDownloader.download()"""
+        contents = await asyncio.gather(*(self.fetch(url) for url in urls))
+        return await asyncio.to_thread(self.save, urls, contents, dest_dir, name_prefix, duplicate_filter)
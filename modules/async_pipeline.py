@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import importlib.util
+from config.config import ASYNC_POST_CONCURRENCY, PUBLISH_MODE, WORDPRESS_BATCH_PUBLISH, WORDPRESS_METADATA_PRELOAD
+from .metrics import current_post
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPipeline:
+    """Publishes the posts of a run concurrently on one event loop
+
+    Every post is a task and at most post_concurrency of them are in progress.
+    The LLM, image download and WordPress clients (modules/async_clients.py)
+    each bound their own requests in flight (ASYNC_*_CONCURRENCY), so one thread
+    keeps many downloads and uploads and a few generations going. A post's
+    media is uploaded while its article is generated. Image source searches,
+    featured image scoring, preprocessing, rendering and file reads and writes
+    run in threads, so the event loop does not wait on the CPU or the disk.
+
+    Posts are always published directly, so async_pipeline_available() turns it
+    down when PUBLISH_MODE is 'draft' or WORDPRESS_BATCH_PUBLISH is set.
+    """
+
+    def __init__(self, image_handler, wordpress_url=None, wordpress_username=None, wordpress_password=None,
+                 num_images=5, article_length=1000, post_concurrency=ASYNC_POST_CONCURRENCY):
+        from .async_clients import AsyncLLMIntegration, AsyncWordPressIntegration, AsyncImageDownloader
+        from .content_processor import ContentProcessor
+
+        self.setup_logging()
+        self.image_handler = image_handler
+        self.num_images = num_images
+        self.article_length = article_length
+        self.post_concurrency = post_concurrency
+        self.content_processor = ContentProcessor()
+        self.llm = AsyncLLMIntegration()
+        self.downloader = AsyncImageDownloader()
+        self.wordpress = AsyncWordPressIntegration(
+            wordpress_url=wordpress_url,
+            wordpress_username=wordpress_username,
+            wordpress_password=wordpress_password
+        )
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def finish_post(self, images, post_id):
+        """Index the images of a published post and delete them from the workspace"""
+        self.image_handler.record_published(images, post_id=post_id)
+        self.image_handler.release_images(images)
+
+    async def process_post(self, post_data):
+        """Publish one post; returns its ID, or None if it was skipped or failed"""
+        # Runs in its own task, so this only applies to the post's own log records
+        current_post.set(post_data['slug'])
+        try:
+            self.logger.info("Searching for images for: %s", post_data['title'])
+            images = await self.image_handler.search_and_download_images_async(
+                topic=post_data['topic'],
+                keywords=post_data['keywords'],
+                num_images=self.num_images,
+                downloader=self.downloader
+            )
+            if not images:
+                self.logger.warning("No images found for post: %s", post_data['title'])
+                return None
+
+            featured_image = await asyncio.to_thread(self.image_handler.select_featured_image, images)
+            if not featured_image:
+                self.logger.warning("Could not select featured image for post: %s", post_data['title'])
+                return None
+            content_images = [img for img in images if img != featured_image]
+
+            # The media does not depend on the article, so it is uploaded during generation
+            uploads = [
+                asyncio.create_task(self.wordpress.upload_media(featured_image)),
+                asyncio.create_task(self.wordpress.upload_images(content_images))
+            ]
+            try:
+                self.logger.info("Generating content for: %s", post_data['title'])
+                markdown_content = await self.llm.generate_content(
+                    title=post_data['title'],
+                    topic=post_data['topic'],
+                    keywords=post_data['keywords'],
+                    context=post_data['context'],
+                    word_count=self.article_length
+                )
+                self.logger.info("Generated content using LLM")
+                featured_media, content_media = await asyncio.gather(*uploads)
+            except BaseException:
+                # Stop the uploads still running (e.g. the content images when the featured
+                # image failed) and wait for them, so none finishes after the post is given up
+                for task in uploads:
+                    task.cancel()
+                await asyncio.gather(*uploads, return_exceptions=True)
+                raise
+
+            html_content = await asyncio.to_thread(self.content_processor.render_post, markdown_content,
+                                                   content_media, post_data['must_have_elements'])
+
+            self.logger.info("Publishing post: %s", post_data['title'])
+            post_id = await self.wordpress.publish_post(
+                title=post_data['title'],
+                content=html_content,
+                featured_media=featured_media,
+                slug=post_data['slug'],
+                post_id=post_data.get('existing_id')
+            )
+            self.logger.info("Successfully published post: %s (ID: %s)", post_data['title'], post_id)
+
+            # Remember published images so later runs do not upload them again
+            await asyncio.to_thread(self.finish_post, images, post_id)
+            return post_id
+
+        except Exception as e:
+            self.logger.error("Error processing post %s: %s", post_data.get('title', 'Unknown'), e)
+            return None
+
+    async def prepare(self, posts):
+        """Slug check of the sheet rows and the metadata preload; returns the rows still to publish"""
+        # Posts created by an earlier run are found by slug in one lookup, before any image or LLM work
+        posts = await self.wordpress.filter_existing_posts(posts)
+
+        # Load site categories, tags or media up front so per-post lookups are served from memory
+        if WORDPRESS_METADATA_PRELOAD and posts:
+            try:
+                await self.wordpress.load_site_metadata(WORDPRESS_METADATA_PRELOAD)
+            except Exception as e:
+                self.logger.warning("Site metadata not preloaded, it will be fetched on first use: %s", e)
+        return posts
+
+    async def run(self, posts):
+        """Check which sheet rows are already on the site and process the others, post_concurrency at a time;
+        returns the IDs of the published posts
+        """
+        slots = asyncio.Semaphore(self.post_concurrency)
+
+        async def process(post_data):
+            async with slots:
+                return await self.process_post(post_data)
+
+        try:
+            posts = await self.prepare(posts)
+            results = await asyncio.gather(*(process(post_data) for post_data in posts))
+        finally:
+            await asyncio.gather(self.llm.aclose(), self.downloader.aclose(), self.wordpress.aclose())
+        return [post_id for post_id in results if post_id]
+
+
+def async_pipeline_available():
+    """Whether the asyncio pipeline can run with this configuration; logs why not"""
+    if importlib.util.find_spec('httpx') is None:
+        logger.warning("The asyncio pipeline needs httpx (pip install httpx), using the threaded pipeline")
+        return False
+    if PUBLISH_MODE == 'draft' or WORDPRESS_BATCH_PUBLISH:
+        logger.warning("The asyncio pipeline publishes posts directly and does not support PUBLISH_MODE 'draft' "
+                       "or WORDPRESS_BATCH_PUBLISH, using the threaded pipeline")
+        return False
+    return True
+
+
+def run_async_pipeline(posts, image_handler, **options):
+    """Publish posts with an AsyncPipeline on a new event loop; returns the IDs of the published posts
+
+    options are the keyword arguments of AsyncPipeline. Call from a thread
+    without a running event loop.
+    """
+    return asyncio.run(AsyncPipeline(image_handler, **options).run(posts))
@@ -0,0 +1,251 @@
+import os
+import re
+import sys
+import time
+import stat
+import shutil
+import logging
+import zipfile
+import platform
+import tempfile
+import threading
+import subprocess
+import requests
+from config.config import (
+    CHROME_BINARY,
+    CHROMEDRIVER_DOWNLOAD,
+    CHROMEDRIVER_VERSIONS_URL,
+    CHROME_BLOCKED_URLS,
+    CHROME_WINDOW_SIZE,
+    CHROME_DISK_CACHE_DIR,
+    CHROME_DISK_CACHE_MB,
+    CHROME_RENDERER_PROCESS_LIMIT
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# Drivers are cached as <WEBDRIVER_DIR>/<Chrome milestone>/chromedriver; a driver placed
+# directly in WEBDRIVER_DIR (the old layout) is still used when nothing better is found
+WEBDRIVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'webdriver')
+DRIVER_NAME = 'chromedriver.exe' if sys.platform == 'win32' else 'chromedriver'
+CHROME_COMMANDS = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome',
+                   '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome']
+VERSION_PATTERN = re.compile(r'(\d+)\.\d+\.\d+\.\d+')
+RETRY_AFTER = 600  # Seconds before a failed resolution is attempted again
+
+
+def chrome_platform():
+    """Chrome for Testing platform name of this machine"""
+    if sys.platform.startswith('linux'):
+        return 'linux64'
+    if sys.platform == 'darwin':
+        return 'mac-arm64' if platform.machine() == 'arm64' else 'mac-x64'
+    return 'win64' if sys.maxsize > 2 ** 32 else 'win32'
+
+
+def chrome_arguments(headless=True, lean=False):
+    """Command line switches of the scraper's Chrome; lean adds those of the lean profile"""
+    arguments = ['--headless'] if headless else []
+    if lean:
+        width, height = CHROME_WINDOW_SIZE
+        arguments += [
+            f"--window-size={width},{height}",
+            f"--disk-cache-dir={os.path.abspath(CHROME_DISK_CACHE_DIR)}",
+            f"--disk-cache-size={CHROME_DISK_CACHE_MB * 1024 * 1024}",
+            f"--renderer-process-limit={CHROME_RENDERER_PROCESS_LIMIT}",
+            '--disable-extensions',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--disable-gpu',
+            '--no-first-run',
+            '--mute-audio',
+        ]
+    return arguments
+
+
+def block_requests(driver, patterns=CHROME_BLOCKED_URLS):
+    """Make a started Chrome drop requests matching the URL patterns (CDP Network.setBlockedURLs)
+
+    The blocklist applies to every later navigation of the driver's page.
+    """
+    if patterns:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+
+
+def milestone_of(version):
+    """Major version of a full Chrome version string, or None"""
+    match = VERSION_PATTERN.search(version or '')
+    return match.group(1) if match else None
+
+
+class ChromeDriverResolver:
+    """Finds a ChromeDriver matching the installed Chrome, downloading it at most once per milestone
+
+    A cached driver is used without any network access. Resolution is serialized
+    by a lock in the process and, where fcntl is available, a lock file in the
+    cache directory, so concurrent runs or worker processes never download or
+    unpack the same driver twice.
+    """
+
+    def __init__(self, cache_dir=WEBDRIVER_DIR, chrome_binary=CHROME_BINARY, download=CHROMEDRIVER_DOWNLOAD):
+        self.setup_logging()
+        self.cache_dir = cache_dir
+        self.chrome_binary = chrome_binary
+        self.download = download
+        self._lock = threading.Lock()
+        self._chrome_version = None  # Detected once; a mismatch error passes the new version explicitly
+        self._resolved = {}  # milestone (or None) -> driver path
+        self._failed = {}  # milestone (or None) -> time of the failed attempt
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def chrome_version(self):
+        """Version of the installed Chrome, e.g. '124.0.6367.91', or None if it cannot be found"""
+        commands = [self.chrome_binary] if self.chrome_binary else CHROME_COMMANDS
+        for command in commands:
+            try:
+                output = subprocess.run([command, '--version'], capture_output=True, text=True, timeout=10).stdout
+            except (OSError, subprocess.SubprocessError):
+                continue
+            if milestone_of(output):
+                return VERSION_PATTERN.search(output).group(0)
+        if sys.platform == 'win32':
+            try:
+                output = subprocess.run(['reg', 'query', r'HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon',
+                                         '/v', 'version'], capture_output=True, text=True, timeout=10).stdout
+                if milestone_of(output):
+                    return VERSION_PATTERN.search(output).group(0)
+            except (OSError, subprocess.SubprocessError):
+                pass
+        return None
+
+    def cached_driver(self, milestone):
+        """Path of the cached driver of a milestone, or None"""
+        path = os.path.join(self.cache_dir, str(milestone), DRIVER_NAME)
+        return path if os.path.isfile(path) else None
+
+    def fallback_driver(self):
+        """Driver of the old flat layout, else the one of the newest cached milestone"""
+        legacy = os.path.join(self.cache_dir, DRIVER_NAME)
+        if os.path.isfile(legacy):
+            return legacy
+        if not os.path.isdir(self.cache_dir):
+            return None
+        milestones = sorted((name for name in os.listdir(self.cache_dir) if name.isdigit()), key=int, reverse=True)
+        for milestone in milestones:
+            path = self.cached_driver(milestone)
+            if path:
+                return path
+        return None
+
+    def resolve(self, chrome_version=None):
+        """Path of a ChromeDriver for chrome_version (default: the installed Chrome), or None
+
+        Pass the version reported by a "session not created" error to replace a
+        driver that does not match the browser.
+        """
+        with self._lock:
+            if not chrome_version:
+                if self._chrome_version is None:
+                    self._chrome_version = self.chrome_version() or ''
+                chrome_version = self._chrome_version
+            milestone = milestone_of(chrome_version)
+            if milestone in self._resolved and os.path.isfile(self._resolved[milestone]):
+                return self._resolved[milestone]
+            if time.time() - self._failed.get(milestone, 0) < RETRY_AFTER:
+                return self.fallback_driver()
+
+            path = self._resolve_locked(milestone)
+            if path:
+                self._resolved[milestone] = path
+                self._failed.pop(milestone, None)
+            else:
+                self._failed[milestone] = time.time()
+                path = self.fallback_driver()
+            return path
+
+    def _resolve_locked(self, milestone):
+        if milestone is None:
+            self.logger.warning("Chrome version could not be detected, using a cached ChromeDriver if there is one")
+            return self.fallback_driver()
+
+        path = self.cached_driver(milestone)
+        if path:
+            self.logger.info("Using cached ChromeDriver for Chrome %s: %s", milestone, path)
+            return path
+        if not self.download:
+            self.logger.warning("No cached ChromeDriver for Chrome %s and downloads are disabled", milestone)
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, '.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have installed it while this one waited for the lock
+                return self.cached_driver(milestone) or self._download(milestone)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _download(self, milestone):
+        """Download and unpack the driver of a milestone into its cache directory"""
+        try:
+            response = requests.get(CHROMEDRIVER_VERSIONS_URL, timeout=30)
+            response.raise_for_status()
+            release = response.json()['milestones'][str(milestone)]
+            downloads = {item['platform']: item['url'] for item in release['downloads']['chromedriver']}
+            url = downloads[chrome_platform()]
+        except Exception as e:
+            self.logger.error("No ChromeDriver download found for Chrome %s: %s", milestone, e)
+            return None
+
+        self.logger.info("Downloading ChromeDriver %s for Chrome %s", release['version'], milestone)
+        staging = tempfile.mkdtemp(prefix=f".{milestone}-", dir=self.cache_dir)
+        try:
+            archive = os.path.join(staging, 'chromedriver.zip')
+            with requests.get(url, stream=True, timeout=60) as download:
+                download.raise_for_status()
+                with open(archive, 'wb') as f:
+                    for chunk in download.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+
+            driver = os.path.join(staging, DRIVER_NAME)
+            with zipfile.ZipFile(archive) as zip_file:
+                member = next(name for name in zip_file.namelist() if os.path.basename(name) == DRIVER_NAME)
+                with zip_file.open(member) as source, open(driver, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            os.chmod(driver, os.stat(driver).st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
+            os.remove(archive)
+            with open(os.path.join(staging, 'VERSION'), 'w') as f:
+                f.write(release['version'] + '\n')
+
+            # Publish the complete directory in one rename, so a partial download is never used
+            target_dir = os.path.join(self.cache_dir, str(milestone))
+            if os.path.isdir(target_dir):
+                shutil.rmtree(target_dir)
+            os.rename(staging, target_dir)
+            return os.path.join(target_dir, DRIVER_NAME)
+        except Exception as e:
+            self.logger.error("Error downloading ChromeDriver for Chrome %s: %s", milestone, e)
+            return None
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def resolve_chromedriver(chrome_version=None):
+    """Resolve the ChromeDriver with the resolver shared by this process; returns its path or None"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ChromeDriverResolver()
+    return _resolver.resolve(chrome_version)
@@ -1,17 +1,20 @@
-import markdown2
 import logging
 import os
 import re
 from urllib.parse import urlparse
 from config.config import REQUIRED_ELEMENTS, ADSENSE_SCRIPT
-from modules.wordpress_integration import WordPressIntegration
+from modules.markdown_converter import get_converter
+from modules.metrics import span
 
 class ContentProcessor:
-    def __init__(self, wordpress_integration=None):
+    def __init__(self, wordpress_integration=None, markdown_backend=None):
         self.setup_logging()
         self.adsense_script = ADSENSE_SCRIPT
-        # Use the provided WordPress integration or create a new one
-        self.wordpress = wordpress_integration or WordPressIntegration()
+        # Shared per-process converter for the configured markdown backend
+        self.markdown_converter = get_converter(markdown_backend)
+        # Optional: only needed to upload images that are passed as file paths.
+        # Rendering itself works on pre-resolved media descriptors ({'id', 'url'}).
+        self.wordpress = wordpress_integration
         self.logger.info("ContentProcessor initialized")
 
     def setup_logging(self):
@@ -29,38 +32,61 @@ class ContentProcessor:
         """Convert markdown content to HTML"""
         try:
             # Convert markdown to HTML
-            html_content = markdown2.markdown(
-                markdown_content,
-                extras=['tables', 'fenced-code-blocks', 'break-on-newline']
-            )
+            with span('markdown') as stage:
+                html_content = self.markdown_converter.convert(markdown_content)
+                stage.add(nbytes=len(html_content))
             return html_content
         except Exception as e:
-            self.logger.error(f"Error converting markdown to HTML: {str(e)}")
+            self.logger.error("Error converting markdown to HTML: %s", e)
             raise
 
-    def insert_images(self, html_content, image_paths):
-        """Insert images into the HTML content with proper structure"""
+    def resolve_media(self, images):
+        """Return media descriptors ({'id', 'url'}) for the given images
+
+        Descriptors are passed through unchanged. File paths and image buffers are
+        uploaded through the WordPress integration when one was provided, otherwise
+        they are skipped.
+        """
+        image_data = []
+        for image in images:
+            if isinstance(image, dict):
+                if image.get('url'):
+                    image_data.append(image)
+                else:
+                    self.logger.error("Media descriptor without URL: %s", image)
+                continue
+
+            if not self.wordpress:
+                self.logger.error("Cannot upload image without a WordPress integration: %s", image)
+                continue
+
+            try:
+                if isinstance(image, str) and not os.path.exists(image):
+                    self.logger.error("Image file not found: %s", image)
+                    continue
+
+                media_data = self.wordpress.upload_media(image)
+                if media_data:
+                    image_data.append(media_data)
+                    self.logger.info("Successfully uploaded and added image: %s", image)
+            except Exception as e:
+                self.logger.error("Error uploading image %s: %s", image, e)
+                continue
+        return image_data
+
+    def insert_images(self, html_content, media):
+        """Insert images into the HTML content with proper structure
+
+        media is a list of media descriptors ({'id', 'url'}) as returned by
+        WordPressIntegration.upload_media. File paths are still accepted and are
+        uploaded first when the processor has a WordPress integration.
+        """
         try:
-            if not image_paths:
+            if not media:
                 self.logger.warning("No images provided for insertion")
                 return html_content
 
-            # Upload images to WordPress and get their URLs
-            image_data = []
-            for img_path in image_paths:
-                try:
-                    if not os.path.exists(img_path):
-                        self.logger.error(f"Image file not found: {img_path}")
-                        continue
-
-                    media_data = self.wordpress.upload_media(img_path)
-                    if media_data:
-                        image_data.append(media_data)
-                        self.logger.info(f"Successfully uploaded and added image: {img_path}")
-                except Exception as e:
-                    self.logger.error(f"Error uploading image {img_path}: {str(e)}")
-                    continue
-
+            image_data = self.resolve_media(media)
             if not image_data:
                 self.logger.warning("No images were successfully uploaded")
                 return html_content
@@ -117,10 +143,10 @@ class ContentProcessor:
                     new_content.append(self.adsense_script)
 
             html_content = ''.join(new_content)
-            self.logger.info(f"Successfully inserted {len(image_data)} images into content")
+            self.logger.info("Successfully inserted %s images into content", len(image_data))
             return html_content
         except Exception as e:
-            self.logger.error(f"Error inserting images: {str(e)}")
+            self.logger.error("Error inserting images: %s", e)
             return html_content
 
     def add_required_elements(self, html_content, required_elements):
@@ -130,7 +156,7 @@ class ContentProcessor:
             for element in required_elements:
                 if element in REQUIRED_ELEMENTS:
                     if REQUIRED_ELEMENTS[element] not in html_content:
-                        self.logger.info(f"Adding {element} to content")
+                        self.logger.info("Adding %s to content", element)
                         if element == 'table':
                             html_content += self._create_sample_table()
                         elif element == 'bullet_points':
@@ -142,7 +168,7 @@ class ContentProcessor:
 
             return html_content
         except Exception as e:
-            self.logger.error(f"Error adding required elements: {str(e)}")
+            self.logger.error("Error adding required elements: %s", e)
             raise
 
     def _create_sample_table(self):
@@ -209,5 +235,42 @@ class ContentProcessor:
             self.logger.info("Successfully inserted AdSense into content")
             return html_content
         except Exception as e:
-            self.logger.error(f"Error inserting AdSense: {str(e)}")
-            return html_content
\ No newline at end of file
+            self.logger.error("Error inserting AdSense: %s", e)
+            return html_content
+
+    def render_post(self, markdown_content, media=None, required_elements=None):
+        """Render the final post HTML from markdown and pre-resolved media
+
+        required_elements is a list of REQUIRED_ELEMENTS names or the comma
+        separated 'must have elements' of a sheet row. This is a pure CPU stage:
+        with media descriptors it makes no network calls.
+        """
+        html_content = self.convert_markdown_to_html(markdown_content)
+        self.logger.info("Converted markdown to HTML")
+
+        with span('html_assembly'):
+            if isinstance(required_elements, str):
+                required_elements = [elem.strip() for elem in required_elements.split(',') if elem.strip()]
+            if required_elements:
+                self.logger.info("Adding required elements: %s", required_elements)
+                html_content = self.add_required_elements(html_content, required_elements)
+            if media:
+                html_content = self.insert_images(html_content, media)
+            return self.insert_adsense(html_content)
+
+
+_process_content_processors = {}
+
+
+def render_post(markdown_content, media=None, required_elements=None, markdown_backend=None):
+    """Module-level rendering entry point for process pools
+
+    Keeps one ContentProcessor per markdown backend in each worker process so
+    the converter is built once. Arguments and result are plain strings, lists
+    and dicts.
+    """
+    content_processor = _process_content_processors.get(markdown_backend)
+    if content_processor is None:
+        content_processor = ContentProcessor(markdown_backend=markdown_backend)
+        _process_content_processors[markdown_backend] = content_processor
+    return content_processor.render_post(markdown_content, media, required_elements)
@@ -0,0 +1,117 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from config.config import DRAFT_WORKERS, PUBLISH_DATE, PUBLISH_RETRIES
+from .wordpress_batch import MAX_BATCH_SIZE, batch_item_error
+from .metrics import submit_in_context
+
+RETRY_DELAY = 2  # Seconds before the first retry, doubled for each further attempt
+
+
+class DraftPublisher:
+    """Two-phase publishing: posts are created as drafts, then published together
+
+    create_post() starts creating a draft in a worker thread and returns right
+    away, so drafts are created in parallel while later posts are still being
+    rendered. flush() waits for the drafts and moves all of them to 'publish'
+    (or schedules them for publish_date) in bulk, through the REST batch endpoint
+    when the site supports it. Changing the status of an existing draft is
+    idempotent, so failed transitions are retried without creating duplicate
+    live posts; posts that still fail stay drafts.
+
+    Like BatchPublisher, create_post() returns a Future of the post ID. It
+    resolves once the post is published, i.e. during flush().
+    """
+
+    def __init__(self, wordpress, max_workers=DRAFT_WORKERS, publish_date=PUBLISH_DATE, retries=PUBLISH_RETRIES):
+        self.setup_logging()
+        self.wordpress = wordpress
+        self.publish_date = publish_date
+        self.retries = retries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='draft')
+        self._drafts = []  # (title, draft future, publication future)
+        self._lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def create_post(self, title, content, featured_media=None, slug=None):
+        """Start creating a draft and return a Future of the post ID once it is published"""
+        publication = Future()
+        draft = submit_in_context(self._executor, self.wordpress.create_post, title, content, featured_media, 'draft', slug)
+        with self._lock:
+            self._drafts.append((title, draft, publication))
+        return publication
+
+    def _publish_fields(self):
+        fields = {'status': 'publish'}
+        if self.publish_date:
+            # WordPress turns a published post with a future date into a scheduled one
+            fields['date'] = self.publish_date
+        return fields
+
+    def flush(self):
+        """Wait for the queued drafts and publish all of them"""
+        with self._lock:
+            drafts, self._drafts = self._drafts, []
+
+        pending = {}  # post ID -> (title, publication future)
+        for title, draft, publication in drafts:
+            try:
+                pending[draft.result()] = (title, publication)
+            except Exception as e:
+                publication.set_exception(e)
+        if not pending:
+            return
+
+        fields = self._publish_fields()
+        drafted = len(pending)
+        failed = {}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.logger.warning("Retrying publication of %s drafts (attempt %s)", len(pending), attempt + 1)
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+            failed = self._transition(list(pending), fields)
+            for post_id in list(pending):
+                if post_id not in failed:
+                    pending.pop(post_id)[1].set_result(post_id)
+            if not pending:
+                break
+
+        for post_id, (title, publication) in pending.items():
+            self.logger.error("Post %r stays a draft (ID: %s): %s", title, post_id, failed[post_id])
+            publication.set_exception(failed[post_id])
+
+        action = f"scheduled for {self.publish_date}" if self.publish_date else "published"
+        self.logger.info("%s of %s drafts %s", drafted - len(pending), drafted, action)
+
+    def _transition(self, post_ids, fields):
+        """Apply fields to every post, returning {post ID: error} for the posts that failed"""
+        failed = {}
+        if not self.wordpress.supports_batch():
+            for post_id in post_ids:
+                try:
+                    self.wordpress.update_post(post_id, **fields)
+                except Exception as e:
+                    failed[post_id] = e
+            return failed
+
+        for start in range(0, len(post_ids), MAX_BATCH_SIZE):
+            group = post_ids[start:start + MAX_BATCH_SIZE]
+            batch = [{'method': 'POST', 'path': f'/wp/v2/posts/{post_id}', 'body': fields} for post_id in group]
+            try:
+                responses = self.wordpress.batch_request(batch)
+            except Exception as e:
+                failed.update((post_id, e) for post_id in group)
+                continue
+            for post_id, response in zip(group, responses):
+                error = batch_item_error(response)
+                if error is not None:
+                    failed[post_id] = error
+        return failed
+
+    def close(self):
+        """Publish the remaining drafts and stop the worker threads"""
+        self.flush()
+        self._executor.shutdown(wait=True)
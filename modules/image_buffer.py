@@ -0,0 +1,42 @@
+import io
+import os
+import mimetypes
+
+
+class ImageBuffer:
+    """An image held in memory: its encoded bytes plus the file name to upload it as
+
+    Used instead of file paths when TEMP_STORAGE_MODE is 'memory', so images go
+    from the download buffer to the upload request without touching disk.
+    """
+
+    def __init__(self, data, filename, mime_type=None):
+        self.data = data
+        self.filename = filename
+        self.mime_type = mime_type or mimetypes.guess_type(filename)[0] or 'image/jpeg'
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def open(self):
+        """Return a binary file object over the data (BytesIO shares the bytes until written)"""
+        return io.BytesIO(self.data)
+
+    def __repr__(self):
+        return f"<ImageBuffer {self.filename} ({self.size} bytes)>"
+
+
+def open_image(image):
+    """Open an image file path or ImageBuffer with PIL"""
+    from PIL import Image
+    if isinstance(image, ImageBuffer):
+        return Image.open(image.open())
+    return Image.open(image)
+
+
+def image_name(image):
+    """File name of an image path or ImageBuffer, for logs and uploads"""
+    if isinstance(image, ImageBuffer):
+        return image.filename
+    return os.path.basename(image)
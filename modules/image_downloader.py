@@ -0,0 +1,85 @@
+import os
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from config.config import IMAGE_DOWNLOAD_TIMEOUT, IMAGE_DOWNLOAD_WORKERS
+from .image_buffer import ImageBuffer
+from .metrics import span, submit_in_context
+
+
+class ImageDownloader:
+    """Downloads image URLs concurrently, validating and de-duplicating them before saving"""
+
+    def __init__(self, timeout=IMAGE_DOWNLOAD_TIMEOUT, max_workers=IMAGE_DOWNLOAD_WORKERS, session=None):
+        self.setup_logging()
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = session or requests.Session()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def fetch(self, url):
+        """Download one URL and return its bytes, or None on failure"""
+        with span('image_download') as stage:
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                stage.add(nbytes=len(response.content))
+                return response.content
+            except Exception as e:
+                stage.status = 'error'
+                self.logger.warning("Failed to download image %s: %s", url, e)
+                return None
+
+    def download(self, urls, dest_dir, name_prefix, duplicate_filter=None):
+        """Download images into dest_dir and return the saved paths in URL order
+
+        Images are decoded once to validate them and to check for near-duplicates,
+        then written with their original bytes (no re-encode). With dest_dir=None
+        nothing is written and ImageBuffer objects are returned instead of paths.
+        """
+        if not urls:
+            return self.save([], [], dest_dir, name_prefix)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(urls)))) as executor:
+            contents = [future.result() for future in [submit_in_context(executor, self.fetch, url) for url in urls]]
+        return self.save(urls, contents, dest_dir, name_prefix, duplicate_filter)
+
+    def save(self, urls, contents, dest_dir, name_prefix, duplicate_filter=None):
+        """Validate downloaded contents (None for failed URLs) and save them as download() does"""
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        if not urls:
+            return []
+
+        # Decoding and duplicate checks run in URL order so the first copy wins
+        from PIL import Image
+        saved_paths = []
+        for index, (url, content) in enumerate(zip(urls, contents)):
+            if not content:
+                continue
+            try:
+                with Image.open(io.BytesIO(content)) as image:
+                    image_format = (image.format or 'jpeg').lower()
+                    if duplicate_filter is None:
+                        image.verify()
+                    elif duplicate_filter.is_duplicate(image, url):
+                        continue
+            except Exception as e:
+                self.logger.warning("Skipping invalid image %s: %s", url, e)
+                continue
+
+            ext = 'jpg' if image_format == 'jpeg' else image_format
+            filename = f"{name_prefix}{index}.{ext}"
+            if not dest_dir:
+                saved_paths.append(ImageBuffer(content, filename))
+                continue
+            image_path = os.path.join(dest_dir, filename)
+            with open(image_path, 'wb') as f:
+                f.write(content)
+            saved_paths.append(image_path)
+
+        self.logger.info("Downloaded %s of %s images to %s", len(saved_paths), len(urls), dest_dir or 'memory')
+        return saved_paths
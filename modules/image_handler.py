@@ -1,116 +1,395 @@
 import os
 import time
+import shutil
+import asyncio
+import itertools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import requests
-from PIL import Image
-from io import BytesIO
 from config.config import (
     DEFAULT_IMAGE_PATH,
-    IMAGE_DOWNLOAD_PATH
+    IMAGE_DOWNLOAD_PATH,
+    IMAGE_PREPROCESS_ENABLED,
+    PUBLISHED_IMAGE_INDEX_PATH,
+    IMAGE_SEARCH_BACKENDS,
+    LOCAL_IMAGE_LIBRARY_MODE,
+    LOCAL_IMAGE_INDEX_WAIT,
+    IMAGE_SEARCH_WORKERS,
+    TEMP_STORAGE_MODE
 )
 import sys
 # Add the parent directory of the current file to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from .GoogleImageScraper import GoogleImageScraper
+
+from .image_sources import ImageSourceChain, HttpImageSource, SeleniumImageSource
+from .image_downloader import ImageDownloader
+from .image_library import LocalImageLibrary
+from .metrics import span, submit_in_context
+from .temp_storage import TempStorage
+from .image_buffer import ImageBuffer, image_name
+from .image_preprocessor import ImagePreprocessor
+from .chromedriver import resolve_chromedriver, WEBDRIVER_DIR
+
+# Searches whose image URLs are kept, least recently used first out
+URL_CACHE_SIZE = 256
+
 
 class ImageHandler:
+    """Image subsystem: search (local library, HTTP, Selenium), download, de-duplicate,
+    preprocess and featured image selection
+
+    Chrome is only started by the first search that actually needs the Selenium
+    source. Searches can run in the background with submit_search() or be awaited
+    with search_and_download_images_async().
+
+    Downloaded images live in a per-run workspace (see TempStorage) that is removed
+    by end_run()/close() or when the run_scope() context exits. With
+    TEMP_STORAGE_MODE = 'memory' images are returned as ImageBuffers instead of
+    file paths and never written to disk.
+    """
+
     def __init__(self, temp_dir=IMAGE_DOWNLOAD_PATH):
-        self.temp_dir = temp_dir
         self.default_dir = DEFAULT_IMAGE_PATH
         self.logger = logging.getLogger(__name__)
-        os.makedirs(temp_dir, exist_ok=True)
+        self.storage = TempStorage(root=temp_dir)
+        self.temp_dir = self.storage.root
+        self.in_memory = TEMP_STORAGE_MODE == 'memory'
+        self.workspace = None
+        self._workspace_lock = threading.Lock()
+        self._search_ids = itertools.count(1)
         os.makedirs(DEFAULT_IMAGE_PATH, exist_ok=True)
+        self.preprocessor = ImagePreprocessor() if IMAGE_PREPROCESS_ENABLED else None
+        # The scorer and the hash index need numpy, which is only imported once images are handled
+        self.scorer = None
+        self.published_index = None
+        if PUBLISHED_IMAGE_INDEX_PATH:
+            from .image_hashing import PublishedImageIndex
+            self.published_index = PublishedImageIndex(PUBLISHED_IMAGE_INDEX_PATH)
         
-        # Initialize Google Image Scraper
-        self.webdriver_path = os.path.join(os.path.dirname(__file__), 'webdriver', 'chromedriver')
-        
-        # Check if ChromeDriver exists
-        if not os.path.exists(self.webdriver_path):
-            self.logger.error("ChromeDriver not found at: %s", self.webdriver_path)
-            self.webdriver_path = None
-
-    def search_google_images(self, search_query, num_images=5):
-        """Search images using Google Image Scraper"""
-        if not self.webdriver_path:
-            self.logger.warning("ChromeDriver not available, skipping Google Images search")
+        # ChromeDriver for the selenium source, resolved once per process and cached per Chrome version
+        self.webdriver_path = None
+        if SeleniumImageSource.name in IMAGE_SEARCH_BACKENDS:
+            self.webdriver_path = resolve_chromedriver()
+            if not self.webdriver_path:
+                self.logger.error("ChromeDriver not found in %s and could not be downloaded", WEBDRIVER_DIR)
+
+        self.image_sources = self._create_image_sources()
+        self.downloader = ImageDownloader()
+
+        # Scan the local image library in the background so lookups are instant later
+        self.library = None
+        if LOCAL_IMAGE_LIBRARY_MODE != 'off':
+            self.library = LocalImageLibrary(root=DEFAULT_IMAGE_PATH)
+            self.library.start_indexing()
+
+        # Background searches (created on first use) and URLs already found per query
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._url_cache = OrderedDict()
+        self._url_cache_lock = threading.Lock()
+
+    def _create_image_sources(self):
+        """Build the image source chain from IMAGE_SEARCH_BACKENDS"""
+        sources = []
+        for backend in IMAGE_SEARCH_BACKENDS:
+            if backend == HttpImageSource.name:
+                sources.append(HttpImageSource())
+            elif backend == SeleniumImageSource.name:
+                if self.webdriver_path:
+                    sources.append(SeleniumImageSource(self.webdriver_path, self.temp_dir))
+                else:
+                    self.logger.warning("ChromeDriver not available, selenium image source disabled")
+            else:
+                self.logger.error("Unknown image search backend: %s", backend)
+        return ImageSourceChain(sources)
+
+    def start_run(self, run_id=None):
+        """Create the working directory for this run's images"""
+        with self._workspace_lock:
+            if self.workspace is None:
+                self.workspace = self.storage.start_run(run_id)
+            return self.workspace
+
+    def end_run(self):
+        """Delete the working directory of the current run"""
+        with self._workspace_lock:
+            workspace, self.workspace = self.workspace, None
+        if workspace is not None:
+            workspace.close()
+
+    @contextmanager
+    def run_scope(self, run_id=None):
+        """Context manager around start_run()/end_run()"""
+        workspace = self.start_run(run_id)
+        try:
+            yield workspace
+        finally:
+            self.end_run()
+
+    def _new_search_dir(self, search_query):
+        """Create a directory of the run workspace for one search (None in memory mode)"""
+        if self.in_memory:
+            return None
+        name = ''.join(e if e.isalnum() else '_' for e in search_query)[:60]
+        return self.start_run().subdir(f"{next(self._search_ids):04d}-{name}")
+
+    def release_images(self, image_paths):
+        """Delete images (and their search directories) once they have been published"""
+        workspace = self.workspace
+        if workspace is None:
+            return
+        for search_dir in {os.path.dirname(p) for p in image_paths if not isinstance(p, ImageBuffer)}:
+            workspace.release(search_dir)
+
+    def find_image_urls(self, search_query, num_images=5):
+        """Image URLs for a query from the configured image sources, as ([urls], source name)"""
+        key = (search_query, num_images)
+        # Searches run in background threads, so the cache is shared between them
+        with self._url_cache_lock:
+            cached = self._url_cache.get(key)
+            if cached:
+                self._url_cache.move_to_end(key)
+                return cached
+        with span('image_search'):
+            image_urls, source_name = self.image_sources.search(search_query, num_images)
+        if image_urls:
+            with self._url_cache_lock:
+                self._url_cache[key] = (image_urls, source_name)
+                self._url_cache.move_to_end(key)
+                while len(self._url_cache) > URL_CACHE_SIZE:
+                    self._url_cache.popitem(last=False)
+        return image_urls, source_name
+
+    def _download_arguments(self, search_query, search_dir):
+        """(search dir, file name prefix, duplicate filter) of a download for a search"""
+        # Reject near-duplicates within this search and of already published images
+        from .image_hashing import DuplicateFilter
+        duplicate_filter = DuplicateFilter(published_index=self.published_index)
+        search_dir = search_dir or self._new_search_dir(search_query)
+        name_prefix = ''.join(e for e in search_query if e.isalnum())
+        return search_dir, name_prefix, duplicate_filter
+
+    def search_google_images(self, search_query, num_images=5, search_dir=None):
+        """Search images through the configured image sources and download them"""
+        try:
+            image_urls, source_name = self.find_image_urls(search_query, num_images)
+            if not image_urls:
+                return []
+
+            search_dir, name_prefix, duplicate_filter = self._download_arguments(search_query, search_dir)
+            self.logger.info("Downloading %s images found by '%s'", len(image_urls), source_name)
+            image_paths = self.downloader.download(image_urls, search_dir, name_prefix, duplicate_filter=duplicate_filter)
+            self.storage.enforce_quota()
+            return image_paths
+
+        except Exception as e:
+            self.logger.error("Error in Google image search: %s", e)
             return []
-            
+
+    async def search_google_images_async(self, search_query, num_images=5, search_dir=None, downloader=None):
+        """search_google_images with the downloads made by an AsyncImageDownloader on the event loop"""
         try:
-            # Create a new scraper instance for each search
-            google_scraper = GoogleImageScraper(
-                webdriver_path=self.webdriver_path,
-                image_path=self.temp_dir,
-                search_key=search_query,
-                number_of_images=num_images,
-                headless=True,
-                min_resolution=(0, 0),  # Accept any resolution
-                max_resolution=(3840, 2160)  # Up to 4K resolution
-            )
-            
-            image_urls = google_scraper.find_image_urls()
+            image_urls, source_name = await asyncio.to_thread(self.find_image_urls, search_query, num_images)
             if not image_urls:
                 return []
-                
-            # Save images and get their paths
-            google_scraper.save_images(image_urls, keep_filenames=False)
-            
-            # Get the saved image paths
-            search_dir = os.path.join(self.temp_dir, search_query)
-            if not os.path.exists(search_dir):
+
+            search_dir, name_prefix, duplicate_filter = await asyncio.to_thread(
+                self._download_arguments, search_query, search_dir
+            )
+            self.logger.info("Downloading %s images found by '%s'", len(image_urls), source_name)
+            image_paths = await downloader.download(image_urls, search_dir, name_prefix, duplicate_filter=duplicate_filter)
+            await asyncio.to_thread(self.storage.enforce_quota)
+            return image_paths
+
+        except Exception as e:
+            self.logger.error("Error in Google image search: %s", e)
+            return []
+
+    def get_source_metrics(self):
+        """Latency and success-rate metrics per image source"""
+        return self.image_sources.get_metrics()
+
+    def log_source_metrics(self):
+        """Log the metrics of the image sources that were searched"""
+        for name, source_metrics in self.get_source_metrics().items():
+            if source_metrics['calls']:
+                self.logger.info(
+                    "Image source '%s': %s searches, %.0f%% with images, %s empty, %s failed, avg %.2fs, max %.2fs",
+                    name, source_metrics['calls'], source_metrics['success_rate'] * 100, source_metrics['empty'],
+                    source_metrics['failures'], source_metrics['avg_latency'], source_metrics['max_latency']
+                )
+
+    def search_local_library(self, search_query, num_images=5, search_dir=None):
+        """Find matching images in the local library and copy them into the temp directory
+
+        Copies (or in-memory buffers) are returned so preprocessing never modifies
+        the library itself.
+        """
+        if not self.library:
+            return []
+        try:
+            if not self.library.wait_ready(LOCAL_IMAGE_INDEX_WAIT):
+                self.logger.warning("Local image library is still being indexed")
+                return []
+
+            library_paths = self.library.search(search_query, num_images)
+            if not library_paths:
                 return []
-                
-            # Accept all image files
-            return [os.path.join(search_dir, f) 
-                   for f in os.listdir(search_dir)
-                   if os.path.isfile(os.path.join(search_dir, f))]
-                   
+
+            search_dir = search_dir or self._new_search_dir(search_query)
+            image_paths = []
+            for library_path in library_paths:
+                try:
+                    if self.in_memory:
+                        with open(library_path, 'rb') as f:
+                            image_paths.append(ImageBuffer(f.read(), f"library_{os.path.basename(library_path)}"))
+                        continue
+                    image_path = os.path.join(search_dir, f"library_{os.path.basename(library_path)}")
+                    shutil.copyfile(library_path, image_path)
+                    image_paths.append(image_path)
+                except FileNotFoundError:
+                    # Deleted after the search; the other images are still used
+                    self.library.forget(library_path)
+            if image_paths:
+                self.logger.info("Found %s images in the local image library", len(image_paths))
+            return image_paths
         except Exception as e:
-            self.logger.error(f"Error in Google image search: {str(e)}")
+            self.logger.error("Error searching local image library: %s", e)
             return []
 
     def search_and_download_images(self, topic, keywords, num_images=5):
-        """Search and download images using Google Image Scraper"""
+        """Search and download images from the local library and the configured image sources"""
+        try:
+            search_query = f"{topic} {keywords}"
+            self.logger.info("Searching for images with query: %s", search_query)
+
+            search_dir = self._new_search_dir(search_query)
+            image_paths = []
+            if LOCAL_IMAGE_LIBRARY_MODE == 'first':
+                image_paths = self.search_local_library(search_query, num_images, search_dir)
+
+            # Search for images on the web
+            if not image_paths:
+                image_paths = self.search_google_images(search_query, num_images, search_dir)
+
+            if not image_paths and LOCAL_IMAGE_LIBRARY_MODE == 'fallback':
+                self.logger.info("No images found on the web, falling back to the local image library")
+                image_paths = self.search_local_library(search_query, num_images, search_dir)
+
+            if not image_paths:
+                self.logger.warning("No images found from Google Images or the local image library")
+                return []
+
+            # Resize and recompress before anything is uploaded
+            if self.preprocessor:
+                image_paths = self.preprocessor.process_images(image_paths)
+
+            return image_paths
+
+        except Exception as e:
+            self.logger.error("Error in image search: %s", e)
+            return []
+
+    def submit_search(self, topic, keywords, num_images=5):
+        """Run search_and_download_images in the background and return a Future"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=IMAGE_SEARCH_WORKERS, thread_name_prefix='image-search')
+        return submit_in_context(self._executor, self.search_and_download_images, topic, keywords, num_images)
+
+    async def search_and_download_images_async(self, topic, keywords, num_images=5, downloader=None):
+        """Awaitable version of search_and_download_images
+
+        With an AsyncImageDownloader (modules/async_clients.py) the images are
+        downloaded on the event loop and only the source search, library copies
+        and preprocessing use threads; without one the whole search runs in the
+        background pool of submit_search().
+        """
+        if downloader is None:
+            return await asyncio.wrap_future(self.submit_search(topic, keywords, num_images))
         try:
             search_query = f"{topic} {keywords}"
-            self.logger.info(f"Searching for images with query: {search_query}")
+            self.logger.info("Searching for images with query: %s", search_query)
+
+            search_dir = self._new_search_dir(search_query)
+            image_paths = []
+            if LOCAL_IMAGE_LIBRARY_MODE == 'first':
+                image_paths = await asyncio.to_thread(self.search_local_library, search_query, num_images, search_dir)
 
-            # Search for images using Google Image Scraper
-            image_paths = self.search_google_images(search_query, num_images)
-            
             if not image_paths:
-                self.logger.warning("No images found from Google Images")
+                image_paths = await self.search_google_images_async(search_query, num_images, search_dir, downloader)
+
+            if not image_paths and LOCAL_IMAGE_LIBRARY_MODE == 'fallback':
+                self.logger.info("No images found on the web, falling back to the local image library")
+                image_paths = await asyncio.to_thread(self.search_local_library, search_query, num_images, search_dir)
+
+            if not image_paths:
+                self.logger.warning("No images found from Google Images or the local image library")
                 return []
 
+            if self.preprocessor:
+                image_paths = await asyncio.to_thread(self.preprocessor.process_images, image_paths)
+
             return image_paths
 
         except Exception as e:
-            self.logger.error(f"Error in image search: {str(e)}")
+            self.logger.error("Error in image search: %s", e)
             return []
 
     def select_featured_image(self, images):
         """Select the most suitable image as featured image"""
         if not images:
             return None
-        
-        # For now, just return the first image
-        # In a more sophisticated implementation, you could analyze images
-        # to select the most suitable one based on size, aspect ratio, etc.
+
+        # Score resolution, aspect ratio fit, sharpness, colorfulness and contrast
+        try:
+            if self.scorer is None:
+                from .image_scorer import ImageScorer
+                self.scorer = ImageScorer()
+            best = self.scorer.select_best(images)
+            if best:
+                return best
+        except Exception as e:
+            self.logger.error("Error scoring featured image candidates: %s", e)
+
         return images[0]
 
-    def cleanup(self):
-        """Clean up resources"""
+    def record_published(self, image_paths, post_id=None):
+        """Add published images to the persistent hash index so later runs skip them"""
+        if not self.published_index:
+            return
+        from .image_hashing import compute_hash
+        for image_path in image_paths:
+            try:
+                self.published_index.add(compute_hash(image_path), path=image_name(image_path), post_id=post_id)
+            except Exception as e:
+                self.logger.error("Error indexing published image %s: %s", image_path, e)
         try:
-            # Clean up temporary files
-            for file in os.listdir(self.temp_dir):
-                file_path = os.path.join(self.temp_dir, file)
-                try:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                except Exception as e:
-                    self.logger.error(f"Error deleting file {file_path}: {str(e)}")
+            self.published_index.save()
         except Exception as e:
-            self.logger.error(f"Error in cleanup: {str(e)}")
+            self.logger.error("Error saving published image index: %s", e)
+
+    def close(self):
+        """Stop background searches, the preprocessing workers and the browser, if started, and end the run"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.log_source_metrics()
+        self.image_sources.close()
+        if self.preprocessor:
+            self.preprocessor.close()
+        self.end_run()
 
-    def __del__(self):
-        """Destructor to ensure cleanup"""
-        self.cleanup() 
\ No newline at end of file
+    def cleanup(self):
+        """Remove all temporary images, including leftovers of earlier runs; active runs keep theirs"""
+        self.end_run()
+        try:
+            for name in os.listdir(self.temp_dir):
+                if name != '.gitkeep':
+                    self.storage.evict(os.path.join(self.temp_dir, name))
+        except Exception as e:
+            self.logger.error("Error in cleanup: %s", e)
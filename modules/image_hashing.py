@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from PIL import Image
+from config.config import IMAGE_HASH_ALGORITHM, IMAGE_DUPLICATE_THRESHOLD
+from .image_buffer import ImageBuffer, open_image
+
+HASH_SIZE = 8  # 8x8 bits -> 64-bit hashes
+PHASH_IMAGE_SIZE = 32  # pHash takes the DCT of a 32x32 grayscale image
+
+
+def _gray_array(image, size):
+    """Convert a PIL image to a float grayscale array of the given (width, height)"""
+    return np.asarray(image.convert('L').resize(size, Image.BILINEAR), dtype=np.float32)
+
+
+def _bits_to_int(bits):
+    """Pack a boolean array into an integer hash"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis matrix"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_IMAGE_SIZE)
+
+
+def average_hash(image):
+    """aHash: pixels of an 8x8 thumbnail compared to their mean"""
+    pixels = _gray_array(image, (HASH_SIZE, HASH_SIZE))
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def difference_hash(image):
+    """dHash: horizontal gradient signs of a 9x8 thumbnail"""
+    pixels = _gray_array(image, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def perceptual_hash(image):
+    """pHash: low-frequency 8x8 DCT coefficients of a 32x32 thumbnail compared to their median"""
+    pixels = _gray_array(image, (PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE))
+    dct = _DCT @ pixels @ _DCT.T
+    low = dct[:HASH_SIZE, :HASH_SIZE]
+    # The DC term only reflects overall brightness, so leave it out of the median
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+HASH_FUNCTIONS = {
+    'ahash': average_hash,
+    'dhash': difference_hash,
+    'phash': perceptual_hash,
+}
+
+
+def compute_hash(image, algorithm=IMAGE_HASH_ALGORITHM):
+    """Compute the 64-bit hash of a PIL image, image file path or ImageBuffer with the given algorithm"""
+    if algorithm not in HASH_FUNCTIONS:
+        raise ValueError(f"Unknown image hash algorithm: {algorithm}. Use one of: {', '.join(HASH_FUNCTIONS)}")
+    if isinstance(image, (str, ImageBuffer)):
+        with open_image(image) as opened:
+            return HASH_FUNCTIONS[algorithm](opened)
+    return HASH_FUNCTIONS[algorithm](image)
+
+
+def hamming_distance(hash_a, hash_b):
+    """Number of differing bits between two hashes"""
+    return bin(hash_a ^ hash_b).count('1')
+
+
+def _distances(hashes, image_hash):
+    """Hamming distances from image_hash to every hash in a uint64 array"""
+    xored = np.bitwise_xor(hashes, np.uint64(image_hash))
+    return np.unpackbits(xored.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+class PublishedImageIndex:
+    """Persistent index of hashes of images already published on the site"""
+
+    def __init__(self, index_path, algorithm=IMAGE_HASH_ALGORITHM):
+        self.setup_logging()
+        self.index_path = index_path
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._entries = None
+        self._hashes = None
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        entries = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    data = json.load(f)
+                if data.get('algorithm') == self.algorithm:
+                    entries = data.get('images', {})
+                else:
+                    self.logger.warning("Ignoring image index %s built with %s", self.index_path, data.get('algorithm'))
+            except Exception as e:
+                self.logger.error("Error loading image index %s: %s", self.index_path, e)
+        self._entries = entries
+        self._hashes = np.array([int(h, 16) for h in entries], dtype=np.uint64)
+
+    def find(self, image_hash, threshold=IMAGE_DUPLICATE_THRESHOLD):
+        """Return the entry of a published image within threshold bits, or None"""
+        with self._lock:
+            self._load()
+            if not len(self._hashes):
+                return None
+            distances = _distances(self._hashes, image_hash)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] > threshold:
+                return None
+            return self._entries[format(int(self._hashes[nearest]), '016x')]
+
+    def add(self, image_hash, **info):
+        """Record a published image; call save() to persist"""
+        with self._lock:
+            self._load()
+            key = format(image_hash, '016x')
+            if key not in self._entries:
+                self._hashes = np.append(self._hashes, np.uint64(image_hash))
+            self._entries[key] = dict(info, added=int(time.time()))
+
+    def save(self):
+        """Write the index atomically"""
+        with self._lock:
+            if self._entries is None:
+                return
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'algorithm': self.algorithm, 'images': self._entries}, f)
+            os.replace(tmp_path, self.index_path)
+
+
+class DuplicateFilter:
+    """Rejects near-duplicate images within one post and, optionally, against published images"""
+
+    def __init__(self, threshold=IMAGE_DUPLICATE_THRESHOLD, algorithm=IMAGE_HASH_ALGORITHM, published_index=None):
+        self.setup_logging()
+        self.threshold = threshold
+        self.algorithm = algorithm
+        self.published_index = published_index
+        self.seen = []  # (hash, label) of accepted images
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def is_duplicate(self, image, label=None):
+        """Hash the image and return True if it duplicates one already accepted or published
+
+        Accepted images are remembered so later near-duplicates are rejected.
+        """
+        image_hash = compute_hash(image, self.algorithm)
+
+        for seen_hash, seen_label in self.seen:
+            if hamming_distance(image_hash, seen_hash) <= self.threshold:
+                self.logger.info("Skipping near-duplicate image %s (matches %s)", label, seen_label)
+                return True
+
+        if self.published_index is not None:
+            published = self.published_index.find(image_hash, self.threshold)
+            if published is not None:
+                self.logger.info("Skipping image %s already published with post %s", label, published.get('post_id'))
+                return True
+
+        self.seen.append((image_hash, label))
+        return False
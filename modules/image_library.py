@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from config.config import (
+    DEFAULT_IMAGE_PATH,
+    LOCAL_IMAGE_INDEX_PATH,
+    ALLOWED_IMAGE_EXTENSIONS,
+    IMAGE_DUPLICATE_THRESHOLD
+)
+
+INDEX_VERSION = 1
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Generic words that would match almost any file or query
+STOP_WORDS = {'a', 'an', 'and', 'the', 'of', 'for', 'in', 'on', 'to', 'with', 'img', 'image', 'photo', 'jpg', 'jpeg', 'png', 'webp'}
+
+
+def tokenize(text):
+    """Split text into lowercase search tokens, dropping stop words, numbers and plurals"""
+    tokens = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOP_WORDS or token.isdigit() or len(token) < 2:
+            continue
+        # Light stemming so "batteries"/"battery" and "cars"/"car" match
+        if token.endswith('ies') and len(token) > 4:
+            token = token[:-3] + 'y'
+        elif token.endswith('s') and not token.endswith('ss') and len(token) > 3:
+            token = token[:-1]
+        tokens.add(token)
+    return tokens
+
+
+class LocalImageLibrary:
+    """Keyword-searchable index of the local image library (DEFAULT_IMAGE_PATH)
+
+    Tags come from the directory names and file name of each image, plus an optional
+    sidecar text file next to it (photo.jpg -> photo.txt) with extra comma separated
+    tags. The index is stored in index_path and refreshed by a background scan that
+    only re-reads new or modified files.
+    """
+
+    def __init__(self, root=DEFAULT_IMAGE_PATH, index_path=LOCAL_IMAGE_INDEX_PATH):
+        self.setup_logging()
+        self.root = root
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.entries = {}
+        self.inverted = {}
+        self._load_index()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load_index(self):
+        """Load the stored index so queries can be answered before the scan finishes"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self._set_entries(data.get('images', {}))
+                self._ready.set()
+        except Exception as e:
+            self.logger.error("Error loading image library index %s: %s", self.index_path, e)
+
+    def _set_entries(self, entries):
+        inverted = {}
+        for rel_path, entry in entries.items():
+            for tag in entry['tags']:
+                inverted.setdefault(tag, set()).add(rel_path)
+        with self._lock:
+            self.entries = entries
+            self.inverted = inverted
+
+    def forget(self, path):
+        """Drop an image that no longer exists (path as returned by search) from the index"""
+        rel_path = os.path.relpath(path, self.root)
+        with self._lock:
+            entry = self.entries.get(rel_path)
+            if entry is None:
+                return
+            entries = dict(self.entries)
+            del entries[rel_path]
+            self.entries = entries
+            for tag in entry['tags']:
+                paths = self.inverted.get(tag)
+                if paths:
+                    paths.discard(rel_path)
+        self.logger.warning("Library image %s is missing, removed it from the index", path)
+        self._save_index(entries)
+
+    def start_indexing(self):
+        """Scan the library in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._index, name='image-library-indexer', daemon=True)
+        self._thread.start()
+
+    def wait_ready(self, timeout=None):
+        """Wait until an index (stored or freshly scanned) is available"""
+        return self._ready.wait(timeout)
+
+    def _index_image(self, path, rel_path, stat):
+        """Build the index entry of one image"""
+        from PIL import Image
+        from .image_hashing import compute_hash
+        tags = tokenize(os.path.splitext(rel_path)[0].replace(os.sep, ' '))
+        sidecar = os.path.splitext(path)[0] + '.txt'
+        if os.path.exists(sidecar):
+            with open(sidecar, 'r', encoding='utf-8', errors='ignore') as f:
+                tags |= tokenize(f.read())
+
+        with Image.open(path) as image:
+            width, height = image.size
+            phash = compute_hash(image, 'phash')
+
+        return {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'width': width,
+            'height': height,
+            'tags': sorted(tags),
+            'phash': format(phash, '016x'),
+        }
+
+    def _index(self):
+        start = time.perf_counter()
+        with self._lock:
+            previous = dict(self.entries)
+        entries = {}
+        updated = 0
+
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                if os.path.splitext(filename)[1].lower() not in ALLOWED_IMAGE_EXTENSIONS:
+                    continue
+                path = os.path.join(directory, filename)
+                rel_path = os.path.relpath(path, self.root)
+                try:
+                    stat = os.stat(path)
+                    entry = previous.get(rel_path)
+                    if not entry or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                        entry = self._index_image(path, rel_path, stat)
+                        updated += 1
+                    entries[rel_path] = entry
+                except Exception as e:
+                    self.logger.warning("Cannot index library image %s: %s", path, e)
+
+        self._set_entries(entries)
+        self._ready.set()
+
+        if updated or len(entries) != len(previous):
+            self._save_index(entries)
+        self.logger.info("Indexed %s library images (%s new or changed) in %.2fs",
+                         len(entries), updated, time.perf_counter() - start)
+
+    def _save_index(self, entries):
+        try:
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Scans and forget() may save at the same time, in this process or another one
+            tmp_path = f"{self.index_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'root': self.root, 'images': entries}, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            self.logger.error("Error saving image library index %s: %s", self.index_path, e)
+
+    def search(self, query, num_images=5):
+        """Return paths of the library images that best match the query keywords
+
+        Images are ranked by the number of matching tags, then by resolution.
+        Near-duplicates of an image already selected and images that no longer
+        exist are left out.
+        """
+        from .image_hashing import hamming_distance
+        tokens = tokenize(query)
+        with self._lock:
+            scores = {}
+            for token in tokens:
+                for rel_path in self.inverted.get(token, ()):
+                    scores[rel_path] = scores.get(rel_path, 0) + 1
+            ranked = sorted(
+                scores,
+                key=lambda p: (scores[p], self.entries[p]['width'] * self.entries[p]['height']),
+                reverse=True
+            )
+            candidates = [(p, int(self.entries[p]['phash'], 16)) for p in ranked]
+
+        results, selected_hashes = [], []
+        for rel_path, phash in candidates:
+            if any(hamming_distance(phash, h) <= IMAGE_DUPLICATE_THRESHOLD for h in selected_hashes):
+                continue
+            path = os.path.join(self.root, rel_path)
+            # The stored index may list images deleted since the last scan
+            if not os.path.exists(path):
+                self.forget(path)
+                continue
+            results.append(path)
+            selected_hashes.append(phash)
+            if len(results) >= num_images:
+                break
+        return results
@@ -0,0 +1,206 @@
+import os
+import io
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .image_buffer import ImageBuffer
+from config.config import (
+    IMAGE_MAX_WIDTH,
+    IMAGE_OUTPUT_FORMAT,
+    IMAGE_QUALITY,
+    IMAGE_TARGET_BYTES,
+    IMAGE_PREPROCESS_WORKERS
+)
+
+# Pillow format name and file extension for each supported output format
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'webp': ('WEBP', '.webp'),
+    'avif': ('AVIF', '.avif'),
+}
+
+# Lowest quality tried when searching for a quality that meets the byte target
+MIN_TARGET_QUALITY = 35
+
+
+def _encode(image, pil_format, quality):
+    """Encode the image in memory and return the bytes"""
+    buffer = io.BytesIO()
+    if pil_format == 'JPEG':
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    elif pil_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    else:
+        image.save(buffer, pil_format, quality=quality)
+    return buffer.getvalue()
+
+
+def _encode_to_target(image, pil_format, quality, target_bytes):
+    """Encode at the given quality, lowering it (binary search) until the output fits target_bytes"""
+    data = _encode(image, pil_format, quality)
+    if not target_bytes or len(data) <= target_bytes:
+        return data
+
+    low, high = MIN_TARGET_QUALITY, quality - 1
+    best = None
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = _encode(image, pil_format, mid)
+        if len(candidate) <= target_bytes:
+            best = candidate
+            low = mid + 1
+        else:
+            high = mid - 1
+    # If even the lowest quality is too large, ship the smallest encoding we made
+    return best or _encode(image, pil_format, MIN_TARGET_QUALITY)
+
+
+def encode_for_upload(image_file, max_width=IMAGE_MAX_WIDTH, output_format=IMAGE_OUTPUT_FORMAT,
+                      quality=IMAGE_QUALITY, target_bytes=IMAGE_TARGET_BYTES):
+    """Downsize, strip metadata and re-encode an image, returning (bytes, file extension)"""
+    from PIL import Image, ImageOps
+    pil_format, ext = OUTPUT_FORMATS[output_format]
+
+    with Image.open(image_file) as source:
+        # Apply EXIF orientation before the metadata is dropped
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    if pil_format == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    # Drop EXIF, ICC profiles, comments etc. so they are not written back
+    image.info = {}
+
+    if max_width and image.width > max_width:
+        height = max(1, round(image.height * max_width / image.width))
+        image = image.resize((max_width, height), Image.LANCZOS)
+
+    return _encode_to_target(image, pil_format, quality, target_bytes), ext
+
+
+def preprocess_image(image, **options):
+    """Preprocess one image file path or ImageBuffer
+
+    Module-level so it can be submitted to a process pool. A file is replaced by
+    the encoded one and its new path returned; a buffer yields a new ImageBuffer.
+    """
+    if isinstance(image, ImageBuffer):
+        data, ext = encode_for_upload(image.open(), **options)
+        return ImageBuffer(data, os.path.splitext(image.filename)[0] + ext)
+
+    data, ext = encode_for_upload(image, **options)
+    output_path = os.path.splitext(image)[0] + ext
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    if os.path.abspath(output_path) != os.path.abspath(image):
+        os.remove(image)
+    return output_path
+
+
+def _image_size(image):
+    if isinstance(image, ImageBuffer):
+        return image.size
+    return os.path.getsize(image) if os.path.exists(image) else 0
+
+
+class ImagePreprocessor:
+    """Prepares downloaded images for upload: resize, strip metadata and recompress
+
+    Batches of several images are encoded in a process pool that is started on
+    first use and kept until close(). Its workers are spawned rather than
+    forked, since the caller runs download and browser threads.
+    """
+
+    def __init__(self, max_width=IMAGE_MAX_WIDTH, output_format=IMAGE_OUTPUT_FORMAT,
+                 quality=IMAGE_QUALITY, target_bytes=IMAGE_TARGET_BYTES, max_workers=IMAGE_PREPROCESS_WORKERS):
+        self.setup_logging()
+        self.output_format = self._check_format(output_format)
+        self.max_width = max_width
+        self.quality = quality
+        self.target_bytes = target_bytes
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _check_format(self, output_format):
+        """Validate the output format and fall back to JPEG if this Pillow cannot encode it"""
+        output_format = (output_format or 'jpeg').lower()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported image output format: {output_format}. Use one of: {', '.join(OUTPUT_FORMATS)}")
+
+        if output_format in ('webp', 'avif'):
+            from PIL import features
+            if not features.check(output_format):
+                self.logger.warning("Pillow was built without %s support, using jpeg instead", output_format)
+                return 'jpeg'
+        return output_format
+
+    def _options(self):
+        return {
+            'max_width': self.max_width,
+            'output_format': self.output_format,
+            'quality': self.quality,
+            'target_bytes': self.target_bytes,
+        }
+
+    def process_images(self, image_paths):
+        """Preprocess images and return the results in the same order; a single image is processed inline
+
+        Accepts file paths and ImageBuffers. Images that fail to process are kept as they are.
+        """
+        if not image_paths:
+            return []
+
+        options = self._options()
+        before = sum(_image_size(p) for p in image_paths)
+        results = list(image_paths)
+
+        try:
+            if self.max_workers > 1 and len(image_paths) > 1:
+                futures = [self._get_pool().submit(preprocess_image, path, **options) for path in image_paths]
+                for i, future in enumerate(futures):
+                    try:
+                        results[i] = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        self.logger.error("Error preprocessing image %s: %s", image_paths[i], e)
+            else:
+                for i, path in enumerate(image_paths):
+                    try:
+                        results[i] = preprocess_image(path, **options)
+                    except Exception as e:
+                        self.logger.error("Error preprocessing image %s: %s", path, e)
+        except Exception as e:
+            # e.g. the pool cannot be started in this environment or a worker died; keep whatever
+            # was processed and start a new pool next time
+            self.logger.error("Image preprocessing pool failed: %s", e)
+            self.close()
+
+        after = sum(_image_size(p) for p in results)
+        self.logger.info("Preprocessed %s images: %.0f KB -> %.0f KB", len(image_paths), before / 1024, after / 1024)
+        return results
@@ -0,0 +1,121 @@
+import time
+import logging
+import numpy as np
+from PIL import Image
+from config.config import FEATURED_IMAGE_SIZE
+from .image_buffer import open_image
+
+# Candidates are decoded at reduced size and resampled to SCORING_SIZE x SCORING_SIZE
+# so the whole batch can be scored as one (N, S, S, 3) array.
+SCORING_SIZE = 128
+
+# Relative weight of each criterion in the final score
+SCORE_WEIGHTS = {
+    'resolution': 0.35,
+    'aspect': 0.25,
+    'sharpness': 0.2,
+    'colorfulness': 0.1,
+    'contrast': 0.1,
+}
+
+# Scale constants for the saturating normalizations below (values on 0-255 pixels)
+SHARPNESS_SCALE = 300.0  # Laplacian variance at which sharpness scores ~0.63
+COLORFULNESS_SCALE = 100.0  # Hasler-Suesstrunk colorfulness of a very colorful photo
+CONTRAST_SCALE = 64.0  # Grayscale standard deviation of a well exposed photo
+
+
+class ImageScorer:
+    """Scores candidate featured images on size, shape, sharpness, color and contrast"""
+
+    def __init__(self, featured_size=FEATURED_IMAGE_SIZE, weights=None):
+        self.setup_logging()
+        self.featured_size = featured_size
+        self.weights = weights or SCORE_WEIGHTS
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self, image_path):
+        """Decode one image (path or ImageBuffer) at reduced size and return (original size, RGB array)"""
+        with open_image(image_path) as image:
+            original_size = image.size
+            # Let the JPEG decoder downscale by up to 8x while decoding
+            image.draft('RGB', (SCORING_SIZE * 2, SCORING_SIZE * 2))
+            image = image.convert('RGB').resize((SCORING_SIZE, SCORING_SIZE), Image.BILINEAR)
+            return original_size, np.asarray(image, dtype=np.float32)
+
+    def load_batch(self, image_paths):
+        """Load candidates, returning the usable paths, their original sizes and a pixel batch"""
+        paths, sizes, arrays = [], [], []
+        for image_path in image_paths:
+            try:
+                size, array = self._load(image_path)
+            except Exception as e:
+                self.logger.warning("Cannot score image %s: %s", image_path, e)
+                continue
+            paths.append(image_path)
+            sizes.append(size)
+            arrays.append(array)
+        if not arrays:
+            return [], np.empty((0, 2)), np.empty((0, SCORING_SIZE, SCORING_SIZE, 3), dtype=np.float32)
+        return paths, np.asarray(sizes, dtype=np.float64), np.stack(arrays)
+
+    def compute_metrics(self, sizes, pixels):
+        """Compute the raw per-image metrics for a batch
+
+        sizes is an (N, 2) array of original (width, height), pixels an (N, S, S, 3) array.
+        """
+        red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        gray = 0.299 * red + 0.587 * green + 0.114 * blue
+
+        # 4-neighbour Laplacian over the interior of every image at once
+        laplacian = (gray[:, :-2, 1:-1] + gray[:, 2:, 1:-1] + gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:]
+                     - 4.0 * gray[:, 1:-1, 1:-1])
+
+        # Hasler & Suesstrunk colorfulness
+        rg = red - green
+        yb = 0.5 * (red + green) - blue
+        colorfulness = (np.sqrt(rg.std(axis=(1, 2)) ** 2 + yb.std(axis=(1, 2)) ** 2)
+                        + 0.3 * np.sqrt(rg.mean(axis=(1, 2)) ** 2 + yb.mean(axis=(1, 2)) ** 2))
+
+        featured_width, featured_height = self.featured_size
+        widths, heights = sizes[:, 0], sizes[:, 1]
+        return {
+            'resolution': np.minimum(1.0, (widths * heights) / float(featured_width * featured_height)),
+            'aspect': np.exp(-np.abs(np.log((widths / heights) / (featured_width / featured_height)))),
+            'sharpness': laplacian.var(axis=(1, 2)),
+            'colorfulness': colorfulness,
+            'contrast': gray.std(axis=(1, 2)),
+        }
+
+    def score_metrics(self, metrics):
+        """Combine raw metrics into one 0-1 score per image"""
+        normalized = {
+            'resolution': metrics['resolution'],
+            'aspect': metrics['aspect'],
+            'sharpness': 1.0 - np.exp(-metrics['sharpness'] / SHARPNESS_SCALE),
+            'colorfulness': np.minimum(1.0, metrics['colorfulness'] / COLORFULNESS_SCALE),
+            'contrast': np.minimum(1.0, metrics['contrast'] / CONTRAST_SCALE),
+        }
+        total_weight = sum(self.weights.values())
+        return sum(self.weights[name] * normalized[name] for name in self.weights) / total_weight
+
+    def score_images(self, image_paths):
+        """Score all candidates in one batch, returning (paths, scores)"""
+        paths, sizes, pixels = self.load_batch(image_paths)
+        if not paths:
+            return [], np.empty(0)
+        return paths, self.score_metrics(self.compute_metrics(sizes, pixels))
+
+    def select_best(self, image_paths):
+        """Return the best scoring image, or None if none could be decoded"""
+        start = time.perf_counter()
+        paths, scores = self.score_images(image_paths)
+        if not paths:
+            return None
+
+        best = int(np.argmax(scores))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.logger.info("Selected featured image %s (score %.2f) from %s candidates in %.1f ms",
+                         paths[best], scores[best], len(paths), elapsed_ms)
+        return paths[best]
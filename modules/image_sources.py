@@ -0,0 +1,259 @@
+import re
+import json
+import time
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+import requests
+from config.config import IMAGE_SEARCH_URL, IMAGE_SEARCH_TIMEOUT, CHROME_LEAN_PROFILE
+from .metrics import span
+
+# Full-size results are embedded in the results page scripts as ["<url>",<height>,<width>]
+EMBEDDED_IMAGE_PATTERN = re.compile(r'\["(https?://[^"]+?)",(\d+),(\d+)\]')
+
+# Hosts that only serve Google's own thumbnails and page assets
+THUMBNAIL_HOSTS = ('gstatic.com', 'google.com')
+
+SEARCH_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'),
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+class ImageSource:
+    """Interface for backends that turn a search query into image URLs"""
+    name = None
+
+    def search(self, query, num_images):
+        """Return up to num_images image URLs for the query"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class HttpImageSource(ImageSource):
+    """Fetches the image search results page with requests and parses it with BeautifulSoup
+
+    search_url can point at any endpoint that takes q/tbm query parameters, e.g. a
+    local fixture server. JSON responses are accepted as a list of URLs or as
+    {"images": [{"url": ...}, ...]}.
+    """
+    name = 'http'
+
+    def __init__(self, search_url=IMAGE_SEARCH_URL, timeout=IMAGE_SEARCH_TIMEOUT, session=None):
+        self.setup_logging()
+        self.search_url = search_url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.update(SEARCH_HEADERS)
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def search(self, query, num_images):
+        response = self.session.get(
+            self.search_url,
+            params={'q': query, 'tbm': 'isch'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        if 'json' in response.headers.get('Content-Type', ''):
+            urls = self.parse_json(response.json())
+        else:
+            urls = self.parse_html(response.text)
+        return urls[:num_images]
+
+    def parse_json(self, data):
+        """Extract image URLs from a JSON search response"""
+        items = data.get('images', []) if isinstance(data, dict) else data
+        urls = [item.get('url') if isinstance(item, dict) else item for item in items]
+        return self._unique([url for url in urls if self._is_image_url(url)])
+
+    def parse_html(self, html):
+        """Extract full-size image URLs from a search results page"""
+        urls = []
+
+        # 1. Full-size results embedded in the page scripts
+        for match in EMBEDDED_IMAGE_PATTERN.finditer(html):
+            try:
+                # Undo the JSON string escaping (e.g. \u003d)
+                urls.append(json.loads(f'"{match.group(1)}"'))
+            except ValueError:
+                continue
+
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # 2. Classic result links: /imgres?imgurl=<full size url>
+        for link in soup.find_all('a', href=True):
+            if '/imgres' in link['href']:
+                imgurl = parse_qs(urlparse(link['href']).query).get('imgurl')
+                if imgurl:
+                    urls.append(imgurl[0])
+
+        # 3. Plain <img> tags (fixture pages and simplified result pages)
+        for img in soup.find_all('img'):
+            src = img.get('data-src') or img.get('src')
+            if src:
+                urls.append(src)
+
+        return self._unique([url for url in urls if self._is_image_url(url)])
+
+    def _is_image_url(self, url):
+        if not url or not url.startswith('http') or 'encrypted' in url:
+            return False
+        host = urlparse(url).netloc
+        return not any(host == h or host.endswith('.' + h) for h in THUMBNAIL_HOSTS)
+
+    def _unique(self, urls):
+        return list(dict.fromkeys(urls))
+
+
+class SeleniumImageSource(ImageSource):
+    """Drives Chrome through GoogleImageScraper to collect image URLs
+
+    The browser is only started by the first search and is then reused for later
+    searches until close() is called. Searches are serialized on the one browser.
+    With CHROME_LEAN_PROFILE it runs with the lean profile (see modules/chromedriver.py).
+    """
+    name = 'selenium'
+
+    def __init__(self, webdriver_path, image_path):
+        self.setup_logging()
+        self.webdriver_path = webdriver_path
+        self.image_path = image_path
+        self._driver = None
+        self._lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def search(self, query, num_images):
+        if not self.webdriver_path:
+            raise RuntimeError("ChromeDriver not available")
+
+        from .GoogleImageScraper import GoogleImageScraper
+        with self._lock:
+            if self._driver is None:
+                self.logger.info("Starting Chrome for image search")
+            google_scraper = GoogleImageScraper(
+                webdriver_path=self.webdriver_path,
+                image_path=self.image_path,
+                search_key=query,
+                number_of_images=num_images,
+                headless=True,
+                min_resolution=(0, 0),  # Accept any resolution
+                max_resolution=(3840, 2160),  # Up to 4K resolution
+                driver=self._driver,
+                lean_profile=CHROME_LEAN_PROFILE
+            )
+            self._driver = google_scraper.driver
+            # The scraper switches drivers when the browser version does not match
+            self.webdriver_path = google_scraper.webdriver_path
+            try:
+                return google_scraper.find_image_urls(quit_driver=False)
+            except Exception:
+                # The browser may be in a bad state; start a fresh one next time
+                self._quit_driver()
+                raise
+
+    def _quit_driver(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                self.logger.error("Error quitting Chrome: %s", e)
+            self._driver = None
+
+    def close(self):
+        with self._lock:
+            self._quit_driver()
+
+
+class ImageSourceMetrics:
+    """Latency and success counters for one image source"""
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.empty = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency, outcome):
+        self.calls += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if outcome == 'success':
+            self.successes += 1
+        elif outcome == 'empty':
+            self.empty += 1
+        else:
+            self.failures += 1
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'successes': self.successes,
+            'empty': self.empty,
+            'failures': self.failures,
+            'success_rate': self.successes / self.calls if self.calls else 0.0,
+            'avg_latency': self.total_latency / self.calls if self.calls else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+
+class ImageSourceChain:
+    """Tries image sources in order until one returns results, keeping per-source metrics
+
+    Every source call is also a search_<source> span, with status 'ok', 'empty'
+    or 'error', so the sources show up in the run summary and on /metrics.
+    """
+
+    def __init__(self, sources):
+        self.setup_logging()
+        self.sources = sources
+        self.metrics = {source.name: ImageSourceMetrics() for source in sources}
+        self._lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def search(self, query, num_images):
+        """Return (urls, source name) from the first source that finds images"""
+        for source in self.sources:
+            start = time.perf_counter()
+            with span(f"search_{source.name}") as stage:
+                try:
+                    urls = source.search(query, num_images)
+                    outcome = 'success' if urls else 'empty'
+                except Exception as e:
+                    self.logger.warning("Image source '%s' failed for '%s': %s", source.name, query, e)
+                    urls, outcome = [], 'failure'
+                stage.status = {'success': 'ok', 'empty': 'empty', 'failure': 'error'}[outcome]
+            latency = time.perf_counter() - start
+
+            with self._lock:
+                self.metrics[source.name].record(latency, outcome)
+
+            if urls:
+                self.logger.info("Image source '%s' found %s images in %.2fs", source.name, len(urls), latency)
+                return urls, source.name
+            self.logger.info("Image source '%s' found no images, trying next source", source.name)
+        return [], None
+
+    def get_metrics(self):
+        """Per-source metrics snapshot"""
+        with self._lock:
+            return {name: metrics.snapshot() for name, metrics in self.metrics.items()}
+
+    def close(self):
+        for source in self.sources:
+            try:
+                source.close()
+            except Exception as e:
+                self.logger.error("Error closing image source '%s': %s", source.name, e)
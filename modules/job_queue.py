@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import uuid
+import logging
+import sqlite3
+import threading
+from config.config import JOB_QUEUE_PATH, JOB_MAX_ATTEMPTS, WORKER_LEASE_SECONDS, WORKER_POLL_INTERVAL
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    settings TEXT NOT NULL,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs (run_id, status);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    post TEXT,
+    worker TEXT,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL,
+    time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_run ON events (run_id, id);
+'''
+
+EVENT_RETENTION = 7 * 24 * 3600  # Seconds progress events of finished runs are kept
+
+# Settings of a run that are removed from the queue file once the run is finished
+SECRET_SETTINGS = ('wordpress_password',)
+
+
+class JobQueue:
+    """Durable queue of post jobs in a SQLite file, shared by any number of processes
+
+    A run is created with its settings and one job per post. Workers claim the
+    oldest queued job with a lease they keep renewing while they work on it; a
+    job whose lease runs out (its worker died) is handed out again, and a job
+    failing JOB_MAX_ATTEMPTS times is marked failed. Workers add progress events
+    that the process that queued the run follows with follow().
+
+    Every thread gets its own connection; the database runs in WAL mode so
+    readers never wait for the writer.
+    """
+
+    def __init__(self, path=JOB_QUEUE_PATH, max_attempts=JOB_MAX_ATTEMPTS, lease_seconds=WORKER_LEASE_SECONDS):
+        self.setup_logging()
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        created = not os.path.exists(path)
+        self._connection().executescript(SCHEMA)
+        if created:
+            # The file holds WordPress credentials while runs are in progress
+            os.chmod(path, 0o600)
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, so a read-then-update cannot interleave with another writer"""
+        queue = self
+
+        class Transaction:
+            def __enter__(self):
+                self.connection = queue._connection()
+                self.connection.execute('BEGIN IMMEDIATE')
+                return self.connection
+
+            def __exit__(self, exc_type, exc, traceback):
+                self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+        return Transaction()
+
+    def create_run(self, settings, posts):
+        """Queue one job per post; returns the new run ID"""
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM events WHERE time < ? AND run_id IN (SELECT run_id FROM runs WHERE finished IS NOT NULL)',
+                               (now - EVENT_RETENTION,))
+            connection.execute('INSERT INTO runs (run_id, settings, created) VALUES (?, ?, ?)',
+                               (run_id, json.dumps(settings), now))
+            connection.executemany(
+                'INSERT INTO jobs (run_id, payload, created, updated) VALUES (?, ?, ?, ?)',
+                [(run_id, json.dumps(post), now, now) for post in posts]
+            )
+        return run_id
+
+    def run_settings(self, run_id):
+        row = self._connection().execute('SELECT settings FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        return json.loads(row['settings']) if row else None
+
+    def claim(self, worker):
+        """Lease the oldest job that is queued or whose worker stopped renewing its lease; returns it or None"""
+        now = time.time()
+        with self._transaction() as connection:
+            while True:
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) "
+                    "ORDER BY id LIMIT 1", (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row['status'] == 'running' and row['attempts'] >= self.max_attempts:
+                    connection.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                                       (f"Worker {row['worker']} stopped responding", now, row['id']))
+                    continue
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_expires = ?, "
+                    "updated = ? WHERE id = ?", (worker, now + self.lease_seconds, now, row['id'])
+                )
+                job = dict(row)
+                job['payload'] = json.loads(job['payload'])
+                job['attempts'] += 1
+                return job
+
+    def renew_lease(self, job_id, worker):
+        """Extend the lease of a job this worker holds; False if it was handed to another worker"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + self.lease_seconds, job_id, worker)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result=None):
+        """Mark a job this worker holds done; False if its lease ran out and it was handed to another worker"""
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated = ? "
+            "WHERE id = ? AND worker = ? AND status = 'running'", (json.dumps(result), time.time(), job_id, worker)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Queue a job this worker holds again, or mark it failed after max_attempts; returns its new status,
+        or None if its lease ran out and it was handed to another worker
+        """
+        with self._transaction() as connection:
+            row = connection.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                                     (job_id, worker)).fetchone()
+            if row is None:
+                return None
+            status = 'queued' if row['attempts'] < self.max_attempts else 'failed'
+            connection.execute('UPDATE jobs SET status = ?, error = ?, worker = NULL, updated = ? WHERE id = ?',
+                               (status, str(error), time.time(), job_id))
+        return status
+
+    def release(self, job_id, worker):
+        """Give a job this worker holds back without counting the attempt, e.g. when the worker shuts down"""
+        self._connection().execute(
+            "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), worker = NULL, updated = ? "
+            "WHERE id = ? AND worker = ? AND status = 'running'", (time.time(), job_id, worker)
+        )
+
+    def add_event(self, run_id, level, message, post=None, worker=None):
+        self._connection().execute(
+            'INSERT INTO events (run_id, post, worker, level, message, time) VALUES (?, ?, ?, ?, ?, ?)',
+            (run_id, post, worker, level, message, time.time())
+        )
+
+    def events(self, run_id, after_id=0):
+        """Progress events of a run with an ID above after_id, oldest first"""
+        rows = self._connection().execute('SELECT * FROM events WHERE run_id = ? AND id > ? ORDER BY id',
+                                          (run_id, after_id)).fetchall()
+        return [dict(row) for row in rows]
+
+    def run_counts(self, run_id):
+        """Number of jobs of a run per status"""
+        rows = self._connection().execute('SELECT status, COUNT(*) AS count FROM jobs WHERE run_id = ? GROUP BY status',
+                                          (run_id,)).fetchall()
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update({row['status']: row['count'] for row in rows})
+        return counts
+
+    def finish_run(self, run_id):
+        """Mark a run finished and drop its credentials from the queue file"""
+        settings = self.run_settings(run_id) or {}
+        for name in SECRET_SETTINGS:
+            settings.pop(name, None)
+        self._connection().execute('UPDATE runs SET settings = ?, finished = ? WHERE run_id = ?',
+                                   (json.dumps(settings), time.time(), run_id))
+
+    def follow(self, run_id, poll_interval=WORKER_POLL_INTERVAL):
+        """Yield the progress events of a run as workers add them, until none of its jobs is left to do"""
+        last_id = 0
+        finished = False
+        while True:
+            counts = self.run_counts(run_id)
+            for event in self.events(run_id, last_id):
+                last_id = event['id']
+                yield event
+            if finished:
+                return
+            # Workers write events from their log listener thread, so the last ones can land
+            # just after the job's status; read once more after the run is done
+            finished = not counts['queued'] and not counts['running']
+            time.sleep(poll_interval)
+
+
+def publish_with_workers(posts, settings, logger, wait=True, job_queue=None):
+    """Queue the posts for the workers and relay their progress to logger until all are done
+
+    Returns the run ID. With wait=False it returns right after queueing and the
+    run's credentials stay in the queue file until JobQueue.finish_run() is called.
+    """
+    job_queue = job_queue or JobQueue()
+    run_id = job_queue.create_run(settings, posts)
+    logger.info("Queued %s posts for the workers (run %s); start them with: python -m modules.worker",
+                len(posts), run_id)
+    if not wait:
+        return run_id
+
+    try:
+        for event in job_queue.follow(run_id):
+            logger.log(logging.getLevelName(event['level']), "[%s] %s", event['worker'], event['message'])
+    finally:
+        job_queue.finish_run(run_id)
+    counts = job_queue.run_counts(run_id)
+    logger.info("Workers published %s of %s posts (%s failed)", counts['done'], len(posts), counts['failed'])
+    return run_id
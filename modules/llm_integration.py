@@ -1,12 +1,30 @@
 import requests
 import logging
 from config.config import OLLAMA_URL, MODEL_NAME
+from modules.metrics import span
+
+CONNECTION_ERROR = "Could not connect to Ollama. Please make sure Ollama is running and Gemma model is installed."
+TIMEOUT_ERROR = "Request to Ollama timed out. Please try again."
+
+# (note, advice) of the placeholder article returned when generation fails
+FALLBACK_CONNECTION = (
+    "This content was generated as a fallback because Ollama could not be reached. "
+    "Please ensure Ollama is running with the Gemma model installed.",
+    "Please start Ollama and try again to generate a complete article."
+)
+FALLBACK_TIMEOUT = (
+    "This content was generated as a fallback because the request to Ollama timed out.",
+    "Please try again to generate a complete article."
+)
+FALLBACK_ERROR_ADVICE = "Please check the logs and try again to generate a complete article."
 
 class LLMIntegration:
     def __init__(self):
         self.setup_logging()
         self.base_url = OLLAMA_URL
         self.model_name = MODEL_NAME
+        # Token counts and timings reported by Ollama for the last generation
+        self.last_usage = None
 
     def setup_logging(self):
         self.logger = logging.getLogger(__name__)
@@ -19,22 +37,14 @@ class LLMIntegration:
         text = text.strip().strip('"\'')
         return text
 
-    def generate_content(self, title, topic, keywords, context, word_count=1000):
-        """Generate blog content using Gemma 3"""
-        try:
-            # Clean and format inputs
-            title = self.clean_text(title)
-            topic = self.clean_text(topic)
-            keywords = self.clean_text(keywords)
-            context = self.clean_text(context)
-
-            # Calculate word count range
-            word_count = int(word_count)  # Ensure word_count is an integer
-            min_words = max(500, int(word_count * 0.8))
-            max_words = int(word_count * 1.2)
+    def build_prompt(self, title, topic, keywords, context, word_count=1000):
+        """Prompt for a blog post on already cleaned inputs"""
+        # Calculate word count range
+        word_count = int(word_count)  # Ensure word_count is an integer
+        min_words = max(500, int(word_count * 0.8))
+        max_words = int(word_count * 1.2)
 
-            # Construct the prompt
-            prompt = f"""You are a professional content writer specializing in electric vehicles. Write a detailed, informative blog post with the following specifications:
+        return f"""You are a professional content writer specializing in electric vehicles. Write a detailed, informative blog post with the following specifications:
 
 Title: {title}
 Main Topic: {topic}
@@ -53,37 +63,46 @@ Requirements:
 
 Format the response in markdown with appropriate headings, bullet points, and paragraphs."""
 
-            # Make request to Ollama
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "max_tokens": 2000
-                    }
-                },
-                timeout=60  # Increased timeout for longer responses
-            )
-            response.raise_for_status()
-
-            # Get the generated content
-            content = response.json().get('response', '')
-            if not content:
-                raise ValueError("Empty response from Gemma")
-
-            self.logger.info("Successfully generated content using Gemma")
-            return content
-        except requests.exceptions.ConnectionError:
-            error_msg = "Could not connect to Ollama. Please make sure Ollama is running and Gemma model is installed."
-            self.logger.error(error_msg)
-            # Return a fallback message instead of raising an exception
-            return f"""# {title}
-
-*Note: This content was generated as a fallback because Ollama could not be reached. Please ensure Ollama is running with the Gemma model installed.*
+    def request_body(self, prompt):
+        """JSON body of an Ollama /api/generate request"""
+        return {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "max_tokens": 2000
+            }
+        }
+
+    def read_result(self, result, nbytes, stage):
+        """Record the usage of an Ollama response on the span and return the generated content"""
+        # Durations are reported in nanoseconds
+        self.last_usage = {
+            'prompt_tokens': result.get('prompt_eval_count', 0),
+            'completion_tokens': result.get('eval_count', 0),
+            'eval_seconds': result.get('eval_duration', 0) / 1e9,
+        }
+        stage.add(nbytes=nbytes, tokens=self.last_usage['prompt_tokens'] + self.last_usage['completion_tokens'])
+
+        # Get the generated content
+        content = result.get('response', '')
+        if not content:
+            raise ValueError("Empty response from Gemma")
+
+        eval_seconds = self.last_usage['eval_seconds']
+        if eval_seconds:
+            tokens = self.last_usage['completion_tokens']
+            self.logger.info("Generated %s tokens at %.1f tokens/s", tokens, tokens / eval_seconds)
+        self.logger.info("Successfully generated content using Gemma")
+        return content
+
+    def fallback_content(self, title, topic, keywords, context, note, advice):
+        """Placeholder article returned instead of raising when generation fails"""
+        return f"""# {title}
+
+*Note: {note}*
 
 ## About {topic}
 
@@ -92,35 +111,36 @@ This is a placeholder article about {topic}. The actual article would include in
 - {keywords}
 - {context}
 
-Please start Ollama and try again to generate a complete article."""
-        except requests.exceptions.Timeout:
-            error_msg = "Request to Ollama timed out. Please try again."
-            self.logger.error(error_msg)
-            # Return a fallback message instead of raising an exception
-            return f"""# {title}
-
-*Note: This content was generated as a fallback because the request to Ollama timed out.*
+{advice}"""
 
-## About {topic}
-
-This is a placeholder article about {topic}. The actual article would include information about:
-
-- {keywords}
-- {context}
+    def generate_content(self, title, topic, keywords, context, word_count=1000):
+        """Generate blog content using Gemma 3"""
+        try:
+            # Clean and format inputs
+            title = self.clean_text(title)
+            topic = self.clean_text(topic)
+            keywords = self.clean_text(keywords)
+            context = self.clean_text(context)
+            prompt = self.build_prompt(title, topic, keywords, context, word_count)
 
-Please try again to generate a complete article."""
-        except Exception as e:
-            self.logger.error(f"Error generating content with Gemma: {str(e)}")
+            # Make request to Ollama
+            with span('generate') as stage:
+                response = requests.post(
+                    f"{self.base_url}/api/generate",
+                    json=self.request_body(prompt),
+                    timeout=60  # Increased timeout for longer responses
+                )
+                response.raise_for_status()
+                return self.read_result(response.json(), len(response.content), stage)
+        except requests.exceptions.ConnectionError:
+            self.logger.error(CONNECTION_ERROR)
             # Return a fallback message instead of raising an exception
-            return f"""# {title}
-
-*Note: This content was generated as a fallback due to an error: {str(e)}*
-
-## About {topic}
-
-This is a placeholder article about {topic}. The actual article would include information about:
-
-- {keywords}
-- {context}
-
-Please check the logs and try again to generate a complete article."""
\ No newline at end of file
+            return self.fallback_content(title, topic, keywords, context, *FALLBACK_CONNECTION)
+        except requests.exceptions.Timeout:
+            self.logger.error(TIMEOUT_ERROR)
+            return self.fallback_content(title, topic, keywords, context, *FALLBACK_TIMEOUT)
+        except Exception as e:
+            self.logger.error("Error generating content with Gemma: %s", e)
+            return self.fallback_content(title, topic, keywords, context,
+                                         f"This content was generated as a fallback due to an error: {str(e)}",
+                                         FALLBACK_ERROR_ADVICE)
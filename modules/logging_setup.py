@@ -0,0 +1,107 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from config.config import LOG_FILE, LOG_LEVEL, LOG_FORMAT
+from .metrics import current_run, current_stage, current_post
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Records are queued by the logging thread and written by the listener thread
+_queue = queue.SimpleQueue()
+_listener = None
+_lock = threading.Lock()
+
+
+class ContextFilter(logging.Filter):
+    """Add run_id, post_id and stage of the emitting context to every record
+
+    Runs in the thread that logs, before the record is queued, so the values are
+    those of the run, post and span the record was logged from.
+    """
+
+    def filter(self, record):
+        run = current_run.get()
+        record.run_id = run.run_id if run is not None else None
+        record.post_id = current_post.get()
+        record.stage = current_stage.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+            'post_id': getattr(record, 'post_id', None),
+            'stage': getattr(record, 'stage', None),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def default_handlers(log_file=LOG_FILE, log_format=LOG_FORMAT):
+    """File handler (text or JSON) and console handler"""
+    if os.path.dirname(log_file):
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.set_name('file')
+    file_handler.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+    stream_handler = logging.StreamHandler()
+    stream_handler.set_name('console')
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return [file_handler, stream_handler]
+
+
+def setup_logging(extra_handlers=(), level=LOG_LEVEL):
+    """Route all logging through a queue to a listener thread; safe to call more than once
+
+    The root logger gets a single QueueHandler, so logging calls only filter, merge
+    the message arguments and enqueue the record; formatting and I/O happen in the
+    listener thread. The file and console handlers are installed on the first call.
+    extra_handlers (e.g. the web interface log) are added once each, by name or
+    identity, so repeated calls and imports never duplicate output.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    with _lock:
+        handlers = list(_listener.handlers) if _listener else default_handlers()
+        names = {handler.get_name() for handler in handlers if handler.get_name()}
+        added = [handler for handler in extra_handlers
+                 if handler not in handlers and (not handler.get_name() or handler.get_name() not in names)]
+        if _listener is not None and not added:
+            return _listener
+        if _listener is not None:
+            _listener.stop()
+        _listener = logging.handlers.QueueListener(_queue, *(handlers + added), respect_handler_level=True)
+        _listener.start()
+
+        if not any(getattr(handler, 'queue', None) is _queue for handler in root.handlers):
+            queue_handler = logging.handlers.QueueHandler(_queue)
+            queue_handler.addFilter(ContextFilter())
+            root.addHandler(queue_handler)
+    return _listener
+
+
+def stop_logging():
+    """Write out the queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+# Registered after logging's own shutdown hook, so it runs first and nothing queued is lost
+atexit.register(stop_logging)
@@ -0,0 +1,107 @@
+import re
+import logging
+import threading
+from config.config import MARKDOWN_BACKEND
+
+# Extras used by the original markdown2 call. The other backends are configured
+# to produce the same constructs: GFM tables, fenced code blocks and hard line breaks.
+# highlightjs-lang keeps markdown2 from highlighting fenced blocks with Pygments
+# (<div class="codehilite">), so all backends emit <pre><code class="language-...">.
+MARKDOWN2_EXTRAS = ['tables', 'fenced-code-blocks', 'highlightjs-lang', 'break-on-newline']
+
+# highlightjs-lang names the language twice (class="python language-python")
+HIGHLIGHTJS_CODE_CLASS = re.compile(r'<code class="([^" ]+) language-\1">')
+
+logger = logging.getLogger(__name__)
+
+
+class MarkdownConverter:
+    """Base class for markdown to HTML backends"""
+    name = None
+
+    def convert(self, markdown_content):
+        """Convert markdown content to HTML"""
+        raise NotImplementedError
+
+
+class Markdown2Converter(MarkdownConverter):
+    """markdown2 backend that keeps one configured Markdown instance per thread"""
+    name = 'markdown2'
+
+    def __init__(self):
+        import markdown2
+        self._markdown2 = markdown2
+        # markdown2.Markdown keeps per-document state while converting, so the
+        # instance is shared per thread rather than across threads.
+        self._local = threading.local()
+
+    def _get_instance(self):
+        instance = getattr(self._local, 'instance', None)
+        if instance is None:
+            instance = self._markdown2.Markdown(extras=MARKDOWN2_EXTRAS)
+            self._local.instance = instance
+        return instance
+
+    def convert(self, markdown_content):
+        html = str(self._get_instance().convert(markdown_content))
+        return HIGHLIGHTJS_CODE_CLASS.sub(r'<code class="language-\1">', html)
+
+
+class MarkdownItConverter(MarkdownConverter):
+    """markdown-it-py backend (CommonMark with tables and hard line breaks)"""
+    name = 'markdown-it'
+
+    def __init__(self):
+        from markdown_it import MarkdownIt
+        # render() builds fresh parser state per call, so one instance is shared.
+        self._md = MarkdownIt('commonmark', {'html': True, 'breaks': True}).enable('table')
+
+    def convert(self, markdown_content):
+        return self._md.render(markdown_content)
+
+
+class MistuneConverter(MarkdownConverter):
+    """mistune backend with the table plugin and hard line breaks"""
+    name = 'mistune'
+
+    def __init__(self):
+        import mistune
+        self._md = mistune.create_markdown(escape=False, hard_wrap=True, plugins=['table'])
+
+    def convert(self, markdown_content):
+        return self._md(markdown_content)
+
+
+CONVERTER_BACKENDS = {
+    Markdown2Converter.name: Markdown2Converter,
+    MarkdownItConverter.name: MarkdownItConverter,
+    MistuneConverter.name: MistuneConverter,
+}
+
+_converters = {}
+_converters_lock = threading.RLock()
+
+
+def get_converter(backend=None):
+    """Return the process-wide converter instance for the given backend"""
+    backend = backend or MARKDOWN_BACKEND
+    converter = _converters.get(backend)
+    if converter is not None:
+        return converter
+
+    if backend not in CONVERTER_BACKENDS:
+        raise ValueError(f"Unknown markdown backend: {backend}. Available backends: {', '.join(CONVERTER_BACKENDS)}")
+
+    with _converters_lock:
+        converter = _converters.get(backend)
+        if converter is None:
+            try:
+                converter = CONVERTER_BACKENDS[backend]()
+            except ImportError as e:
+                if backend == Markdown2Converter.name:
+                    raise
+                logger.warning("Markdown backend '%s' is not installed (%s), falling back to markdown2", backend, e)
+                converter = get_converter(Markdown2Converter.name)
+            _converters[backend] = converter
+            logger.info("Using markdown backend: %s", converter.name)
+    return converter
@@ -0,0 +1,231 @@
+import math
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'blog_automation'
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# RunMetrics of the run executing in the current context. Worker threads see it
+# when their task is submitted with submit_in_context().
+current_run = contextvars.ContextVar('current_run', default=None)
+
+# RunProfiler of the current run when profiling is enabled (see modules/profiling.py)
+current_profiler = contextvars.ContextVar('current_profiler', default=None)
+
+# Innermost span and the post being processed in this context; added to log records
+# by modules/logging_setup.py
+current_stage = contextvars.ContextVar('current_stage', default=None)
+current_post = contextvars.ContextVar('current_post', default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of all stage spans, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}  # stage -> Histogram
+        self.calls = {}  # (stage, status) -> count
+        self.bytes = {}  # stage -> bytes
+        self.tokens = {}  # stage -> tokens
+
+    def observe(self, stage, duration, status='ok', nbytes=0, tokens=0):
+        with self._lock:
+            self.durations.setdefault(stage, Histogram()).observe(duration)
+            self.calls[(stage, status)] = self.calls.get((stage, status), 0) + 1
+            if nbytes:
+                self.bytes[stage] = self.bytes.get(stage, 0) + nbytes
+            if tokens:
+                self.tokens[stage] = self.tokens.get(stage, 0) + tokens
+
+    def render_prometheus(self):
+        """Text exposition of all metrics (format version 0.0.4)"""
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {name} Duration of pipeline stages.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self.durations.items()):
+                for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            name = f"{METRIC_PREFIX}_stage_calls_total"
+            lines += [f"# HELP {name} Completed pipeline stages by outcome.", f"# TYPE {name} counter"]
+            for (stage, status), count in sorted(self.calls.items()):
+                lines.append(f'{name}{{stage="{stage}",status="{status}"}} {count}')
+
+            for metric, values, help_text in (
+                ('stage_bytes_total', self.bytes, 'Bytes transferred or produced by pipeline stages.'),
+                ('stage_tokens_total', self.tokens, 'LLM tokens processed by pipeline stages.'),
+            ):
+                name = f"{METRIC_PREFIX}_{metric}"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for stage, value in sorted(values.items()):
+                    lines.append(f'{name}{{stage="{stage}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# RunMetrics of the most recently finished runs, newest last
+recent_runs = deque(maxlen=10)
+
+
+class Span:
+    """One timed stage; add() attaches byte and token counts before it ends"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.status = 'ok'
+        self.bytes = 0
+        self.tokens = 0
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def add(self, nbytes=0, tokens=0):
+        self.bytes += nbytes or 0
+        self.tokens += tokens or 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        registry.observe(self.stage, self.duration, self.status, self.bytes, self.tokens)
+        run = current_run.get()
+        if run is not None:
+            run.record(self)
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as a stage of the current run
+
+    The span is marked 'error' if the block raises; code that recovers from a
+    failure itself can set span.status.
+    """
+    current = Span(stage)
+    profiler = current_profiler.get()
+    sample = profiler.begin(stage) if profiler is not None else None
+    stage_token = current_stage.set(stage)
+    try:
+        yield current
+    except BaseException:
+        current.status = 'error'
+        raise
+    finally:
+        current_stage.reset(stage_token)
+        if sample is not None:
+            profiler.end(sample)
+        current.finish()
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit() that runs fn in a copy of the caller's context, so spans reach the caller's run"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RunMetrics:
+    """Spans of one run, summarized as a table when the run finishes"""
+
+    def __init__(self, run_id=None):
+        self.setup_logging()
+        self.run_id = run_id
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = {}  # stage -> {'durations', 'errors', 'bytes', 'tokens'}
+        self.duration = None  # Set by finish()
+        self._token = None
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def start_run(cls, run_id=None):
+        """Create the metrics of a run and make them current for this context"""
+        run = cls(run_id)
+        run._token = current_run.set(run)
+        return run
+
+    def record(self, finished_span):
+        with self._lock:
+            stage = self.stages.setdefault(finished_span.stage,
+                                           {'durations': [], 'errors': 0, 'bytes': 0, 'tokens': 0})
+            stage['durations'].append(finished_span.duration)
+            stage['errors'] += finished_span.status == 'error'
+            stage['bytes'] += finished_span.bytes
+            stage['tokens'] += finished_span.tokens
+
+    def stage_stats(self):
+        """Per-stage count, errors, total/p50/p95/max seconds, bytes and tokens"""
+        with self._lock:
+            stats = {}
+            for name, stage in self.stages.items():
+                durations = sorted(stage['durations'])
+                stats[name] = {
+                    'count': len(durations),
+                    'errors': stage['errors'],
+                    'total': sum(durations),
+                    'p50': percentile(durations, 0.5),
+                    'p95': percentile(durations, 0.95),
+                    'max': durations[-1],
+                    'bytes': stage['bytes'],
+                    'tokens': stage['tokens'],
+                }
+            return stats
+
+    def summary_table(self):
+        """Plain-text table of the run's stages, slowest total first"""
+        header = f"{'stage':<16}{'count':>7}{'errors':>8}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'KB':>10}{'tokens':>9}"
+        lines = [header, '-' * len(header)]
+        stats = self.stage_stats()
+        for name, stage in sorted(stats.items(), key=lambda item: -item[1]['total']):
+            lines.append(f"{name:<16}{stage['count']:>7}{stage['errors']:>8}{stage['total']:>10.2f}"
+                         f"{stage['p50']:>9.3f}{stage['p95']:>9.3f}{stage['max']:>9.3f}"
+                         f"{stage['bytes'] / 1024:>10.0f}{stage['tokens']:>9}")
+        lines.append(f"Run time: {self.duration or time.perf_counter() - self.start:.2f}s")
+        return '\n'.join(lines)
+
+    def finish(self):
+        """Log the summary table and stop collecting spans in this context"""
+        if self._token is not None:
+            current_run.reset(self._token)
+            self._token = None
+        self.duration = time.perf_counter() - self.start
+        recent_runs.append(self)
+        self.logger.info("Run summary%s:\n%s", f' ({self.run_id})' if self.run_id else '', self.summary_table())
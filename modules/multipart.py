@@ -0,0 +1,144 @@
+import io
+import os
+import time
+import uuid
+import logging
+
+# Size of each chunk read from the underlying file or buffer
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTimeout(TimeoutError):
+    """The upload body was not sent within the per-upload time limit"""
+
+
+class MultipartFileEncoder:
+    """Streams a multipart/form-data body with a single file field
+
+    Behaves as a read-only file object of known length, so requests sends it with
+    a Content-Length header and reads it in chunk_size pieces instead of building
+    the whole body in memory. The file part can be a file object, bytes or a
+    memoryview; in-memory data is sent as memoryview slices without copying.
+
+    progress_callback, if given, is called as progress_callback(bytes_sent, total).
+    If the whole body has not been read within timeout seconds, read() raises
+    UploadTimeout, which aborts the request.
+    """
+
+    def __init__(self, field_name, filename, data, mime_type, chunk_size=DEFAULT_CHUNK_SIZE,
+                 progress_callback=None, timeout=None):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.timeout = timeout
+        self._deadline = None
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f"Content-Type: {mime_type}\r\n\r\n"
+        ).encode('utf-8')
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode('utf-8')
+
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            self._data = memoryview(data).cast('B')
+            self._file = None
+            data_length = self._data.nbytes
+        else:
+            self._data = None
+            self._file = data
+            data_length = self._file_length(data)
+
+        self._parts = [memoryview(self._head), None, memoryview(self._tail)]
+        self._part_index = 0
+        self._offset = 0
+        self.len = len(self._head) + data_length + len(self._tail)
+        self.bytes_read = 0
+
+    def _file_length(self, file_obj):
+        """Remaining length of a seekable file object"""
+        try:
+            return os.fstat(file_obj.fileno()).st_size - file_obj.tell()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            position = file_obj.tell()
+            file_obj.seek(0, os.SEEK_END)
+            length = file_obj.tell() - position
+            file_obj.seek(position)
+            return length
+
+    def __len__(self):
+        return self.len
+
+    def _read_chunk(self, size):
+        """Return up to size bytes from the current part, moving to the next part when exhausted"""
+        while self._part_index < 3:
+            if self._part_index == 1:
+                if self._file is not None:
+                    chunk = self._file.read(size)
+                    if chunk:
+                        return chunk
+                else:
+                    chunk = self._data[self._offset:self._offset + size]
+                    if len(chunk):
+                        self._offset += len(chunk)
+                        return chunk
+            else:
+                part = self._parts[self._part_index]
+                chunk = part[self._offset:self._offset + size]
+                if len(chunk):
+                    self._offset += len(chunk)
+                    return chunk
+            self._part_index += 1
+            self._offset = 0
+        return b''
+
+    def read(self, size=-1):
+        """Read the next piece of the body (at most chunk_size bytes per call)"""
+        if self.timeout:
+            now = time.monotonic()
+            if self._deadline is None:
+                self._deadline = now + self.timeout
+            elif now > self._deadline:
+                raise UploadTimeout(f"Upload did not finish within {self.timeout} seconds")
+
+        if size is None or size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+        chunk = self._read_chunk(size)
+        if len(chunk):
+            self.bytes_read += len(chunk)
+            if self.progress_callback:
+                self.progress_callback(self.bytes_read, self.len)
+        # The socket layer accepts memoryview slices directly
+        return chunk
+
+
+class UploadProgressLogger:
+    """Progress callback that logs upload progress and throughput at fixed percentage steps
+
+    Uploads smaller than min_bytes are not reported step by step.
+    """
+
+    def __init__(self, filename, logger=None, step_percent=25, min_bytes=1024 * 1024):
+        self.filename = filename
+        self.logger = logger or logging.getLogger(__name__)
+        self.step_percent = step_percent
+        self.min_bytes = min_bytes
+        self.start_time = time.perf_counter()
+        self._next_percent = step_percent
+
+    def __call__(self, bytes_sent, total):
+        if total < self.min_bytes:
+            return
+        percent = bytes_sent * 100 // total if total else 100
+        if percent < self._next_percent and bytes_sent < total:
+            return
+        self._next_percent = (percent // self.step_percent + 1) * self.step_percent
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        self.logger.info("Uploading %s: %s%% of %.0f KB (%.0f KB/s)",
+                         self.filename, percent, total / 1024, bytes_sent / elapsed / 1024)
+
+    def summary(self, total):
+        """Return (elapsed seconds, throughput in bytes per second) for the whole upload"""
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        return elapsed, total / elapsed
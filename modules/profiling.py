@@ -0,0 +1,190 @@
+import io
+import os
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+import logging.handlers
+from config.config import (
+    LOG_FILE,
+    PROFILE_STAGES,
+    PROFILE_SAMPLE_EVERY,
+    PROFILE_TOP_ALLOCATIONS,
+    PROFILE_TRACEMALLOC_FRAMES
+)
+from .metrics import current_profiler
+
+# Profiles of each run are written to <log directory>/profiles/<run id>/
+PROFILE_DIR = os.path.join(os.path.dirname(LOG_FILE) or '.', 'profiles')
+PROFILE_FILES = ('cpu.pstats', 'cpu.txt', 'memory.txt')
+
+# Allocations of the profilers themselves, of the logging listener thread and of imports
+# are left out of the memory report
+PROFILER_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, logging.__file__),
+    tracemalloc.Filter(False, logging.handlers.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+]
+
+# cProfile can only profile one span per thread at a time, so nested spans are not sampled
+_thread_state = threading.local()
+
+
+class StageSample:
+    """Profiler state of one sampled span"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.profile = cProfile.Profile()
+        self.memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+class RunProfiler:
+    """Opt-in cProfile and tracemalloc capture of one run
+
+    Only spans of the stages in PROFILE_STAGES are profiled, and of each stage only
+    every PROFILE_SAMPLE_EVERY-th occurrence, so the overhead stays bounded. Sampled
+    spans are profiled with their own cProfile.Profile in the thread they run in and
+    merged into one pstats file. tracemalloc runs for the whole run with
+    PROFILE_TRACEMALLOC_FRAMES frames per allocation; the first sampled span of every
+    stage also takes a snapshot, so memory.txt lists the top allocators per stage
+    and at the end of the run.
+    """
+
+    def __init__(self, stages=PROFILE_STAGES, sample_every=PROFILE_SAMPLE_EVERY, top=PROFILE_TOP_ALLOCATIONS):
+        self.setup_logging()
+        self.stages = set(stages) if stages else None
+        self.sample_every = max(1, int(sample_every))
+        self.top = top
+        self._lock = threading.Lock()
+        self._occurrences = {}  # stage -> spans seen
+        self._stats = None  # merged pstats.Stats
+        self._stage_memory = {}  # stage -> [samples, total allocated bytes]
+        self._snapshots = {}  # stage -> tracemalloc snapshot of its first sample
+        self._started_tracemalloc = False
+        self._token = None
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def start_run(cls, **options):
+        """Start profiling the run executing in this context"""
+        profiler = cls(**options)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            profiler._started_tracemalloc = True
+        profiler.start = time.perf_counter()
+        profiler._token = current_profiler.set(profiler)
+        profiler.logger.info("Profiling enabled for this run")
+        return profiler
+
+    def begin(self, stage):
+        """Called by span() when a stage starts; returns a StageSample if this occurrence is sampled"""
+        if self.stages is not None and stage not in self.stages:
+            return None
+        if getattr(_thread_state, 'active', False):
+            return None
+        with self._lock:
+            count = self._occurrences.get(stage, 0)
+            self._occurrences[stage] = count + 1
+        if count % self.sample_every:
+            return None
+        sample = StageSample(stage)
+        try:
+            sample.profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; skip spans that overlap another sample
+            return None
+        _thread_state.active = True
+        return sample
+
+    def end(self, sample):
+        """Called by span() when a sampled stage ends"""
+        sample.profile.disable()
+        _thread_state.active = False
+        allocated = 0
+        snapshot = None
+        if tracemalloc.is_tracing():
+            allocated = tracemalloc.get_traced_memory()[0] - sample.memory_before
+            if sample.stage not in self._snapshots:
+                snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(sample.profile)
+            else:
+                self._stats.add(sample.profile)
+            memory = self._stage_memory.setdefault(sample.stage, [0, 0])
+            memory[0] += 1
+            memory[1] += allocated
+            if snapshot is not None:
+                self._snapshots.setdefault(sample.stage, snapshot)
+
+    def _memory_report(self, final_snapshot, peak):
+        lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MB", ""]
+        lines.append(f"{'stage':<16}{'samples':>9}{'mean retained KB':>18}")
+        for stage, (samples, total) in sorted(self._stage_memory.items()):
+            lines.append(f"{stage:<16}{samples:>9}{total / samples / 1024:>18.1f}")
+
+        snapshots = sorted(self._snapshots.items()) + [('end of run', final_snapshot)]
+        for label, snapshot in snapshots:
+            snapshot = snapshot.filter_traces(PROFILER_TRACE_FILTERS)
+            lines += ["", f"Top {self.top} allocators after {label}:"]
+            for statistic in snapshot.statistics('lineno')[:self.top]:
+                frame = statistic.traceback[0]
+                lines.append(f"  {statistic.size / 1024:>10.1f} KB {statistic.count:>8} blocks  "
+                             f"{frame.filename}:{frame.lineno}")
+        return '\n'.join(lines) + '\n'
+
+    def finish(self, run_id=None, output_dir=PROFILE_DIR):
+        """Stop profiling and write cpu.pstats, cpu.txt and memory.txt; returns the directory"""
+        if self._token is not None:
+            current_profiler.reset(self._token)
+            self._token = None
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        final_snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        run_dir = os.path.join(output_dir, run_id or time.strftime('%Y%m%d-%H%M%S'))
+        os.makedirs(run_dir, exist_ok=True)
+        try:
+            with self._lock:
+                stats = self._stats
+            if stats is not None:
+                stats.dump_stats(os.path.join(run_dir, 'cpu.pstats'))
+                text = io.StringIO()
+                stats.stream = text
+                stats.sort_stats('cumulative').print_stats(50)
+                with open(os.path.join(run_dir, 'cpu.txt'), 'w') as f:
+                    sampled = ', '.join(f"{stage}: {count}" for stage, count in sorted(self._occurrences.items()))
+                    f.write(f"Spans seen per stage: {sampled}\n")
+                    f.write(f"Profiled 1 in {self.sample_every} spans of each stage\n\n")
+                    f.write(text.getvalue())
+            if final_snapshot is not None:
+                with open(os.path.join(run_dir, 'memory.txt'), 'w') as f:
+                    f.write(self._memory_report(final_snapshot, peak))
+            self.logger.info("Profile written to %s", run_dir)
+        except Exception as e:
+            self.logger.error("Error writing profile to %s: %s", run_dir, e)
+        return run_dir
+
+
+def list_profiles(output_dir=PROFILE_DIR):
+    """Runs with a profile, newest first, as {'run': run id, 'files': [file names]}"""
+    if not os.path.isdir(output_dir):
+        return []
+    runs = []
+    for run_id in sorted(os.listdir(output_dir), reverse=True):
+        run_dir = os.path.join(output_dir, run_id)
+        if os.path.isdir(run_dir):
+            files = [name for name in PROFILE_FILES if os.path.exists(os.path.join(run_dir, name))]
+            runs.append({'run': run_id, 'files': files})
+    return runs
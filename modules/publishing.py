@@ -0,0 +1,135 @@
+import logging
+from config.config import PUBLISH_MODE, WORDPRESS_BATCH_PUBLISH
+from .content_processor import ContentProcessor
+from .draft_publisher import DraftPublisher
+from .wordpress_batch import BatchPublisher
+from .metrics import current_post
+
+logger = logging.getLogger(__name__)
+
+
+def create_post_publisher(wordpress):
+    """DraftPublisher in draft mode, BatchPublisher with batch publishing, else None (posts are published directly)"""
+    if PUBLISH_MODE == 'draft':
+        return DraftPublisher(wordpress)
+    if WORDPRESS_BATCH_PUBLISH:
+        return BatchPublisher(wordpress)
+    return None
+
+
+def publish_posts(posts, wordpress, llm, image_handler, content_processor=None, num_images=5, article_length=1000):
+    """Publish posts one after the other in this thread (the threaded pipeline of main.py and the web interface)
+
+    Image searches run one post ahead, so the next search overlaps this post's
+    generation. In draft mode posts are created as drafts in the background and
+    published together at the end; with batch publishing they are created in
+    groups once their content is ready. A post that fails is logged and skipped.
+    """
+    content_processor = content_processor or ContentProcessor()
+
+    post_publisher = create_post_publisher(wordpress)
+    queued_posts = []
+    image_searches = {}
+
+    def prefetch_images(index):
+        if index < len(posts) and index not in image_searches:
+            # The search logs under the post it is for, not the one being processed
+            post_token = current_post.set(posts[index]['slug'])
+            image_searches[index] = image_handler.submit_search(
+                topic=posts[index]['topic'],
+                keywords=posts[index]['keywords'],
+                num_images=num_images
+            )
+            current_post.reset(post_token)
+
+    for index, post_data in enumerate(posts):
+        # Log records of this post, including those of its worker threads, carry its slug
+        current_post.set(post_data['slug'])
+        try:
+            prefetch_images(index)
+            prefetch_images(index + 1)
+
+            # Search and download images
+            logger.info("Searching for images for: %s", post_data['title'])
+            images = image_searches.pop(index).result()
+
+            if not images:
+                logger.warning("No images found for post: %s", post_data['title'])
+                continue
+
+            # Select featured image
+            featured_image = image_handler.select_featured_image(images)
+            if not featured_image:
+                logger.warning("Could not select featured image for post: %s", post_data['title'])
+                continue
+
+            # Remove featured image from content images
+            content_images = [img for img in images if img != featured_image]
+
+            # Generate content using LLM
+            logger.info("Generating content for: %s", post_data['title'])
+            logger.info("Topic: %s", post_data['topic'])
+            logger.info("Keywords: %s", post_data['keywords'])
+            logger.info("Context: %s", post_data['context'])
+            logger.info("Target article length: %s words", article_length)
+
+            markdown_content = llm.generate_content(
+                title=post_data['title'],
+                topic=post_data['topic'],
+                keywords=post_data['keywords'],
+                context=post_data['context'],
+                word_count=article_length
+            )
+            logger.info("Generated content using LLM")
+
+            # Upload content images first so rendering only needs their descriptors
+            logger.info("Uploading content images")
+            content_media = wordpress.upload_images(content_images)
+
+            html_content = content_processor.render_post(markdown_content, content_media,
+                                                         post_data['must_have_elements'])
+
+            # Publish to WordPress with featured image
+            logger.info("Publishing post: %s", post_data['title'])
+            if post_publisher and not post_data.get('existing_id'):
+                featured_media = wordpress.upload_media(featured_image)
+                queued_posts.append((post_data, images, post_publisher.create_post(
+                    title=post_data['title'],
+                    content=html_content,
+                    featured_media=featured_media['id'],
+                    slug=post_data['slug']
+                )))
+                continue
+
+            post_id = wordpress.publish_post(
+                title=post_data['title'],
+                content=html_content,
+                featured_image_path=featured_image,
+                slug=post_data['slug'],
+                post_id=post_data.get('existing_id')
+            )
+            logger.info("Successfully published post: %s (ID: %s)", post_data['title'], post_id)
+
+            # Remember published images so later runs do not upload them again
+            image_handler.record_published(images, post_id=post_id)
+            image_handler.release_images(images)
+
+        except Exception as e:
+            logger.error("Error processing post %s: %s", post_data.get('title', 'Unknown'), e)
+            continue
+
+    if post_publisher:
+        post_publisher.close()
+        for post_data, images, post_future in queued_posts:
+            current_post.set(post_data['slug'])
+            try:
+                post_id = post_future.result()
+                logger.info("Successfully published post: %s (ID: %s)", post_data['title'], post_id)
+                image_handler.record_published(images, post_id=post_id)
+            except Exception as e:
+                logger.error("Error publishing post %s: %s", post_data['title'], e)
+            finally:
+                # The post's images were uploaded before it was queued
+                image_handler.release_images(images)
+
+    current_post.set(None)
@@ -0,0 +1,222 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from config.config import IMAGE_DOWNLOAD_PATH, TEMP_STORAGE_MODE, TEMP_DISK_QUOTA_MB, TMPFS_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows: workspaces with a marker are only removed by their own run
+    fcntl = None
+
+RUN_DIR_PREFIX = 'run-'
+# Lock file inside a workspace, held by the run that owns it for as long as the run lasts
+ACTIVE_MARKER = '.active'
+
+
+def directory_size(path):
+    """Total size in bytes of all files below path"""
+    total = 0
+    for directory, _, files in os.walk(path):
+        for filename in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, filename))
+            except OSError:
+                continue
+    return total
+
+
+class RunWorkspace:
+    """Working directory of one run; removed when the run ends"""
+
+    def __init__(self, storage, path, run_id, lock_file=None):
+        self.storage = storage
+        self.path = path
+        self.run_id = run_id
+        self.lock_file = lock_file
+
+    def subdir(self, name):
+        """Create and return a directory inside the workspace"""
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def release(self, path):
+        """Delete a file or directory of this workspace as soon as it is no longer needed"""
+        if not os.path.abspath(path).startswith(os.path.abspath(self.path) + os.sep):
+            return
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            self.storage.logger.error("Error releasing %s: %s", path, e)
+
+    def close(self):
+        self.storage.end_run(self)
+
+
+class TempStorage:
+    """Per-run scoped working directories under one root with a disk quota
+
+    mode 'disk' keeps the workspaces under root, 'tmpfs' keeps them in memory
+    under TMPFS_PATH (e.g. /dev/shm) when it is available. In 'memory' mode images
+    are held as ImageBuffers and workspaces stay empty. When the root grows
+    beyond the quota, the oldest directories of runs that are no longer active
+    are evicted first.
+
+    Several instances, in this process or others (web runs, workers), may share
+    one root: each run holds a lock on the ACTIVE_MARKER file in its workspace,
+    and eviction skips every workspace whose lock is taken.
+    """
+
+    def __init__(self, root=IMAGE_DOWNLOAD_PATH, mode=TEMP_STORAGE_MODE, quota_mb=TEMP_DISK_QUOTA_MB):
+        self.setup_logging()
+        self.mode = mode
+        self.root = self._resolve_root(root, mode)
+        self.quota_bytes = int(quota_mb * 1024 * 1024) if quota_mb else None
+        self._active = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _resolve_root(self, root, mode):
+        if mode == 'tmpfs':
+            if os.path.isdir(TMPFS_PATH) and os.access(TMPFS_PATH, os.W_OK):
+                return os.path.join(TMPFS_PATH, 'blog-automation', os.path.basename(os.path.normpath(root)))
+            self.logger.warning("tmpfs path %s is not available, using %s on disk", TMPFS_PATH, root)
+        elif mode not in ('disk', 'memory'):
+            raise ValueError(f"Unknown temp storage mode: {mode}. Use 'disk', 'tmpfs' or 'memory'")
+        return root
+
+    def start_run(self, run_id=None):
+        """Create the workspace of a new run"""
+        run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        path = os.path.join(self.root, f"{RUN_DIR_PREFIX}{run_id}")
+        workspace = RunWorkspace(self, path, run_id, self._lock_workspace(path))
+        with self._lock:
+            self._active[path] = workspace
+        self.logger.info("Created run workspace %s", path)
+        self.enforce_quota()
+        return workspace
+
+    def _lock_workspace(self, path):
+        """Create the workspace directory and take the lock of its marker; returns the open marker file"""
+        while True:
+            os.makedirs(path, exist_ok=True)
+            lock_file = open(os.path.join(path, ACTIVE_MARKER), 'a')
+            if fcntl is None:
+                return lock_file
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Another instance may have evicted the directory between makedirs and flock
+            try:
+                if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_file.name)):
+                    return lock_file
+            except OSError:
+                pass
+            lock_file.close()
+
+    def _lock_inactive(self, path):
+        """Lock a workspace for eviction; returns the open marker file (or True if it has none),
+        or None while a run holds it
+        """
+        marker = os.path.join(path, ACTIVE_MARKER)
+        if not os.path.exists(marker):
+            return True
+        if fcntl is None:
+            return None
+        try:
+            lock_file = open(marker, 'a')
+        except OSError:
+            return None
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def end_run(self, workspace):
+        """Remove the workspace of a finished run"""
+        with self._lock:
+            self._active.pop(workspace.path, None)
+        try:
+            shutil.rmtree(workspace.path, ignore_errors=True)
+            self.logger.info("Removed run workspace %s", workspace.path)
+        except Exception as e:
+            self.logger.error("Error removing run workspace %s: %s", workspace.path, e)
+        finally:
+            if workspace.lock_file is not None:
+                workspace.lock_file.close()
+                workspace.lock_file = None
+
+    @contextmanager
+    def run_scope(self, run_id=None):
+        """Context manager that yields a RunWorkspace and removes it afterwards"""
+        workspace = self.start_run(run_id)
+        try:
+            yield workspace
+        finally:
+            self.end_run(workspace)
+
+    def evict(self, path):
+        """Delete an entry under the root unless it is the workspace of an active run; returns whether it was"""
+        with self._lock:
+            if path in self._active:
+                return False
+        if not os.path.isdir(path):
+            try:
+                os.remove(path)
+            except OSError:
+                return False
+            return True
+
+        lock_file = self._lock_inactive(path)
+        if lock_file is None:
+            return False
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            if lock_file is not True:
+                lock_file.close()
+        return True
+
+    def enforce_quota(self):
+        """Evict the oldest inactive entries under the root until it fits the quota"""
+        if not self.quota_bytes:
+            return
+        with self._lock:
+            active = set(self._active)
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                size = directory_size(path) if os.path.isdir(path) else os.path.getsize(path)
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            total += size
+            if path not in active and name != '.gitkeep':
+                entries.append((mtime, size, path))
+
+        if total <= self.quota_bytes:
+            return
+
+        for mtime, size, path in sorted(entries):
+            if not self.evict(path):
+                continue
+            total -= size
+            self.logger.info("Evicted %s (%.0f KB) to stay within the temp storage quota", path, size / 1024)
+            if total <= self.quota_bytes:
+                return
+
+        self.logger.warning("Temp storage uses %.1f MB, above the %.0f MB quota, with only active runs left",
+                            total / 1024 / 1024, self.quota_bytes / 1024 / 1024)
@@ -0,0 +1,136 @@
+import logging
+import threading
+import requests
+from concurrent.futures import Future
+from config.config import WORDPRESS_BATCH_SIZE
+
+# WordPress rejects batches of more than 25 requests
+MAX_BATCH_SIZE = 25
+
+# Statuses with which WordPress refuses a batch request as a whole, before creating any of its posts
+BATCH_REFUSED_STATUSES = (400, 404, 405)
+
+
+class BatchItemError(Exception):
+    """One request of a batch failed; carries the HTTP status and WordPress error code"""
+
+    def __init__(self, message, status=None, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def batch_item_error(response):
+    """Return a BatchItemError for a failed item of a batch response, or None if it succeeded"""
+    status = response.get('status')
+    body = response.get('body') or {}
+    if status and 200 <= status < 300:
+        return None
+    return BatchItemError(body.get('message', 'request failed'), status=status, code=body.get('code'))
+
+
+def batch_refused(error):
+    """Whether a failed batch request was refused as a whole, so none of its posts was created
+
+    Other failures, e.g. a 5xx from a proxy or a PHP error halfway through the
+    batch, may have created some of the posts.
+    """
+    response = getattr(error, 'response', None)
+    if not isinstance(error, requests.exceptions.HTTPError) or response is None:
+        return False
+    if response.status_code in BATCH_REFUSED_STATUSES:
+        return True
+    if not 400 <= response.status_code < 500:
+        return False
+    try:
+        code = response.json().get('code') or ''
+    except ValueError:
+        return False
+    return code.startswith('rest_batch_')
+
+
+class BatchPublisher:
+    """Queues create_post calls and sends them to WordPress in batches
+
+    create_post() returns a Future that resolves to the new post ID, or raises
+    BatchItemError for that post only. Queued posts are sent when batch_size of
+    them are waiting, on flush() or when the publisher is used as a context
+    manager and exits. Sites without the REST batch endpoint get one request per
+    post instead.
+    """
+
+    def __init__(self, wordpress, batch_size=WORDPRESS_BATCH_SIZE):
+        self.setup_logging()
+        self.wordpress = wordpress
+        self.batch_size = max(1, min(int(batch_size), MAX_BATCH_SIZE))
+        self._queue = []  # (payload, future)
+        self._lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def create_post(self, title, content, featured_media=None, status='publish', slug=None):
+        """Queue a post and return a Future of its ID"""
+        future = Future()
+        payload = self.wordpress.post_payload(title, content, featured_media, status, slug)
+        with self._lock:
+            self._queue.append((payload, future))
+            full = len(self._queue) >= self.batch_size
+        if full:
+            self.flush()
+        return future
+
+    def flush(self):
+        """Send every queued post"""
+        with self._lock:
+            queued, self._queue = self._queue, []
+        for start in range(0, len(queued), self.batch_size):
+            group = queued[start:start + self.batch_size]
+            if self.wordpress.supports_batch():
+                self._send_batch(group)
+            else:
+                self._send_single(group)
+
+    def _send_single(self, group):
+        for payload, future in group:
+            try:
+                future.set_result(self.wordpress.create_post(**payload))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _send_batch(self, group):
+        batch = [{'method': 'POST', 'path': '/wp/v2/posts', 'body': payload} for payload, _ in group]
+        try:
+            responses = self.wordpress.batch_request(batch)
+        except Exception as e:
+            if batch_refused(e):
+                self.logger.error("Batch of %s posts rejected, sending them one by one: %s", len(group), e)
+                self._send_single(group)
+                return
+            # The posts may or may not exist, so do not send them again
+            self.logger.error("Batch of %s posts failed: %s", len(group), e)
+            for _, future in group:
+                future.set_exception(e)
+            return
+
+        created = 0
+        for (payload, future), response in zip(group, responses):
+            error = batch_item_error(response)
+            body = response.get('body') or {}
+            if error is None and 'id' in body:
+                future.set_result(body['id'])
+                created += 1
+            else:
+                error = error or BatchItemError('no post ID in response', status=response.get('status'))
+                self.logger.error("Error creating post %r in batch: %s (HTTP %s)", payload['title'], error, error.status)
+                future.set_exception(error)
+        self.logger.info("Created %s of %s posts in one batch request", created, len(group))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
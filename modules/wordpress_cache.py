@@ -0,0 +1,85 @@
+import os
+import html
+import time
+import threading
+from urllib.parse import urlparse
+from config.config import WORDPRESS_METADATA_TTL
+
+# REST endpoint and the fields kept of each cached resource
+METADATA_RESOURCES = {
+    'categories': ('categories', 'id,name,slug,parent'),
+    'tags': ('tags', 'id,name,slug'),
+    'media': ('media', 'id,slug,source_url,title'),
+}
+
+
+def metadata_keys(resource, item):
+    """Lookup keys of one cached item: lowercase name and slug of terms, URL, file name and slug of media"""
+    if resource == 'media':
+        url = item.get('source_url') or ''
+        return [url, os.path.basename(urlparse(url).path).lower(), item.get('slug')]
+    # The REST API returns term names HTML-escaped ("Food &amp; Drink")
+    return [html.unescape(item.get('name') or '').strip().lower(), item.get('slug')]
+
+
+class SiteMetadataCache:
+    """In-memory categories, tags and media of one site, indexed for dict lookups
+
+    Each resource is replaced as a whole by put() after a bulk fetch and
+    expires ttl seconds later. Writes through WordPressIntegration add the
+    created item with add(), or drop a resource with invalidate().
+    """
+
+    def __init__(self, ttl=WORDPRESS_METADATA_TTL):
+        self.ttl = ttl
+        self._resources = {}  # resource -> (expiry time, {key: item})
+        self._lock = threading.Lock()
+
+    def get(self, resource):
+        """Return the index of a resource, or None if it is not loaded or has expired"""
+        with self._lock:
+            entry = self._resources.get(resource)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def put(self, resource, items):
+        """Replace a resource with freshly fetched items and return its index"""
+        index = {}
+        for item in items:
+            for key in metadata_keys(resource, item):
+                if key:
+                    index.setdefault(key, item)
+        with self._lock:
+            self._resources[resource] = (time.monotonic() + self.ttl, index)
+        return index
+
+    def add(self, resource, item):
+        """Add an item created on the site to a loaded resource"""
+        with self._lock:
+            entry = self._resources.get(resource)
+            if entry is None:
+                return
+            for key in metadata_keys(resource, item):
+                if key:
+                    entry[1][key] = item
+
+    def invalidate(self, resource=None):
+        """Drop one resource, or all of them, so the next lookup fetches it again"""
+        with self._lock:
+            if resource is None:
+                self._resources.clear()
+            else:
+                self._resources.pop(resource, None)
+
+
+_site_caches = {}
+_site_caches_lock = threading.Lock()
+
+
+def site_metadata_cache(wordpress_url):
+    """Return the cache shared by every WordPressIntegration of a site in this process"""
+    with _site_caches_lock:
+        if wordpress_url not in _site_caches:
+            _site_caches[wordpress_url] = SiteMetadataCache()
+        return _site_caches[wordpress_url]
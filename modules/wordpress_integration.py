@@ -1,10 +1,78 @@
 import requests
 import logging
 import os
+import re
+import hashlib
 import mimetypes
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from modules.image_buffer import ImageBuffer
+from modules.multipart import MultipartFileEncoder, UploadProgressLogger
+from modules.wordpress_cache import METADATA_RESOURCES, site_metadata_cache
+from modules.metrics import span
 from config.config import WORDPRESS_URL as DEFAULT_WORDPRESS_URL
 from config.config import WORDPRESS_USERNAME as DEFAULT_WORDPRESS_USERNAME
 from config.config import WORDPRESS_PASSWORD as DEFAULT_WORDPRESS_PASSWORD
+from config.config import UPLOAD_CHUNK_SIZE, UPLOAD_TIMEOUT, UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT, EXISTING_POST_POLICY
+
+# REST batch framework, available from WordPress 5.6
+BATCH_NAMESPACE = 'batch/v1'
+MAX_PER_PAGE = 100  # Largest page size the REST API accepts
+PAGE_FETCH_WORKERS = 4  # Concurrent page requests of a paginated bulk fetch
+
+# Existing posts in these states are left alone by EXISTING_POST_POLICY 'skip'
+LIVE_POST_STATUSES = ('publish', 'future', 'private')
+EXISTING_POSTS_UNCHECKED = "Could not check for existing posts, a retried run may publish duplicates"
+
+
+def post_slug(title):
+    """Deterministic slug of a sheet row, derived from its title
+
+    Follows WordPress' sanitize_title() for plain-text titles, so posts created
+    before slugs were set explicitly are found as well: accents are transliterated,
+    dashes and dots become separators, and any other punctuation, apostrophes
+    included, is dropped ("Don't Panic" -> "dont-panic").
+    """
+    text = re.sub(r'&[a-z0-9#]+;', '', title, flags=re.IGNORECASE)  # HTML entities
+    text = re.sub(r'[\u2013\u2014.]', '-', text)
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    text = re.sub(r'[^a-z0-9 _-]', '', text)
+    slug = re.sub(r'[\s-]+', '-', text).strip('-')[:190].rstrip('-')
+    if not slug:
+        slug = f"post-{hashlib.sha1(title.encode('utf-8')).hexdigest()[:12]}"
+    return slug
+
+
+def assign_slugs(posts):
+    """Give each sheet row the slug of its title"""
+    for post in posts:
+        post['slug'] = post_slug(post['title'])
+    return posts
+
+
+def page_params(params, page):
+    """Query of one page of a paginated collection request"""
+    return dict(params or {}, per_page=MAX_PER_PAGE, page=page)
+
+
+def total_pages(response):
+    """Page count of a paginated collection, from the response to its first page"""
+    return int(response.headers.get('X-WP-TotalPages', 1))
+
+
+def slug_queries(slugs):
+    """Query parameters of the requests looking up posts in any status by slug, MAX_PER_PAGE slugs each"""
+    slugs = list(dict.fromkeys(slugs))
+    return [
+        {
+            'slug': ','.join(slugs[start:start + MAX_PER_PAGE]),
+            'status': 'any',
+            'per_page': MAX_PER_PAGE,
+            '_fields': 'id,slug,status,link'
+        }
+        for start in range(0, len(slugs), MAX_PER_PAGE)
+    ]
+
 
 class WordPressIntegration:
     def __init__(self, wordpress_url=None, wordpress_username=None, wordpress_password=None):
@@ -22,15 +90,18 @@ class WordPressIntegration:
 
         # Ensure URL has a scheme
         if not self.wordpress_url.startswith(('http://', 'https://')):
-            self.logger.error(f"Invalid WordPress URL (missing http:// or https://): {self.wordpress_url}")
+            self.logger.error("Invalid WordPress URL (missing http:// or https://): %s", self.wordpress_url)
             raise ValueError(f"Invalid WordPress URL: {self.wordpress_url}. URL must start with http:// or https://")
 
         # Set up API endpoints
-        self.base_url = f"{self.wordpress_url}/wp-json/wp/v2"
+        self.rest_url = f"{self.wordpress_url}/wp-json"
+        self.base_url = f"{self.rest_url}/wp/v2"
         self.media_base_url = f"{self.wordpress_url}/wp-content/uploads"
         self.auth = (self.wordpress_username, self.wordpress_password)
+        self._batch_supported = None
+        self.metadata = site_metadata_cache(self.wordpress_url)
 
-        self.logger.info(f"Initialized WordPress integration for {self.wordpress_url}")
+        self.logger.info("Initialized WordPress integration for %s", self.wordpress_url)
 
     def setup_logging(self):
         self.logger = logging.getLogger(__name__)
@@ -40,88 +111,389 @@ class WordPressIntegration:
         mime_type, _ = mimetypes.guess_type(file_path)
         return mime_type or 'image/jpeg'
 
-    def upload_media(self, image_path):
-        """Upload an image to WordPress media library"""
-        try:
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
+    def _media_payload(self, image, filename=None, mime_type=None):
+        """Return (filename, data or file object, mime type, file to close) for an upload
+
+        image may be a file path, an ImageBuffer, bytes/bytearray/memoryview or a
+        binary file-like object. In-memory data is sent as is, without a temp file.
+        """
+        if isinstance(image, ImageBuffer):
+            return filename or image.filename, image.data, mime_type or image.mime_type, None
+
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            filename = filename or 'image.jpg'
+            return filename, image, mime_type or self.get_mime_type(filename), None
+
+        if hasattr(image, 'read'):
+            filename = filename or os.path.basename(getattr(image, 'name', '') or 'image.jpg')
+            return filename, image, mime_type or self.get_mime_type(filename), None
+
+        image_path = os.fspath(image)
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        filename = filename or os.path.basename(image_path)
+        image_file = open(image_path, 'rb')
+        return filename, image_file, mime_type or self.get_mime_type(image_path), image_file
+
+    def media_request(self, image, filename=None, mime_type=None):
+        """Return (filename, streaming multipart body, headers, file to close) of a media upload
+
+        Shared with the asyncio client (modules/async_clients.py), which only sends the request.
+        """
+        filename, payload, mime_type, image_file = self._media_payload(image, filename, mime_type)
+
+        # Stream the multipart body in fixed-size chunks instead of building it in memory
+        body = MultipartFileEncoder(
+            'file', filename, payload, mime_type,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            progress_callback=UploadProgressLogger(filename, self.logger),
+            timeout=UPLOAD_TIMEOUT
+        )
+        headers = {
+            'Content-Type': body.content_type,
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        }
+        return filename, body, headers, image_file
+
+    def media_descriptor(self, filename, body, media_data):
+        """Log a finished upload, cache the media item and return its {'id', 'url'} descriptor"""
+        elapsed, throughput = body.progress_callback.summary(len(body))
+        self.logger.info("Sent %s (%.0f KB) in %.2fs at %.0f KB/s",
+                         filename, len(body) / 1024, elapsed, throughput / 1024)
 
-            mime_type = self.get_mime_type(image_path)
-            filename = os.path.basename(image_path)
+        if 'id' not in media_data or 'source_url' not in media_data:
+            raise ValueError("No media ID or source URL in WordPress response")
 
-            with open(image_path, 'rb') as image_file:
-                files = {
-                    'file': (filename, image_file, mime_type)
-                }
-                headers = {
-                    'Content-Disposition': f'attachment; filename="{filename}"'
-                }
+        media_id = media_data['id']
+        image_url = media_data['source_url']
+        self.metadata.add('media', media_data)
+        self.logger.info("Successfully uploaded image: %s -> ID: %s, URL: %s", filename, media_id, image_url)
+        return {'id': media_id, 'url': image_url}
 
+    def upload_media(self, image, filename=None, mime_type=None):
+        """Upload an image to WordPress media library
+
+        image may be a file path, an ImageBuffer, bytes/memoryview or a file-like object.
+        """
+        image_file = None
+        try:
+            filename, body, headers, image_file = self.media_request(image, filename, mime_type)
+
+            with span('media_upload') as stage:
                 response = requests.post(
                     f"{self.base_url}/media",
                     auth=self.auth,
-                    files=files,
-                    headers=headers
+                    data=body,
+                    headers=headers,
+                    timeout=(UPLOAD_CONNECT_TIMEOUT, UPLOAD_TIMEOUT)
                 )
+                stage.add(nbytes=len(body))
+                if not response.ok:
+                    stage.status = 'error'
 
-                response.raise_for_status()
-                media_data = response.json()
+            response.raise_for_status()
+            return self.media_descriptor(filename, body, response.json())
+
+        except Exception as e:
+            self.logger.error("Error uploading image %s: %s", filename or image, e)
+            raise
+        finally:
+            if image_file is not None:
+                image_file.close()
+
+    def fetch_all(self, endpoint, params=None):
+        """Fetch every item of a collection endpoint (e.g. 'categories'), MAX_PER_PAGE per request
+
+        The first page reports the page count in X-WP-TotalPages; the remaining
+        pages are fetched concurrently.
+        """
+        def fetch_page(page):
+            response = requests.get(
+                f"{self.base_url}/{endpoint}",
+                auth=self.auth,
+                params=page_params(params, page),
+                timeout=(UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT)
+            )
+            response.raise_for_status()
+            return response
+
+        first = fetch_page(1)
+        items = first.json()
+        page_count = total_pages(first)
+        if page_count > 1:
+            with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+                for response in executor.map(fetch_page, range(2, page_count + 1)):
+                    items.extend(response.json())
+        return items
+
+    def load_site_metadata(self, resources=tuple(METADATA_RESOURCES)):
+        """Bulk fetch categories, tags and/or media into the metadata cache, skipping resources still fresh"""
+        for resource, endpoint, fields in self.stale_metadata(resources):
+            try:
+                self.cache_metadata(resource, self.fetch_all(endpoint, {'_fields': fields}))
+            except Exception as e:
+                self.logger.error("Error loading %s: %s", resource, e)
+                raise
+
+    def stale_metadata(self, resources):
+        """(resource, endpoint, fields) of each of the resources that is not cached or no longer fresh"""
+        return [(resource, *METADATA_RESOURCES[resource]) for resource in resources
+                if self.metadata.get(resource) is None]
+
+    def cache_metadata(self, resource, items):
+        """Store the bulk fetched items of a resource in the metadata cache"""
+        self.metadata.put(resource, items)
+        self.logger.info("Cached %s %s of %s", len(items), resource, self.wordpress_url)
 
-                if 'id' not in media_data or 'source_url' not in media_data:
-                    raise ValueError("No media ID or source URL in WordPress response")
+    def _metadata_lookup(self, resource, key):
+        index = self.metadata.get(resource)
+        if index is None:
+            self.load_site_metadata([resource])
+            index = self.metadata.get(resource) or {}
+        return index.get(key)
 
-                media_id = media_data['id']
-                image_url = media_data['source_url']
-                self.logger.info(f"Successfully uploaded image: {filename} -> ID: {media_id}, URL: {image_url}")
-                return {'id': media_id, 'url': image_url}
+    def find_category(self, name):
+        """Category with the given name or slug, or None"""
+        return self._metadata_lookup('categories', name.strip().lower())
 
+    def find_tag(self, name):
+        """Tag with the given name or slug, or None"""
+        return self._metadata_lookup('tags', name.strip().lower())
+
+    def find_media(self, url_or_filename):
+        """Media item with the given source URL, file name or slug, or None"""
+        key = url_or_filename if '/' in url_or_filename else url_or_filename.lower()
+        return self._metadata_lookup('media', key)
+
+    def get_or_create_term(self, taxonomy, name):
+        """ID of the category or tag with this name, creating it if the site does not have it"""
+        term = self.find_term(taxonomy, name)
+        if term:
+            return term['id']
+        try:
+            response = requests.post(f"{self.base_url}/{taxonomy}", auth=self.auth, json={'name': name},
+                                     timeout=(UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT))
+            return self.created_term_id(taxonomy, name, response)
         except Exception as e:
-            self.logger.error(f"Error uploading image {image_path}: {str(e)}")
+            self.logger.error("Error creating %s term %s: %s", taxonomy, name, e)
             raise
 
-    def create_post(self, title, content, featured_media=None, status='publish'):
+    def find_term(self, taxonomy, name):
+        """Cached category or tag with this name or slug, or None"""
+        find = self.find_category if taxonomy == 'categories' else self.find_tag
+        return find(name)
+
+    def created_term_id(self, taxonomy, name, response):
+        """ID of the term from the response to a term creation request (requests or httpx)"""
+        if response.status_code == 400 and response.json().get('code') == 'term_exists':
+            # Created since the cache was loaded
+            self.metadata.invalidate(taxonomy)
+            return response.json()['data']['term_id']
+        response.raise_for_status()
+        term = response.json()
+        self.metadata.add(taxonomy, term)
+        self.logger.info("Created %s term %s (ID: %s)", taxonomy, name, term['id'])
+        return term['id']
+
+    def upload_images(self, image_paths):
+        """Upload several images (paths or buffers) and return their media descriptors, skipping failures"""
+        media = []
+        for image_path in image_paths:
+            try:
+                media.append(self.upload_media(image_path))
+            except Exception as e:
+                self.logger.error("Skipping image %s: %s", image_path, e)
+        return media
+
+    def post_payload(self, title, content, featured_media=None, status='publish', slug=None):
+        """Build the REST body of a new post"""
+        post_data = {
+            'title': title,
+            'content': content,
+            'status': status
+        }
+
+        if slug:
+            post_data['slug'] = slug
+
+        if featured_media:
+            # featured_media should be the media ID
+            post_data['featured_media'] = int(featured_media)
+        return post_data
+
+    def featured_media_id(self, featured_media):
+        """Media ID of a media descriptor ({'id', 'url'}) or media ID"""
+        if not featured_media:
+            return None
+        return featured_media['id'] if isinstance(featured_media, dict) else featured_media
+
+    def created_post_id(self, post_data):
+        """Log a created post and return its ID, from the REST response body"""
+        post_id = post_data['id']
+        self.logger.info("Successfully created post with ID: %s", post_id)
+        return post_id
+
+    def create_post(self, title, content, featured_media=None, status='publish', slug=None):
         """Create a new blog post with optional featured image"""
         try:
-            post_data = {
-                'title': title,
-                'content': content,
-                'status': status
-            }
+            post_data = self.post_payload(title, content, featured_media, status, slug)
+
+            with span('post_create'):
+                response = requests.post(
+                    f"{self.base_url}/posts",
+                    auth=self.auth,
+                    json=post_data,
+                    timeout=(UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT)
+                )
+                response.raise_for_status()
+            return self.created_post_id(response.json())
+        except Exception as e:
+            self.logger.error("Error creating post: %s", e)
+            raise
+
+    def update_post(self, post_id, **fields):
+        """Update fields of an existing post, e.g. status='publish'"""
+        try:
+            with span('post_update'):
+                response = requests.post(
+                    f"{self.base_url}/posts/{post_id}",
+                    auth=self.auth,
+                    json=fields,
+                    timeout=(UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT)
+                )
+                response.raise_for_status()
+            self.logger.info("Updated post %s: %s", post_id, ', '.join(fields))
+            return response.json()
+        except Exception as e:
+            self.logger.error("Error updating post %s: %s", post_id, e)
+            raise
+
+    def find_posts_by_slug(self, slugs):
+        """Look up posts in any status by slug, returning {slug: {'id', 'slug', 'status', 'link'}}
+
+        Slugs are queried MAX_PER_PAGE at a time, so a whole run needs one request
+        in the common case.
+        """
+        found = {}
+        try:
+            for params in slug_queries(slugs):
+                response = requests.get(
+                    f"{self.base_url}/posts",
+                    auth=self.auth,
+                    params=params,
+                    timeout=(UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT)
+                )
+                response.raise_for_status()
+                for post in response.json():
+                    found[post['slug']] = post
+            self.logger.info("Found %s of %s posts already on the site", len(found), len(set(slugs)))
+            return found
+        except Exception as e:
+            self.logger.error("Error looking up existing posts: %s", e)
+            raise
+
+    def filter_existing_posts(self, posts, policy=EXISTING_POST_POLICY):
+        """Give each sheet row its slug and check which of them already exist on the site
+
+        Returns the rows that still need work. Rows whose post exists get
+        'existing_id' so it is updated instead of created again; with policy
+        'skip', rows whose post is already live are left out. If the lookup
+        fails, every row is kept.
+        """
+        assign_slugs(posts)
+        if policy == 'off' or not posts:
+            return posts
+
+        try:
+            existing = self.find_posts_by_slug([post['slug'] for post in posts])
+        except Exception:
+            self.logger.warning(EXISTING_POSTS_UNCHECKED)
+            return posts
+        return self.remaining_posts(posts, existing, policy)
 
-            if featured_media:
-                # featured_media should be the media ID
-                post_data['featured_media'] = int(featured_media)
+    def remaining_posts(self, posts, existing, policy):
+        """Rows still to publish given the posts found on the site by slug"""
+        remaining = []
+        for post in posts:
+            found = existing.get(post['slug'])
+            if found:
+                if policy == 'skip' and found['status'] in LIVE_POST_STATUSES:
+                    self.logger.info("Skipping post already on the site: %s (ID: %s, %s)", post['title'], found['id'], found['status'])
+                    continue
+                self.logger.info("Will update existing post: %s (ID: %s, %s)", post['title'], found['id'], found['status'])
+                post['existing_id'] = found['id']
+            remaining.append(post)
+        return remaining
 
+    def supports_batch(self):
+        """Check once whether the site exposes the REST batch endpoint"""
+        if self._batch_supported is None:
+            try:
+                response = requests.get(f"{self.rest_url}/", timeout=UPLOAD_CONNECT_TIMEOUT)
+                self._batch_supported = self.lists_batch_namespace(response)
+            except Exception as e:
+                self.logger.warning("Could not check REST batch support: %s", e)
+                self._batch_supported = False
+            self.logger.info("REST batch requests supported: %s", self._batch_supported)
+        return self._batch_supported
+
+    def lists_batch_namespace(self, response):
+        """Whether the REST index (a requests or httpx response) lists the batch namespace"""
+        response.raise_for_status()
+        return BATCH_NAMESPACE in response.json().get('namespaces', [])
+
+    def batch_request(self, batch, validation='normal'):
+        """Send up to 25 REST requests in one call to the batch endpoint
+
+        batch is a list of {'method', 'path', 'body'} dicts with paths relative to
+        /wp-json (e.g. '/wp/v2/posts'). Returns the list of per-request responses,
+        each a {'status', 'headers', 'body'} dict, in the same order.
+        """
+        with span('post_batch'):
             response = requests.post(
-                f"{self.base_url}/posts",
+                f"{self.rest_url}/{BATCH_NAMESPACE}",
                 auth=self.auth,
-                json=post_data
+                json={'validation': validation, 'requests': batch},
+                timeout=(UPLOAD_CONNECT_TIMEOUT, WORDPRESS_TIMEOUT)
             )
             response.raise_for_status()
-            post_id = response.json()['id']
-            self.logger.info(f"Successfully created post with ID: {post_id}")
-            return post_id
-        except Exception as e:
-            self.logger.error(f"Error creating post: {str(e)}")
-            raise
+        return self.batch_responses(batch, response.json())
 
-    def publish_post(self, title, content, featured_image_path=None):
-        """Publish a blog post with optional featured image"""
+    def batch_responses(self, batch, data):
+        """Per-request responses of a batch response body, checked against the batch sent"""
+        responses = data.get('responses', [])
+        if len(responses) != len(batch):
+            raise ValueError(f"Batch returned {len(responses)} responses for {len(batch)} requests")
+        return responses
+
+    def publish_post(self, title, content, featured_image_path=None, featured_media=None, slug=None, post_id=None):
+        """Publish a blog post with optional featured image
+
+        featured_image_path may also be an ImageBuffer. featured_media may be an
+        already uploaded media descriptor ({'id', 'url'}) or media ID, in which
+        case featured_image_path is not uploaded again. With post_id, the existing
+        post is updated and published instead of creating a new one.
+        """
         try:
-            featured_media_id = None
-            if featured_image_path:
+            featured_media_id = self.featured_media_id(featured_media)
+            if featured_media_id is None and featured_image_path:
                 media_data = self.upload_media(featured_image_path)
                 featured_media_id = media_data['id']
 
-            # Create and publish the post
-            post_id = self.create_post(
-                title=title,
-                content=content,
-                featured_media=featured_media_id
-            )
+            if post_id:
+                # Update and publish the post created by an earlier run
+                self.update_post(post_id, **self.post_payload(title, content, featured_media_id, slug=slug))
+            else:
+                # Create and publish the post
+                post_id = self.create_post(
+                    title=title,
+                    content=content,
+                    featured_media=featured_media_id,
+                    slug=slug
+                )
 
-            self.logger.info(f"Successfully published post with ID: {post_id}")
+            self.logger.info("Successfully published post with ID: %s", post_id)
             return post_id
         except Exception as e:
-            self.logger.error(f"Error publishing post: {str(e)}")
-            raise
\ No newline at end of file
+            self.logger.error("Error publishing post: %s", e)
+            raise
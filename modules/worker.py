@@ -0,0 +1,225 @@
+"""
+Worker process: publishes the posts queued by the web interface or main.py in worker mode
+
+Usage:
+    python -m modules.worker
+    python -m modules.worker --processes 4
+    python -m modules.worker --once
+"""
+
+import os
+import time
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+from config.config import JOB_QUEUE_PATH, WORKER_POLL_INTERVAL, load_environment
+from .job_queue import JobQueue
+from .logging_setup import setup_logging
+from .metrics import RunMetrics, current_run, current_post
+
+
+class JobEventHandler(logging.Handler):
+    """Store the records logged while a job is processed as progress events of its run
+
+    Records outside a job (no run_id) stay in the worker's own log only.
+    """
+
+    def __init__(self, job_queue, worker_id, level=logging.INFO):
+        super().__init__(level)
+        self.job_queue = job_queue
+        self.worker_id = worker_id
+        self.set_name('job-events')
+
+    def emit(self, record):
+        run_id = getattr(record, 'run_id', None)
+        if run_id is None:
+            return
+        try:
+            self.job_queue.add_event(run_id, record.levelname, record.getMessage(),
+                                     post=getattr(record, 'post_id', None), worker=self.worker_id)
+        except Exception:
+            self.handleError(record)
+
+
+class PostWorker:
+    """Claims post jobs from the queue and publishes them, one at a time
+
+    The LLM client, image handler (and its browser) and the WordPress clients of
+    the sites seen so far live as long as the worker, so they are set up once
+    rather than per post.
+    """
+
+    def __init__(self, job_queue, worker_id=None):
+        from .content_processor import ContentProcessor
+        from .llm_integration import LLMIntegration
+        from .image_handler import ImageHandler
+
+        self.setup_logging()
+        self.job_queue = job_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.content_processor = ContentProcessor()
+        self.llm = LLMIntegration()
+        self.image_handler = ImageHandler()
+        self._wordpress = {}  # (url, username, password) -> WordPressIntegration
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def wordpress_for(self, settings):
+        from .wordpress_integration import WordPressIntegration
+
+        key = (settings.get('wordpress_url'), settings.get('wordpress_username'), settings.get('wordpress_password'))
+        wordpress = self._wordpress.get(key)
+        if wordpress is None:
+            wordpress = WordPressIntegration(
+                wordpress_url=settings.get('wordpress_url'),
+                wordpress_username=settings.get('wordpress_username'),
+                wordpress_password=settings.get('wordpress_password')
+            )
+            self._wordpress[key] = wordpress
+        return wordpress
+
+    def _keep_lease(self, job_id, stop):
+        """Renew the job's lease until stop is set"""
+        while not stop.wait(self.job_queue.lease_seconds / 3):
+            if not self.job_queue.renew_lease(job_id, self.worker_id):
+                self.logger.warning("Lease of job %s was lost, another worker may publish it too", job_id)
+                return
+
+    def process(self, job, settings):
+        """Publish the post of a job; returns the post ID"""
+        post_data = job['payload']
+        wordpress = self.wordpress_for(settings)
+        num_images = settings.get('num_images', 5)
+        article_length = settings.get('article_length', 1000)
+
+        # Images of each job get their own workspace, removed when the job ends
+        with self.image_handler.run_scope(f"{job['run_id']}-{job['id']}"):
+            self.logger.info("Searching for images for: %s", post_data['title'])
+            images = self.image_handler.search_and_download_images(
+                topic=post_data['topic'],
+                keywords=post_data['keywords'],
+                num_images=num_images
+            )
+            if not images:
+                raise RuntimeError(f"No images found for post: {post_data['title']}")
+
+            featured_image = self.image_handler.select_featured_image(images)
+            if not featured_image:
+                raise RuntimeError(f"Could not select featured image for post: {post_data['title']}")
+            content_images = [img for img in images if img != featured_image]
+
+            self.logger.info("Generating content for: %s", post_data['title'])
+            markdown_content = self.llm.generate_content(
+                title=post_data['title'],
+                topic=post_data['topic'],
+                keywords=post_data['keywords'],
+                context=post_data['context'],
+                word_count=article_length
+            )
+            self.logger.info("Generated content using LLM")
+
+            self.logger.info("Uploading content images")
+            content_media = wordpress.upload_images(content_images)
+            html_content = self.content_processor.render_post(markdown_content, content_media,
+                                                              post_data['must_have_elements'])
+
+            self.logger.info("Publishing post: %s", post_data['title'])
+            post_id = wordpress.publish_post(
+                title=post_data['title'],
+                content=html_content,
+                featured_image_path=featured_image,
+                slug=post_data['slug'],
+                post_id=post_data.get('existing_id')
+            )
+            self.logger.info("Successfully published post: %s (ID: %s)", post_data['title'], post_id)
+
+            self.image_handler.record_published(images, post_id=post_id)
+            return post_id
+
+    def run_job(self, job):
+        """Process a claimed job and record its outcome in the queue"""
+        settings = self.job_queue.run_settings(job['run_id']) or {}
+        # Records of the job carry its run and post, which routes them to the run's progress events
+        run_metrics = RunMetrics(job['run_id'])
+        run_token = current_run.set(run_metrics)
+        post_token = current_post.set(job['payload'].get('slug'))
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_lease, args=(job['id'], stop), daemon=True)
+        heartbeat.start()
+        try:
+            post_id = self.process(job, settings)
+            if not self.job_queue.complete(job['id'], self.worker_id, {'post_id': post_id}):
+                self.logger.warning("Lease of job %s ran out before it was done, leaving it to its new worker",
+                                    job['id'])
+        except Exception as e:
+            status = self.job_queue.fail(job['id'], self.worker_id, e)
+            self.logger.error("Error processing post %s (attempt %s, %s): %s",
+                              job['payload'].get('title', 'Unknown'), job['attempts'],
+                              status or 'lease lost', e)
+        except BaseException:
+            self.job_queue.release(job['id'], self.worker_id)
+            raise
+        finally:
+            stop.set()
+            heartbeat.join()
+            current_post.reset(post_token)
+            current_run.reset(run_token)
+
+    def run(self, once=False, poll_interval=WORKER_POLL_INTERVAL):
+        """Process jobs until interrupted; with once=True, until the queue is empty"""
+        self.logger.info("Worker %s waiting for jobs in %s", self.worker_id, self.job_queue.path)
+        try:
+            while True:
+                job = self.job_queue.claim(self.worker_id)
+                if job is None:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                self.run_job(job)
+        except KeyboardInterrupt:
+            self.logger.info("Worker %s stopped", self.worker_id)
+        finally:
+            self.image_handler.close()
+
+
+def run_worker(queue_path=JOB_QUEUE_PATH, once=False):
+    """Entry point of one worker process"""
+    load_environment()
+    job_queue = JobQueue(queue_path)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    setup_logging(extra_handlers=[JobEventHandler(job_queue, worker_id)])
+    PostWorker(job_queue, worker_id).run(once=once)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the posts queued in worker mode")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes to start")
+    parser.add_argument('--queue', default=JOB_QUEUE_PATH, help="Job queue file shared with the web interface")
+    parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.queue, args.once)
+        return
+
+    # Each process has its own interpreter, heap and browser; spawn does not inherit locks or threads
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=run_worker, args=(args.queue, args.once), name=f"worker-{index}")
+                 for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # The children got the interrupt too and give their jobs back
+        for process in processes:
+            process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from benchmarks.fake_services import FakeWordPress, FakeSheet
+from modules.image_buffer import ImageBuffer
+from modules.async_clients import AsyncWordPressIntegration
+
+
+@pytest.fixture
+def site():
+    service = FakeWordPress()
+    service.start()
+    yield service
+    service.stop()
+
+
+def test_async_wordpress_uploads_and_publishes(site, tmp_path):
+    image_path = tmp_path / 'car.jpg'
+    image_path.write_bytes(b'\xff\xd8' + b'x' * 200 * 1024)
+
+    async def publish():
+        async with AsyncWordPressIntegration(site.url, 'user', 'password') as wordpress:
+            featured = await wordpress.upload_media(str(image_path))
+            content_media = await wordpress.upload_images([ImageBuffer(b'y' * 1024, 'a.jpg'), '/missing.jpg'])
+            post_id = await wordpress.publish_post('Title', '<p>Body</p>', featured_media=featured, slug='title')
+            await wordpress.publish_post('Title', '<p>New body</p>', featured_media=featured['id'], post_id=post_id)
+            return featured, content_media, post_id
+
+    featured, content_media, post_id = asyncio.run(publish())
+
+    assert featured['url'].endswith('/car.jpg')
+    assert [media['url'].rsplit('/', 1)[-1] for media in content_media] == ['a.jpg']
+    assert site.media_bytes > 200 * 1024
+    post = site.posts[post_id]
+    assert post['status'] == 'publish'
+    assert post['content'] == '<p>New body</p>'
+    assert post['featured_media'] == featured['id']
+
+
+def test_async_wordpress_checks_existing_posts(site):
+    site.posts[1] = {'id': 1, 'slug': 'live-post', 'status': 'publish'}
+    site.posts[2] = {'id': 2, 'slug': 'draft-post', 'status': 'draft'}
+    rows = [{'title': title} for title in ('Live Post', 'Draft Post', 'New Post')]
+
+    async def check():
+        async with AsyncWordPressIntegration(site.url, 'user', 'password') as wordpress:
+            return await wordpress.filter_existing_posts(rows, policy='skip')
+
+    remaining = asyncio.run(check())
+
+    assert [(row['slug'], row.get('existing_id')) for row in remaining] == [('draft-post', 2), ('new-post', None)]
+
+
+def test_async_wordpress_terms_and_batches(site):
+    site.terms['categories'][5] = {'id': 5, 'name': 'Cars', 'slug': 'cars'}
+
+    async def run():
+        async with AsyncWordPressIntegration(site.url, 'user', 'password') as wordpress:
+            existing = await wordpress.get_or_create_term('categories', 'Cars')
+            created = await wordpress.get_or_create_term('categories', 'Electric Cars')
+            supported = await wordpress.supports_batch()
+            responses = await wordpress.batch_request([
+                {'method': 'POST', 'path': '/wp/v2/posts', 'body': {'title': 'One', 'slug': 'one'}},
+                {'method': 'POST', 'path': '/wp/v2/posts', 'body': {'title': 'Two', 'slug': 'two'}}
+            ])
+            return existing, created, supported, responses
+
+    existing, created, supported, responses = asyncio.run(run())
+
+    assert existing == 5
+    assert site.terms['categories'][created]['name'] == 'Electric Cars'
+    assert supported
+    assert [response['status'] for response in responses] == [201, 201]
+    assert sorted(post['slug'] for post in site.posts.values()) == ['one', 'two']
+
+
+def test_async_sheets_reads_the_csv_export(monkeypatch):
+    from modules import google_sheets
+    from modules.async_clients import AsyncGoogleSheetsManager
+
+    sheet = FakeSheet(num_posts=3)
+    sheet.start()
+    monkeypatch.setattr(google_sheets, 'GOOGLE_SHEETS_CSV_URL',
+                        sheet.url + '/spreadsheets/d/{spreadsheet_id}/export?format=csv')
+
+    async def fetch():
+        async with AsyncGoogleSheetsManager('sheet-id') as sheets:
+            return await sheets.get_blog_data()
+
+    try:
+        rows = asyncio.run(fetch())
+    finally:
+        sheet.stop()
+
+    assert [row['title'].rsplit(' ', 2)[1:] for row in rows] == [['Guide', '1'], ['Guide', '2'], ['Guide', '3']]
+    assert rows[0]['context'] == 'Benchmark article 1'
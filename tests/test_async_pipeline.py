@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from modules import async_pipeline
+
+pytest.importorskip('httpx')
+
+
+def test_available_with_direct_publishing(monkeypatch):
+    monkeypatch.setattr(async_pipeline, 'PUBLISH_MODE', 'direct')
+    monkeypatch.setattr(async_pipeline, 'WORDPRESS_BATCH_PUBLISH', False)
+    assert async_pipeline.async_pipeline_available()
+
+
+@pytest.mark.parametrize('publish_mode, batch_publish', [('draft', False), ('direct', True)])
+def test_draft_and_batch_publishing_use_the_threaded_pipeline(monkeypatch, caplog, publish_mode, batch_publish):
+    monkeypatch.setattr(async_pipeline, 'PUBLISH_MODE', publish_mode)
+    monkeypatch.setattr(async_pipeline, 'WORDPRESS_BATCH_PUBLISH', batch_publish)
+    assert not async_pipeline.async_pipeline_available()
+    assert 'using the threaded pipeline' in caplog.text
+
+
+class StubImageHandler:
+    async def search_and_download_images_async(self, topic, keywords, num_images=5, downloader=None):
+        return ['featured.jpg', 'content-1.jpg', 'content-2.jpg']
+
+    def select_featured_image(self, images):
+        return images[0]
+
+
+class StubLLM:
+    async def generate_content(self, **kwargs):
+        await asyncio.sleep(0.01)
+        return "# Title\n\nBody"
+
+
+class FailingFeaturedUpload:
+    def __init__(self):
+        self.content_upload_finished = False
+        self.content_upload_cancelled = False
+
+    async def upload_media(self, image):
+        raise RuntimeError("upload failed")
+
+    async def upload_images(self, images):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.content_upload_cancelled = True
+            raise
+        finally:
+            self.content_upload_finished = True
+
+
+def test_failed_featured_upload_cancels_and_awaits_the_content_uploads():
+    pipeline = object.__new__(async_pipeline.AsyncPipeline)
+    pipeline.setup_logging()
+    pipeline.image_handler = StubImageHandler()
+    pipeline.llm = StubLLM()
+    pipeline.wordpress = FailingFeaturedUpload()
+    pipeline.downloader = None
+    pipeline.num_images = 3
+    pipeline.article_length = 100
+    post = {'title': 'Title', 'topic': 'cars', 'keywords': 'ev', 'context': '', 'slug': 'title',
+            'must_have_elements': ''}
+
+    async def process():
+        post_id = await pipeline.process_post(post)
+        # Checked before asyncio.run() cancels whatever is left at shutdown
+        return post_id, pipeline.wordpress.content_upload_cancelled, pipeline.wordpress.content_upload_finished
+
+    assert asyncio.run(process()) == (None, True, True)
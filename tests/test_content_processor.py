@@ -0,0 +1,24 @@
+from modules import content_processor
+from modules.content_processor import ContentProcessor, render_post
+
+
+def test_render_post_needs_no_wordpress():
+    media = [{'id': 7, 'url': 'https://example.com/wp-content/uploads/car.jpg'}]
+    html = ContentProcessor().render_post("# Title\n\nFirst paragraph.\n\nSecond paragraph.", media)
+    assert '<h1>Title</h1>' in html
+    assert 'src="https://example.com/wp-content/uploads/car.jpg"' in html
+
+
+def test_render_post_keeps_a_processor_per_backend():
+    render_post("text", markdown_backend='markdown2')
+    render_post("text", markdown_backend='mistune')
+    processors = content_processor._process_content_processors
+    assert processors['markdown2'] is not processors['mistune']
+    assert processors['markdown2'].markdown_converter.name == 'markdown2'
+
+
+def test_render_post_takes_the_must_have_elements_of_a_sheet_row():
+    html = ContentProcessor().render_post("Some text.", required_elements='table, code_block')
+    assert '<table>' in html
+    assert '<pre><code>' in html
+    assert '<ul>' not in html
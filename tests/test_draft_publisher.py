@@ -0,0 +1,114 @@
+import re
+
+import pytest
+
+from benchmarks.fake_services import FakeWordPress
+from modules import draft_publisher
+from modules.draft_publisher import DraftPublisher
+from modules.wordpress_batch import BatchItemError
+from modules.wordpress_integration import WordPressIntegration
+
+
+class FlakyWordPress(FakeWordPress):
+    """Fails the first `failures` status updates of every post with a 500, like an overloaded site"""
+
+    def __init__(self, failures, batch=True):
+        super().__init__(batch=batch)
+        self.failures = failures
+        self.update_attempts = {}
+
+    def route(self, method, path, query, data):
+        match = re.match(r'/wp/v2/posts/(\d+)$', path)
+        if match and method == 'POST':
+            post_id = int(match.group(1))
+            self.update_attempts[post_id] = self.update_attempts.get(post_id, 0) + 1
+            if self.update_attempts[post_id] <= self.failures:
+                return 500, {'code': 'internal_server_error', 'message': 'Database error'}
+        return super().route(method, path, query, data)
+
+
+@pytest.fixture
+def services():
+    started = []
+    yield started
+    for service in started:
+        service.stop()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(draft_publisher, 'RETRY_DELAY', 0)
+
+
+def start(services, site):
+    site.start()
+    services.append(site)
+    return site, WordPressIntegration(site.url, 'user', 'password')
+
+
+def publish(wordpress, titles, **options):
+    publisher = DraftPublisher(wordpress, max_workers=2, **options)
+    futures = [publisher.create_post(title, f"<p>{title}</p>", slug=title.lower()) for title in titles]
+    assert not any(future.done() for future in futures)
+    publisher.close()
+    return futures
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_drafts_are_published_together_at_the_end(services, batch):
+    site, wordpress = start(services, FakeWordPress(batch=batch))
+
+    futures = publish(wordpress, ['One', 'Two', 'Three'], publish_date=None)
+
+    assert sorted(site.posts[future.result()]['slug'] for future in futures) == ['one', 'three', 'two']
+    assert all(post['status'] == 'publish' for post in site.posts.values())
+
+
+def test_publish_date_schedules_the_drafts(services):
+    site, wordpress = start(services, FakeWordPress())
+
+    [future] = publish(wordpress, ['One'], publish_date='2030-01-01T09:00:00')
+
+    assert site.posts[future.result()]['date'] == '2030-01-01T09:00:00'
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_failed_transitions_are_retried(services, batch):
+    site, wordpress = start(services, FlakyWordPress(failures=2, batch=batch))
+
+    futures = publish(wordpress, ['One', 'Two'], publish_date=None, retries=2)
+
+    assert all(site.posts[future.result()]['status'] == 'publish' for future in futures)
+    assert set(site.update_attempts.values()) == {3}
+    # Retrying the transition never creates a second post
+    assert len(site.posts) == 2
+
+
+def test_posts_stay_drafts_once_the_retries_are_used_up(services):
+    site, wordpress = start(services, FlakyWordPress(failures=5))
+
+    [future] = publish(wordpress, ['One'], publish_date=None, retries=1)
+
+    with pytest.raises(BatchItemError) as error:
+        future.result()
+    assert error.value.status == 500
+    assert [post['status'] for post in site.posts.values()] == ['draft']
+    assert list(site.update_attempts.values()) == [2]
+
+
+def test_failed_drafts_fail_their_future_only(services, monkeypatch):
+    site, wordpress = start(services, FakeWordPress())
+    create_post = wordpress.create_post
+
+    def create_or_fail(title, *args, **kwargs):
+        if title == 'Broken':
+            raise RuntimeError("draft not created")
+        return create_post(title, *args, **kwargs)
+
+    monkeypatch.setattr(wordpress, 'create_post', create_or_fail)
+
+    broken, good = publish(wordpress, ['Broken', 'Good'], publish_date=None)
+
+    with pytest.raises(RuntimeError):
+        broken.result()
+    assert site.posts[good.result()]['status'] == 'publish'
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+
+from modules.image_buffer import ImageBuffer
+from modules.image_hashing import (
+    DuplicateFilter,
+    PublishedImageIndex,
+    compute_hash,
+    hamming_distance,
+    HASH_FUNCTIONS
+)
+
+
+def photo(seed=0, size=(320, 240)):
+    """Smooth random image with structure at every scale the hashes look at"""
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)).resize(size, Image.BICUBIC)
+
+
+@pytest.mark.parametrize('algorithm', sorted(HASH_FUNCTIONS))
+def test_resized_copies_hash_alike_and_other_images_do_not(algorithm):
+    original = compute_hash(photo(), algorithm)
+    resized = compute_hash(photo().resize((160, 120)), algorithm)
+    other = compute_hash(photo(seed=1), algorithm)
+
+    assert 0 <= original < 2 ** 64
+    assert hamming_distance(original, resized) <= 4
+    assert hamming_distance(original, other) > 10
+
+
+def test_hashes_paths_and_image_buffers_alike(tmp_path):
+    path = tmp_path / 'image.png'
+    photo().save(path)
+    assert compute_hash(str(path), 'phash') == compute_hash(ImageBuffer(path.read_bytes(), 'image.png'), 'phash')
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        compute_hash(photo(), 'md5')
+
+
+def test_duplicate_filter_rejects_near_duplicates_within_a_post():
+    duplicate_filter = DuplicateFilter(threshold=6, algorithm='phash')
+
+    assert not duplicate_filter.is_duplicate(photo(), 'a.jpg')
+    assert duplicate_filter.is_duplicate(photo().resize((200, 150)), 'b.jpg')
+    assert not duplicate_filter.is_duplicate(photo(seed=1), 'c.jpg')
+    assert [label for _, label in duplicate_filter.seen] == ['a.jpg', 'c.jpg']
+
+
+def test_duplicate_filter_rejects_published_images(tmp_path):
+    index = PublishedImageIndex(str(tmp_path / 'index.json'), algorithm='phash')
+    index.add(compute_hash(photo(), 'phash'), post_id=12)
+    duplicate_filter = DuplicateFilter(threshold=6, algorithm='phash', published_index=index)
+
+    assert duplicate_filter.is_duplicate(photo().resize((200, 150)), 'b.jpg')
+    assert not duplicate_filter.is_duplicate(photo(seed=1), 'c.jpg')
+
+
+def test_published_index_finds_hashes_within_the_threshold():
+    index = PublishedImageIndex('unused.json')
+    index._entries, index._hashes = {}, np.array([], dtype=np.uint64)
+    index.add(0b1111, post_id=1)
+    index.add(2 ** 63, post_id=2)
+
+    assert index.find(0b1111, threshold=0)['post_id'] == 1
+    assert index.find(0b0111, threshold=1)['post_id'] == 1
+    assert index.find(2 ** 63 + 1, threshold=2)['post_id'] == 2
+    assert index.find(0b11110000, threshold=3) is None
+
+
+def test_published_index_is_saved_and_reloaded(tmp_path):
+    path = tmp_path / 'nested' / 'index.json'
+    index = PublishedImageIndex(str(path), algorithm='phash')
+    assert index.find(42) is None
+    index.add(42, post_id=7, url='https://example.com/a.jpg')
+    index.save()
+
+    reloaded = PublishedImageIndex(str(path), algorithm='phash')
+    assert reloaded.find(42, threshold=0)['post_id'] == 7
+    assert not (tmp_path / 'nested' / 'index.json.tmp').exists()
+
+
+def test_published_index_of_another_algorithm_is_ignored(tmp_path):
+    path = tmp_path / 'index.json'
+    path.write_text(json.dumps({'algorithm': 'ahash', 'images': {format(42, '016x'): {'post_id': 7}}}))
+    assert PublishedImageIndex(str(path), algorithm='phash').find(42, threshold=0) is None
+    assert PublishedImageIndex(str(path), algorithm='ahash').find(42, threshold=0)['post_id'] == 7
@@ -0,0 +1,43 @@
+import os
+import json
+
+import pytest
+
+from modules.image_library import LocalImageLibrary
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def make_library(tmp_path):
+    root = tmp_path / 'library'
+    root.mkdir()
+    for name, color in (('electric-car-red.jpg', (200, 30, 30)), ('electric-car-charging.jpg', (30, 30, 200))):
+        # Different halves so the two images are not near-duplicates of each other
+        image = Image.new('RGB', (320, 240), color)
+        image.paste((255, 255, 255), (0, 0, 160, 240) if 'red' in name else (0, 0, 320, 120))
+        image.save(root / name)
+    index_path = str(tmp_path / 'index.json')
+    library = LocalImageLibrary(root=str(root), index_path=index_path)
+    library._index()
+    return library, root, index_path
+
+
+def test_search_skips_and_forgets_deleted_images(tmp_path):
+    library, root, index_path = make_library(tmp_path)
+    assert len(library.search('electric car', 5)) == 2
+
+    os.remove(root / 'electric-car-red.jpg')
+    # A stored index read by another process still lists the deleted image
+    stale = LocalImageLibrary(root=str(root), index_path=index_path)
+
+    assert stale.search('electric car', 5) == [os.path.join(str(root), 'electric-car-charging.jpg')]
+    assert 'electric-car-red.jpg' not in stale.entries
+    assert 'electric-car-red.jpg' not in stale.inverted.get('red', set())
+    with open(index_path) as f:
+        assert list(json.load(f)['images']) == ['electric-car-charging.jpg']
+
+
+def test_forget_ignores_unknown_images(tmp_path):
+    library, root, _ = make_library(tmp_path)
+    library.forget(os.path.join(str(root), 'missing.jpg'))
+    assert len(library.entries) == 2
@@ -0,0 +1,41 @@
+import pytest
+
+from modules.image_preprocessor import ImagePreprocessor
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def make_images(directory, count, width=800):
+    directory.mkdir(exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = directory / f"image-{index}.png"
+        Image.new('RGB', (width, width // 2), (index * 40, 120, 200)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_pool_is_kept_across_batches_until_close(tmp_path):
+    preprocessor = ImagePreprocessor(max_width=200, output_format='jpeg', target_bytes=None, max_workers=2)
+    try:
+        first = preprocessor.process_images(make_images(tmp_path / 'first', 3))
+        pool = preprocessor._pool
+        assert pool is not None
+        second = preprocessor.process_images(make_images(tmp_path / 'second', 2, width=600))
+        assert preprocessor._pool is pool
+    finally:
+        preprocessor.close()
+    assert preprocessor._pool is None
+
+    for path in first + second:
+        assert path.endswith('.jpg')
+        with Image.open(path) as image:
+            assert image.width == 200
+
+
+def test_single_image_is_processed_inline(tmp_path):
+    preprocessor = ImagePreprocessor(max_width=100, output_format='jpeg', target_bytes=None, max_workers=4)
+    [path] = preprocessor.process_images(make_images(tmp_path, 1))
+    assert preprocessor._pool is None
+    with Image.open(path) as image:
+        assert image.width == 100
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+np = pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+
+from modules.image_buffer import ImageBuffer
+from modules.image_scorer import ImageScorer
+
+
+def photo(size, seed=0):
+    """Noisy, colorful image: sharp and contrasted"""
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+
+def save(image, path):
+    image.save(path)
+    return str(path)
+
+
+def test_prefers_large_images_of_the_featured_shape(tmp_path):
+    scorer = ImageScorer(featured_size=(1200, 628))
+    small = save(photo((300, 157)), tmp_path / 'small.png')
+    tall = save(photo((628, 1200)), tmp_path / 'tall.png')
+    featured = save(photo((1200, 628)), tmp_path / 'featured.png')
+
+    paths, scores = scorer.score_images([small, tall, featured])
+
+    assert paths == [small, tall, featured]
+    assert scores[2] > scores[1] and scores[2] > scores[0]
+    assert scorer.select_best([small, tall, featured]) == featured
+
+
+def test_prefers_sharp_colorful_images_over_flat_ones(tmp_path):
+    scorer = ImageScorer(featured_size=(400, 300))
+    flat = save(Image.new('RGB', (400, 300), (128, 128, 128)), tmp_path / 'flat.png')
+    detailed = save(photo((400, 300)), tmp_path / 'detailed.png')
+
+    metrics = scorer.compute_metrics(*scorer.load_batch([flat, detailed])[1:])
+
+    for name in ('sharpness', 'colorfulness', 'contrast'):
+        assert metrics[name][0] == pytest.approx(0, abs=1e-3)
+        assert metrics[name][1] > 0
+    assert scorer.select_best([flat, detailed]) == detailed
+
+
+def test_scores_are_between_zero_and_one(tmp_path):
+    scorer = ImageScorer()
+    paths = [save(photo((width, 500), seed=width), tmp_path / f"{width}.png") for width in (200, 900, 3000)]
+    _, scores = scorer.score_images(paths)
+    assert ((scores >= 0) & (scores <= 1)).all()
+
+
+def test_scores_image_buffers_and_skips_undecodable_images(tmp_path):
+    scorer = ImageScorer(featured_size=(400, 300))
+    encoded = io.BytesIO()
+    photo((400, 300)).save(encoded, format='JPEG')
+    buffer = ImageBuffer(encoded.getvalue(), 'photo.jpg')
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not an image')
+
+    paths, scores = scorer.score_images([str(broken), buffer])
+
+    assert paths == [buffer]
+    assert len(scores) == 1
+    assert scorer.select_best([str(broken)]) is None
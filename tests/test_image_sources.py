@@ -0,0 +1,110 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.metrics import registry
+from modules.image_sources import HttpImageSource, ImageSourceChain
+
+RESULTS_PAGE = """<html><body>
+<script>var data = [["https://cdn.example.com/embedded.jpg",800,1200]];</script>
+<a href="/imgres?imgurl=https://photos.example.com/linked.jpg&amp;imgrefurl=https://example.com">result</a>
+<img src="https://encrypted-tbn0.gstatic.com/images?q=thumbnail">
+<img data-src="https://photos.example.com/lazy.jpg">
+<img src="https://cdn.example.com/embedded.jpg">
+</body></html>"""
+
+JSON_RESULTS = {'images': [{'url': 'https://cdn.example.com/a.jpg'}, {'url': 'https://www.gstatic.com/b.png'},
+                           {'url': 'https://cdn.example.com/c.png'}]}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/html':
+            self.reply(200, 'text/html', RESULTS_PAGE)
+        elif path == '/json':
+            self.reply(200, 'application/json', json.dumps(JSON_RESULTS))
+        elif path == '/empty':
+            self.reply(200, 'text/html', '<html><body>No results</body></html>')
+        else:
+            self.reply(500, 'text/plain', 'error')
+
+    def reply(self, status, content_type, body):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class FixtureSource(HttpImageSource):
+    name = 'fixture'
+
+
+def test_http_source_parses_results_page(server_url):
+    pytest.importorskip('bs4')
+    urls = HttpImageSource(search_url=f"{server_url}/html").search('electric car', 10)
+    assert urls == [
+        'https://cdn.example.com/embedded.jpg',
+        'https://photos.example.com/linked.jpg',
+        'https://photos.example.com/lazy.jpg',
+    ]
+
+
+def test_http_source_parses_json_and_limits_results(server_url):
+    source = HttpImageSource(search_url=f"{server_url}/json")
+    assert source.search('electric car', 10) == ['https://cdn.example.com/a.jpg', 'https://cdn.example.com/c.png']
+    assert source.search('electric car', 1) == ['https://cdn.example.com/a.jpg']
+
+
+def test_chain_falls_back_after_a_failing_source(server_url):
+    pytest.importorskip('bs4')
+    errors_before = registry.calls.get(('search_http', 'error'), 0)
+    chain = ImageSourceChain([HttpImageSource(search_url=f"{server_url}/fail"),
+                              FixtureSource(search_url=f"{server_url}/html")])
+
+    urls, source_name = chain.search('electric car', 2)
+
+    assert source_name == 'fixture'
+    assert urls == ['https://cdn.example.com/embedded.jpg', 'https://photos.example.com/linked.jpg']
+    metrics = chain.get_metrics()
+    assert metrics['http']['failures'] == 1
+    assert metrics['fixture']['successes'] == 1
+    assert registry.calls[('search_http', 'error')] == errors_before + 1
+
+
+def test_chain_falls_back_after_an_empty_source(server_url):
+    pytest.importorskip('bs4')
+    chain = ImageSourceChain([HttpImageSource(search_url=f"{server_url}/empty"),
+                              FixtureSource(search_url=f"{server_url}/json")])
+
+    urls, source_name = chain.search('electric car', 5)
+
+    assert source_name == 'fixture'
+    assert len(urls) == 2
+    assert chain.get_metrics()['http']['empty'] == 1
+
+
+def test_chain_returns_nothing_when_every_source_fails(server_url):
+    chain = ImageSourceChain([HttpImageSource(search_url=f"{server_url}/fail"),
+                              FixtureSource(search_url=f"{server_url}/fail")])
+
+    assert chain.search('electric car', 5) == ([], None)
+    metrics = chain.get_metrics()
+    assert metrics['http']['failures'] == metrics['fixture']['failures'] == 1
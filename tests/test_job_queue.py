@@ -0,0 +1,104 @@
+import time
+
+from modules.job_queue import JobQueue
+
+
+def make_queue(tmp_path, **options):
+    return JobQueue(str(tmp_path / 'jobs.db'), **options)
+
+
+def job_row(queue, job_id):
+    return dict(queue._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+
+def expire_lease(queue, job_id):
+    queue._connection().execute('UPDATE jobs SET lease_expires = ? WHERE id = ?', (time.time() - 1, job_id))
+
+
+def test_worker_that_lost_its_lease_cannot_complete_the_job(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.create_run({}, [{'title': 'Post'}])
+    job = queue.claim('worker-1')
+    expire_lease(queue, job['id'])
+    assert queue.claim('worker-2')['id'] == job['id']
+
+    assert not queue.complete(job['id'], 'worker-1', {'post_id': 1})
+    assert queue.fail(job['id'], 'worker-1', 'Timed out') is None
+    queue.release(job['id'], 'worker-1')
+    row = job_row(queue, job['id'])
+    assert (row['status'], row['worker'], row['error']) == ('running', 'worker-2', None)
+
+    assert queue.complete(job['id'], 'worker-2', {'post_id': 2})
+    row = job_row(queue, job['id'])
+    assert (row['status'], row['result']) == ('done', '{"post_id": 2}')
+
+
+def test_jobs_are_claimed_oldest_first_and_once(tmp_path):
+    queue = make_queue(tmp_path)
+    run_id = queue.create_run({'num_images': 3}, [{'title': 'One'}, {'title': 'Two'}])
+
+    first = queue.claim('worker-1')
+    second = queue.claim('worker-2')
+
+    assert (first['payload'], second['payload']) == ({'title': 'One'}, {'title': 'Two'})
+    assert first['attempts'] == 1
+    assert queue.claim('worker-3') is None
+    assert queue.run_settings(run_id) == {'num_images': 3}
+    assert queue.run_counts(run_id) == {'queued': 0, 'running': 2, 'done': 0, 'failed': 0}
+
+
+def test_renewed_leases_are_not_reclaimed(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.create_run({}, [{'title': 'Post'}])
+    job = queue.claim('worker-1')
+
+    expire_lease(queue, job['id'])
+    assert queue.renew_lease(job['id'], 'worker-1')
+    assert queue.claim('worker-2') is None
+    assert not queue.renew_lease(job['id'], 'worker-2')
+
+
+def test_jobs_of_dead_workers_are_reclaimed_until_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    run_id = queue.create_run({}, [{'title': 'Post'}])
+
+    job = queue.claim('worker-1')
+    expire_lease(queue, job['id'])
+    reclaimed = queue.claim('worker-2')
+    assert (reclaimed['id'], reclaimed['attempts']) == (job['id'], 2)
+
+    expire_lease(queue, job['id'])
+    assert queue.claim('worker-3') is None
+    row = job_row(queue, job['id'])
+    assert (row['status'], row['error']) == ('failed', 'Worker worker-2 stopped responding')
+    assert queue.run_counts(run_id)['failed'] == 1
+
+
+def test_failed_jobs_are_queued_again_until_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.create_run({}, [{'title': 'Post'}])
+
+    job = queue.claim('worker-1')
+    assert queue.fail(job['id'], 'worker-1', 'LLM timed out') == 'queued'
+    job = queue.claim('worker-2')
+    assert queue.fail(job['id'], 'worker-2', 'LLM timed out') == 'failed'
+    assert queue.claim('worker-3') is None
+    assert job_row(queue, job['id'])['error'] == 'LLM timed out'
+
+
+def test_released_jobs_do_not_count_the_attempt(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=1)
+    queue.create_run({}, [{'title': 'Post'}])
+
+    job = queue.claim('worker-1')
+    queue.release(job['id'], 'worker-1')
+    job = queue.claim('worker-2')
+    assert job['attempts'] == 1
+    assert queue.complete(job['id'], 'worker-2', {'post_id': 5})
+
+
+def test_finished_runs_drop_their_credentials(tmp_path):
+    queue = make_queue(tmp_path)
+    run_id = queue.create_run({'wordpress_url': 'https://example.com', 'wordpress_password': 'secret'}, [])
+    queue.finish_run(run_id)
+    assert queue.run_settings(run_id) == {'wordpress_url': 'https://example.com'}
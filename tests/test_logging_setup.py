@@ -0,0 +1,114 @@
+import json
+import logging
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from modules import logging_setup
+from modules.logging_setup import ContextFilter, JsonFormatter, setup_logging, stop_logging
+from modules.metrics import RunMetrics, current_post, span, submit_in_context
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, name=None):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+        self.set_name(name)
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+
+
+@pytest.fixture
+def default_handler(monkeypatch):
+    """setup_logging() with a fresh queue and an in-memory handler instead of the log file and console"""
+    handler = ListHandler('file')
+    log_queue = queue.SimpleQueue()
+    monkeypatch.setattr(logging_setup, '_queue', log_queue)
+    monkeypatch.setattr(logging_setup, '_listener', None)
+    monkeypatch.setattr(logging_setup, 'default_handlers', lambda: [handler])
+    root = logging.getLogger()
+    level = root.level
+    yield handler
+    stop_logging()
+    for queue_handler in [h for h in root.handlers if getattr(h, 'queue', None) is log_queue]:
+        root.removeHandler(queue_handler)
+    root.setLevel(level)
+
+
+def test_context_filter_adds_run_post_and_stage():
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', (), None)
+    ContextFilter().filter(record)
+    assert (record.run_id, record.post_id, record.stage) == (None, None, None)
+
+    run = RunMetrics.start_run('run-1')
+    token = current_post.set('electric-cars')
+    try:
+        with span('generate'):
+            ContextFilter().filter(record)
+    finally:
+        current_post.reset(token)
+        run.finish()
+    assert (record.run_id, record.post_id, record.stage) == ('run-1', 'electric-cars', 'generate')
+
+
+def test_records_carry_the_context_they_were_logged_in(default_handler):
+    setup_logging(level=logging.INFO)
+    logger = logging.getLogger('tests.logging_setup')
+
+    def log_from_worker():
+        logger.info("From the worker")
+
+    run = RunMetrics.start_run('run-2')
+    token = current_post.set('post-a')
+    try:
+        with span('image_search'):
+            # Submitted in context, so the worker thread's record has the same run, post and stage
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                submit_in_context(executor, log_from_worker).result()
+        current_post.set('post-b')
+        logger.info("From the main thread")
+    finally:
+        current_post.reset(token)
+        run.finish()
+    stop_logging()
+
+    records = {record.getMessage(): record for record in default_handler.records}
+    worker, main = records["From the worker"], records["From the main thread"]
+    assert (worker.run_id, worker.post_id, worker.stage) == ('run-2', 'post-a', 'image_search')
+    assert (main.run_id, main.post_id, main.stage) == ('run-2', 'post-b', None)
+    # Handlers run in the listener thread, not in the threads that log
+    assert threading.current_thread().name not in default_handler.threads
+
+
+def test_setup_logging_never_duplicates_handlers(default_handler):
+    web = ListHandler('web')
+    first = setup_logging(level=logging.INFO)
+    assert setup_logging(level=logging.INFO) is first
+    listener = setup_logging(extra_handlers=[web], level=logging.INFO)
+    assert setup_logging(extra_handlers=[web], level=logging.INFO) is listener
+    assert setup_logging(extra_handlers=[ListHandler('web')], level=logging.INFO) is listener
+    assert [handler.get_name() for handler in listener.handlers] == ['file', 'web']
+
+    queue_handlers = [h for h in logging.getLogger().handlers if getattr(h, 'queue', None) is logging_setup._queue]
+    assert len(queue_handlers) == 1
+
+    logging.getLogger('tests.logging_setup').warning("Once")
+    stop_logging()
+    assert [record.getMessage() for record in default_handler.records].count("Once") == 1
+    assert [record.getMessage() for record in web.records].count("Once") == 1
+
+
+def test_json_formatter_includes_the_context():
+    record = logging.LogRecord('modules.test', logging.ERROR, __file__, 1, 'Failed %s', ('upload',), None)
+    record.run_id, record.post_id, record.stage = 'run-3', 'post-c', 'media_upload'
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['message'] == 'Failed upload'
+    assert entry['level'] == 'ERROR'
+    assert (entry['run_id'], entry['post_id'], entry['stage']) == ('run-3', 'post-c', 'media_upload')
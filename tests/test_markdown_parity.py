@@ -0,0 +1,55 @@
+import pytest
+
+from modules.markdown_converter import CONVERTER_BACKENDS, get_converter
+
+ARTICLE = """# Electric Vehicle Charging
+
+Charging at home is the cheapest option.
+A single newline inside a paragraph is a hard line break.
+
+## Charger levels
+
+- **Level 1**: a regular outlet
+- **Level 2**: a dedicated 240 V circuit
+- **DC fast**: public stations only
+
+| Model | Range | Price |
+|---|---|---|
+| Compact | 350 km | $30k |
+| Sedan | 520 km | $55k |
+
+```python
+def range_km(kwh, efficiency):
+    return kwh * efficiency if kwh < 100 else None
+```
+
+```
+plain block
+```
+
+Read the *manual* before using `dc_fast()`.
+"""
+
+
+def normalize(html):
+    """Collapse whitespace so formatting-only differences are ignored"""
+    return ' '.join(html.split()).replace('> <', '><')
+
+
+def converter_for(backend):
+    converter = get_converter(backend)
+    if converter.name != backend:
+        pytest.skip(f"{backend} is not installed")
+    return converter
+
+
+@pytest.mark.parametrize('backend', [name for name in CONVERTER_BACKENDS if name != 'markdown2'])
+def test_backend_matches_markdown2(backend):
+    reference = converter_for('markdown2').convert(ARTICLE)
+    assert normalize(converter_for(backend).convert(ARTICLE)) == normalize(reference)
+
+
+def test_markdown2_fenced_code_is_not_highlighted():
+    html = converter_for('markdown2').convert(ARTICLE)
+    assert 'codehilite' not in html
+    assert '<pre><code class="language-python">' in html
@@ -0,0 +1,114 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from modules import metrics
+from modules.metrics import (
+    Histogram,
+    MetricsRegistry,
+    RunMetrics,
+    current_run,
+    current_stage,
+    percentile,
+    span,
+    submit_in_context
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, 'registry', registry)
+    return registry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 5, 50):
+        histogram.observe(value)
+    assert list(histogram.cumulative_counts()) == [2, 3, 4]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(55.65)
+
+
+def test_span_records_status_bytes_and_tokens(registry):
+    with span('generate') as stage:
+        assert current_stage.get() == 'generate'
+        stage.add(nbytes=100, tokens=7)
+    with pytest.raises(ValueError):
+        with span('generate'):
+            raise ValueError("failed")
+    with span('media_upload') as stage:
+        stage.status = 'error'
+
+    assert current_stage.get() is None
+    assert registry.calls == {('generate', 'ok'): 1, ('generate', 'error'): 1, ('media_upload', 'error'): 1}
+    assert registry.bytes == {'generate': 100}
+    assert registry.tokens == {'generate': 7}
+    assert registry.durations['generate'].count == 2
+
+
+def test_prometheus_rendering(registry):
+    registry.observe('markdown', 0.02, nbytes=2048)
+    registry.observe('markdown', 3.0)
+    registry.observe('generate', 0.5, status='error', tokens=10)
+
+    lines = registry.render_prometheus().splitlines()
+
+    assert '# TYPE blog_automation_stage_duration_seconds histogram' in lines
+    assert 'blog_automation_stage_duration_seconds_bucket{stage="markdown",le="0.01"} 0' in lines
+    assert 'blog_automation_stage_duration_seconds_bucket{stage="markdown",le="0.025"} 1' in lines
+    assert 'blog_automation_stage_duration_seconds_bucket{stage="markdown",le="5"} 2' in lines
+    assert 'blog_automation_stage_duration_seconds_bucket{stage="markdown",le="+Inf"} 2' in lines
+    assert 'blog_automation_stage_duration_seconds_sum{stage="markdown"} 3.020000' in lines
+    assert 'blog_automation_stage_duration_seconds_count{stage="markdown"} 2' in lines
+    assert 'blog_automation_stage_calls_total{stage="generate",status="error"} 1' in lines
+    assert 'blog_automation_stage_calls_total{stage="markdown",status="ok"} 2' in lines
+    assert 'blog_automation_stage_bytes_total{stage="markdown"} 2048' in lines
+    assert 'blog_automation_stage_tokens_total{stage="generate"} 10' in lines
+    # Every sample line belongs to a metric announced by a TYPE line
+    types = {line.split()[2] for line in lines if line.startswith('# TYPE')}
+    for line in lines:
+        if not line.startswith('#'):
+            name = line.split('{')[0]
+            assert any(name == metric or name.startswith(metric + '_') for metric in types)
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([], 0.5) == 0.0
+
+
+def timed(stage):
+    with span(stage) as current:
+        current.status = 'error'
+
+
+def test_run_collects_spans_of_its_context_and_worker_threads(registry, caplog):
+    run = RunMetrics.start_run('run-1')
+    try:
+        with span('markdown') as stage:
+            stage.add(nbytes=1024)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [submit_in_context(executor, timed, 'image_download') for _ in range(3)]
+            # Submitted without the run's context, so not part of the run
+            futures.append(executor.submit(timed, 'outside_run'))
+            for future in futures:
+                future.result()
+    finally:
+        with caplog.at_level(logging.INFO, logger='modules.metrics'):
+            run.finish()
+
+    assert current_run.get() is None
+    stats = run.stage_stats()
+    assert set(stats) == {'markdown', 'image_download'}
+    assert stats['image_download']['count'] == 3
+    assert stats['image_download']['errors'] == 3
+    assert stats['markdown']['bytes'] == 1024
+    assert metrics.recent_runs[-1] is run
+    assert 'Run summary (run-1)' in caplog.text
+    assert 'image_download' in caplog.text
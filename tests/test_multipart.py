@@ -0,0 +1,89 @@
+import io
+import logging
+
+import pytest
+
+from modules.multipart import MultipartFileEncoder, UploadProgressLogger, UploadTimeout
+
+
+def read_all(body):
+    chunks = []
+    while True:
+        chunk = body.read()
+        if not len(chunk):
+            return chunks
+        chunks.append(bytes(chunk))
+
+
+def expected_body(body, data):
+    return (f"--{body.boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="car.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n").encode('utf-8') + data + f"\r\n--{body.boundary}--\r\n".encode('utf-8')
+
+
+@pytest.mark.parametrize('wrap', [bytes, bytearray, memoryview, io.BytesIO])
+def test_body_is_streamed_in_chunks_of_known_length(wrap):
+    data = bytes(range(256)) * 40
+    body = MultipartFileEncoder('file', 'car.jpg', wrap(data), 'image/jpeg', chunk_size=1000)
+
+    chunks = read_all(body)
+
+    assert b''.join(chunks) == expected_body(body, data)
+    assert len(body) == len(b''.join(chunks)) == body.bytes_read
+    assert max(len(chunk) for chunk in chunks) <= 1000
+    assert body.content_type == f"multipart/form-data; boundary={body.boundary}"
+
+
+def test_file_length_counts_from_the_current_position(tmp_path):
+    path = tmp_path / 'car.jpg'
+    path.write_bytes(b'header' + b'x' * 5000)
+    with open(path, 'rb') as image_file:
+        image_file.seek(6)
+        body = MultipartFileEncoder('file', 'car.jpg', image_file, 'image/jpeg')
+        assert b''.join(read_all(body)) == expected_body(body, b'x' * 5000)
+        assert len(body) == body.bytes_read
+
+
+def test_in_memory_data_is_sent_without_copying():
+    data = bytearray(b'x' * 4096)
+    body = MultipartFileEncoder('file', 'car.jpg', data, 'image/jpeg', chunk_size=1024)
+    body.read()  # The part headers
+    chunk = body.read()
+    assert isinstance(chunk, memoryview)
+    data[0:1] = b'y'
+    assert bytes(chunk[:1]) == b'y'
+
+
+def test_progress_is_reported_up_to_the_total():
+    calls = []
+    body = MultipartFileEncoder('file', 'car.jpg', b'x' * 3000, 'image/jpeg', chunk_size=1024,
+                                progress_callback=lambda sent, total: calls.append((sent, total)))
+    read_all(body)
+    assert calls[-1] == (len(body), len(body))
+    assert [sent for sent, _ in calls] == sorted(sent for sent, _ in calls)
+
+
+def test_read_raises_once_the_upload_runs_past_its_timeout(monkeypatch):
+    clock = iter([100.0, 100.5, 200.0])
+    monkeypatch.setattr('modules.multipart.time.monotonic', lambda: next(clock))
+    body = MultipartFileEncoder('file', 'car.jpg', b'x' * 3000, 'image/jpeg', chunk_size=1024, timeout=30)
+    body.read()
+    body.read()
+    with pytest.raises(UploadTimeout):
+        body.read()
+
+
+def test_progress_logger_logs_each_step_once(caplog):
+    progress = UploadProgressLogger('car.jpg', step_percent=25, min_bytes=0)
+    with caplog.at_level(logging.INFO, logger='modules.multipart'):
+        for sent in range(0, 1001, 100):
+            progress(sent, 1000)
+    percents = [record.args[1] for record in caplog.records]
+    assert percents == [30, 50, 80, 100]
+
+
+def test_progress_logger_skips_small_uploads(caplog):
+    progress = UploadProgressLogger('car.jpg', min_bytes=1024 * 1024)
+    with caplog.at_level(logging.INFO, logger='modules.multipart'):
+        progress(1000, 1000)
+    assert not caplog.records
@@ -0,0 +1,72 @@
+import os
+import time
+
+from modules.temp_storage import TempStorage
+
+
+def write_file(directory, name, size):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def make_storage(root):
+    # A quota of a few bytes makes every start_run try to evict everything it can
+    return TempStorage(root=str(root), mode='disk', quota_mb=0.001)
+
+
+def test_quota_keeps_active_workspace_of_another_instance(tmp_path):
+    first = make_storage(tmp_path)
+    second = make_storage(tmp_path)
+
+    workspace = first.start_run('first')
+    image = write_file(workspace.subdir('images'), 'image.jpg', 64 * 1024)
+
+    other = second.start_run('second')
+    second.enforce_quota()
+
+    assert os.path.exists(image)
+    assert os.path.isdir(other.path)
+
+    first.end_run(workspace)
+    second.end_run(other)
+    assert not os.path.exists(workspace.path)
+    assert not os.path.exists(other.path)
+
+
+def test_quota_evicts_finished_and_abandoned_workspaces(tmp_path):
+    first = make_storage(tmp_path)
+    second = make_storage(tmp_path)
+
+    # Left behind by a run that crashed before it could remove it; its lock died with it
+    abandoned = first.start_run('abandoned')
+    write_file(abandoned.path, 'image.jpg', 64 * 1024)
+    abandoned.lock_file.close()
+    with first._lock:
+        first._active.clear()
+
+    stale = tmp_path / 'run-old'
+    stale.mkdir()
+    write_file(str(stale), 'image.jpg', 64 * 1024)
+    old = time.time() - 3600
+    os.utime(str(stale), (old, old))
+
+    workspace = second.start_run('current')
+
+    assert not os.path.exists(abandoned.path)
+    assert not stale.exists()
+    assert os.path.isdir(workspace.path)
+    second.end_run(workspace)
+
+
+def test_evict_skips_active_workspace(tmp_path):
+    first = make_storage(tmp_path)
+    second = make_storage(tmp_path)
+    workspace = first.start_run('active')
+
+    assert not first.evict(workspace.path)
+    assert not second.evict(workspace.path)
+    assert os.path.isdir(workspace.path)
+
+    first.end_run(workspace)
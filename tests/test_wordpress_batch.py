@@ -0,0 +1,113 @@
+import pytest
+
+from benchmarks.fake_services import FakeWordPress, json_response
+from modules.wordpress_integration import WordPressIntegration
+from modules.wordpress_batch import BatchPublisher, BatchItemError
+
+
+class ValidatingWordPress(FakeWordPress):
+    """Rejects posts without content, as WordPress does for an empty post"""
+
+    def route(self, method, path, query, data):
+        if path == '/wp/v2/posts' and method == 'POST' and not data.get('content'):
+            return 400, {'code': 'empty_content', 'message': 'Content, title, and excerpt are empty.'}
+        return super().route(method, path, query, data)
+
+
+class FailingBatchWordPress(FakeWordPress):
+    """Answers batch requests with status after (optionally) creating the posts, like a proxy timing out"""
+
+    def __init__(self, status, body, create=True):
+        super().__init__()
+        self.status = status
+        self.body = body
+        self.create = create
+
+    def handle(self, method, path, query, body, headers):
+        if path == '/wp-json/batch/v1' and method == 'POST':
+            if self.create:
+                super().handle(method, path, query, body, headers)
+            return json_response(self.body, self.status)
+        return super().handle(method, path, query, body, headers)
+
+
+def start(service):
+    service.start()
+    return service, WordPressIntegration(service.url, 'user', 'password')
+
+
+@pytest.fixture
+def services():
+    started = []
+    yield started
+    for service in started:
+        service.stop()
+
+
+def publish(wordpress, contents):
+    with BatchPublisher(wordpress, batch_size=10) as publisher:
+        futures = [publisher.create_post(f"Post {index}", content, slug=f"post-{index}")
+                   for index, content in enumerate(contents)]
+    return futures
+
+
+def test_batch_maps_results_and_errors_to_each_post(services):
+    site, wordpress = start(ValidatingWordPress())
+    services.append(site)
+
+    futures = publish(wordpress, ['<p>One</p>', '', '<p>Three</p>'])
+
+    assert site.requests == 2  # Batch support check and one batch
+    assert sorted(post['slug'] for post in site.posts.values()) == ['post-0', 'post-2']
+    assert site.posts[futures[0].result()]['slug'] == 'post-0'
+    assert site.posts[futures[2].result()]['slug'] == 'post-2'
+    with pytest.raises(BatchItemError) as error:
+        futures[1].result()
+    assert error.value.status == 400
+    assert error.value.code == 'empty_content'
+
+
+def test_sites_without_batch_support_get_one_request_per_post(services):
+    site, wordpress = start(FakeWordPress(batch=False))
+    services.append(site)
+
+    futures = publish(wordpress, ['<p>One</p>', '<p>Two</p>'])
+
+    assert [site.posts[future.result()]['slug'] for future in futures] == ['post-0', 'post-1']
+    assert site.requests == 3
+
+
+@pytest.mark.parametrize('status', [500, 502, 504])
+def test_server_errors_are_not_sent_again(services, status):
+    site, wordpress = start(FailingBatchWordPress(status, {'code': 'internal_server_error'}))
+    services.append(site)
+
+    futures = publish(wordpress, ['<p>One</p>', '<p>Two</p>'])
+
+    for future in futures:
+        with pytest.raises(Exception):
+            future.result()
+    # The posts the batch created before failing are not created a second time
+    assert len(site.posts) == 2
+
+
+@pytest.mark.parametrize('status, code', [(400, 'rest_invalid_param'), (404, 'rest_no_route'),
+                                          (413, 'rest_batch_max_requests')])
+def test_refused_batches_are_sent_one_by_one(services, status, code):
+    site, wordpress = start(FailingBatchWordPress(status, {'code': code}, create=False))
+    services.append(site)
+
+    futures = publish(wordpress, ['<p>One</p>', '<p>Two</p>'])
+
+    assert [site.posts[future.result()]['slug'] for future in futures] == ['post-0', 'post-1']
+
+
+def test_other_client_errors_are_not_sent_again(services):
+    site, wordpress = start(FailingBatchWordPress(403, {'code': 'rest_forbidden'}, create=False))
+    services.append(site)
+
+    futures = publish(wordpress, ['<p>One</p>'])
+
+    with pytest.raises(Exception):
+        futures[0].result()
+    assert site.posts == {}
@@ -0,0 +1,91 @@
+from modules import wordpress_cache
+from modules.wordpress_cache import SiteMetadataCache, site_metadata_cache
+
+from benchmarks.fake_services import FakeWordPress
+from modules.wordpress_integration import WordPressIntegration
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_resources_expire_after_their_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wordpress_cache.time, 'monotonic', clock)
+    cache = SiteMetadataCache(ttl=60)
+    cache.put('categories', [{'id': 1, 'name': 'Cars', 'slug': 'cars'}])
+
+    clock.now += 59
+    assert cache.get('categories')['cars']['id'] == 1
+    clock.now += 2
+    assert cache.get('categories') is None
+
+
+def test_terms_are_found_by_unescaped_name_and_slug():
+    cache = SiteMetadataCache(ttl=60)
+    index = cache.put('categories', [{'id': 1, 'name': 'Food &amp; Drink', 'slug': 'food-drink'}])
+    assert index['food & drink'] is index['food-drink']
+
+
+def test_media_is_found_by_url_file_name_and_slug():
+    cache = SiteMetadataCache(ttl=60)
+    url = 'https://example.com/wp-content/uploads/2024/05/Car.JPG'
+    index = cache.put('media', [{'id': 3, 'slug': 'car', 'source_url': url}])
+    assert index[url]['id'] == index['car.jpg']['id'] == index['car']['id'] == 3
+
+
+def test_added_items_only_go_to_loaded_resources():
+    cache = SiteMetadataCache(ttl=60)
+    cache.add('tags', {'id': 1, 'name': 'EV', 'slug': 'ev'})
+    assert cache.get('tags') is None
+
+    cache.put('tags', [])
+    cache.add('tags', {'id': 1, 'name': 'EV', 'slug': 'ev'})
+    assert cache.get('tags')['ev']['id'] == 1
+
+
+def test_invalidate_drops_one_resource_or_all():
+    cache = SiteMetadataCache(ttl=60)
+    for resource in ('categories', 'tags', 'media'):
+        cache.put(resource, [])
+    cache.invalidate('tags')
+    assert cache.get('tags') is None
+    assert cache.get('categories') == {}
+    cache.invalidate()
+    assert cache.get('categories') is None and cache.get('media') is None
+
+
+def test_one_cache_per_site():
+    assert site_metadata_cache('https://a.example.com') is site_metadata_cache('https://a.example.com')
+    assert site_metadata_cache('https://a.example.com') is not site_metadata_cache('https://b.example.com')
+
+
+def test_term_lookups_fetch_once_and_existing_terms_invalidate():
+    site = FakeWordPress()
+    site.start()
+    try:
+        site.terms['categories'][1] = {'id': 1, 'name': 'Cars', 'slug': 'cars'}
+        wordpress = WordPressIntegration(site.url, 'user', 'password')
+
+        assert wordpress.get_or_create_term('categories', 'Cars') == 1
+        assert wordpress.get_or_create_term('categories', 'cars') == 1
+        assert site.requests == 1
+
+        # Created by someone else after the categories were cached
+        site.terms['categories'][2] = {'id': 2, 'name': 'Trucks', 'slug': 'trucks'}
+        original_route = site.route
+
+        def term_exists(method, path, query, data):
+            if path == '/wp/v2/categories' and method == 'POST':
+                return 400, {'code': 'term_exists', 'data': {'term_id': 2}}
+            return original_route(method, path, query, data)
+
+        site.route = term_exists
+        assert wordpress.get_or_create_term('categories', 'Trucks') == 2
+        assert wordpress.metadata.get('categories') is None
+    finally:
+        site.stop()
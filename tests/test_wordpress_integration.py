@@ -0,0 +1,97 @@
+import pytest
+
+from benchmarks.fake_services import FakeWordPress
+from modules.wordpress_integration import WordPressIntegration, post_slug
+
+
+@pytest.fixture
+def site():
+    service = FakeWordPress()
+    service.start()
+    yield service
+    service.stop()
+
+
+@pytest.fixture
+def wordpress(site):
+    return WordPressIntegration(site.url, 'user', 'password')
+
+
+def add_post(site, slug, status):
+    post_id = site._next_id()
+    site.posts[post_id] = {'id': post_id, 'slug': slug, 'status': status, 'title': slug}
+    return post_id
+
+
+def rows(*titles):
+    return [{'title': title} for title in titles]
+
+
+@pytest.mark.parametrize('title, slug', [
+    ("Don't Panic", 'dont-panic'),
+    ("Don’t Panic: EV Range", 'dont-panic-ev-range'),
+    ('Électric  Cars & Trucks', 'electric-cars-trucks'),
+    ('EV 2.0 — the Future', 'ev-2-0-the-future'),
+    ('Tesla &amp; Rivian', 'tesla-rivian'),
+    ('snake_case title', 'snake_case-title'),
+])
+def test_post_slug_follows_wordpress(title, slug):
+    assert post_slug(title) == slug
+
+
+def test_post_slug_of_a_title_without_letters_is_stable():
+    assert post_slug('!!!') == post_slug('!!!')
+    assert post_slug('!!!').startswith('post-')
+
+
+def test_skip_policy_leaves_live_posts_and_updates_drafts(site, wordpress):
+    live_id = add_post(site, 'live-post', 'publish')
+    draft_id = add_post(site, 'draft-post', 'draft')
+
+    remaining = wordpress.filter_existing_posts(rows('Live Post', 'Draft Post', 'New Post'), policy='skip')
+
+    assert [post['slug'] for post in remaining] == ['draft-post', 'new-post']
+    assert remaining[0]['existing_id'] == draft_id
+    assert 'existing_id' not in remaining[1]
+    assert live_id not in [post.get('existing_id') for post in remaining]
+
+
+def test_update_policy_updates_every_existing_post(site, wordpress):
+    live_id = add_post(site, 'live-post', 'publish')
+    draft_id = add_post(site, 'draft-post', 'draft')
+
+    remaining = wordpress.filter_existing_posts(rows('Live Post', 'Draft Post', 'New Post'), policy='update')
+
+    assert [post.get('existing_id') for post in remaining] == [live_id, draft_id, None]
+
+
+def test_off_policy_only_assigns_slugs(site, wordpress):
+    add_post(site, 'live-post', 'publish')
+
+    remaining = wordpress.filter_existing_posts(rows('Live Post'), policy='off')
+
+    assert remaining == [{'title': 'Live Post', 'slug': 'live-post'}]
+    assert site.requests == 0
+
+
+def test_failed_lookup_keeps_every_row(site):
+    site.stop()
+    wordpress = WordPressIntegration(site.url, 'user', 'password')
+
+    remaining = wordpress.filter_existing_posts(rows('Live Post', 'New Post'), policy='skip')
+
+    assert [post['slug'] for post in remaining] == ['live-post', 'new-post']
+
+
+def test_remaining_posts_by_status(wordpress):
+    posts = [{'title': title, 'slug': slug} for title, slug in
+             (('A', 'a'), ('B', 'b'), ('C', 'c'), ('D', 'd'))]
+    existing = {
+        'a': {'id': 1, 'status': 'publish'},
+        'b': {'id': 2, 'status': 'future'},
+        'c': {'id': 3, 'status': 'pending'},
+    }
+
+    remaining = wordpress.remaining_posts(posts, existing, 'skip')
+
+    assert [(post['slug'], post.get('existing_id')) for post in remaining] == [('c', 3), ('d', None)]
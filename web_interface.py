@@ -4,8 +4,8 @@ import logging
 import threading
 import queue
 import requests
-from flask import Flask, render_template, request, jsonify, Response, stream_with_context
-from config.config import LOG_FILE, LOG_LEVEL
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, url_for, send_from_directory, abort
+from config.config import WORDPRESS_METADATA_PRELOAD, WORKER_MODE, ASYNC_PIPELINE, load_environment
 
 # Import the main functionality
 from modules.google_sheets import GoogleSheetsManager
@@ -13,6 +13,12 @@ from modules.content_processor import ContentProcessor
 from modules.wordpress_integration import WordPressIntegration
 from modules.llm_integration import LLMIntegration
 from modules.image_handler import ImageHandler
+from modules.profiling import RunProfiler, list_profiles, PROFILE_DIR, PROFILE_FILES
+from modules.metrics import RunMetrics, registry as metrics_registry
+from modules.job_queue import publish_with_workers
+from modules.publishing import publish_posts
+from modules.async_pipeline import run_async_pipeline, async_pipeline_available
+from modules.logging_setup import setup_logging, TEXT_FORMAT
 
 # Create Flask app
 app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -29,47 +35,28 @@ class QueueHandler(logging.Handler):
     def emit(self, record):
         self.log_queue.put(self.format(record))
 
-# Setup logging
-def setup_logging():
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-    # Setup file handler
-    file_handler = logging.FileHandler(LOG_FILE)
-    file_handler.setFormatter(formatter)
-
-    # Setup stream handler
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-
-    # Setup queue handler for web interface
-    queue_handler = QueueHandler(log_queue)
-    queue_handler.setFormatter(formatter)
-
-    # Configure root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(LOG_LEVEL)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(stream_handler)
-    root_logger.addHandler(queue_handler)
-
-# Initialize logging
-setup_logging()
+# Initialize logging; the web log is written by the listener thread like the file and console
+web_log_handler = QueueHandler(log_queue)
+web_log_handler.set_name('web')
+web_log_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+setup_logging(extra_handlers=[web_log_handler])
 logger = logging.getLogger(__name__)
 
 # Function to run the blog automation process
-def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images=3, article_length=1000):
+def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images=3, article_length=1000, profile=False):
     # Ensure numeric parameters are integers
     num_images = int(num_images)
     article_length = int(article_length)
+    profiler = None
+    run_metrics = None
+    image_handler = None
     try:
-        logger.info(f"Starting blog publishing process with custom parameters:")
-        logger.info(f"  - Google Sheet ID: {spreadsheet_id}")
-        logger.info(f"  - WordPress URL: {wordpress_url}")
-        logger.info(f"  - Number of Images: {num_images}")
-        logger.info(f"  - Article Length: {article_length} words")
+        load_environment()
+        logger.info("Starting blog publishing process with custom parameters:")
+        logger.info("  - Google Sheet ID: %s", spreadsheet_id)
+        logger.info("  - WordPress URL: %s", wordpress_url)
+        logger.info("  - Number of Images: %s", num_images)
+        logger.info("  - Article Length: %s words", article_length)
 
         # Override config values with user input
         from config import config
@@ -89,11 +76,13 @@ def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordp
             wordpress_password=wordpress_password
         )
 
-        # Pass WordPress integration to ContentProcessor
-        content_processor = ContentProcessor(wordpress_integration=wordpress)
+        # Rendering works on uploaded media descriptors and needs no WordPress access
+        content_processor = ContentProcessor()
 
-        llm = LLMIntegration()
-        image_handler = ImageHandler()
+        # Stage timings of this run are collected for the summary at the end
+        run_metrics = RunMetrics.start_run()
+        if profile:
+            profiler = RunProfiler.start_run()
 
         # Get blog data from Google Sheets
         try:
@@ -102,108 +91,96 @@ def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordp
                 logger.warning("No blog data found in Google Sheets")
                 return
         except ValueError as e:
-            logger.error(f"Google Sheets error: {str(e)}")
+            logger.error("Google Sheets error: %s", e)
             raise
         except requests.exceptions.HTTPError as e:
             if "404" in str(e):
-                logger.error(f"Google Sheet not found or not accessible: {spreadsheet_id}")
+                logger.error("Google Sheet not found or not accessible: %s", spreadsheet_id)
                 raise ValueError(f"Google Sheet not found or not accessible. Please check the Sheet ID and make sure it's publicly accessible: {spreadsheet_id}")
             else:
-                logger.error(f"HTTP error accessing Google Sheet: {str(e)}")
+                logger.error("HTTP error accessing Google Sheet: %s", e)
                 raise
 
-        # Process each blog post
+        # Clean the rows and keep the posts that still need to be published
+        pending_posts = []
         for post in blog_data:
-            try:
-                # Clean and format the post data
-                post_data = clean_sheet_data(post)
-                logger.info(f"Processing post: {post_data}")
-
-                # Skip if already published
-                if post_data['status'].lower() == 'published ✅':
-                    logger.info(f"Skipping already published post: {post_data['title']}")
-                    continue
-
-                # Skip if title is empty
-                if not post_data['title']:
-                    logger.warning("Skipping post with empty title")
-                    continue
-
-                # Search and download images
-                logger.info(f"Searching for images for: {post_data['title']}")
-                images = image_handler.search_and_download_images(
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords'],
-                    num_images=int(num_images)
-                )
-
-                if not images:
-                    logger.warning(f"No images found for post: {post_data['title']}")
-                    continue
-
-                # Select featured image
-                featured_image = image_handler.select_featured_image(images)
-                if not featured_image:
-                    logger.warning(f"Could not select featured image for post: {post_data['title']}")
-                    continue
-
-                # Remove featured image from content images
-                content_images = [img for img in images if img != featured_image]
-
-                # Generate content using LLM
-                logger.info(f"Generating content for: {post_data['title']}")
-                logger.info(f"Topic: {post_data['topic']}")
-                logger.info(f"Keywords: {post_data['keywords']}")
-                logger.info(f"Context: {post_data['context']}")
-                logger.info(f"Target article length: {article_length} words")
-
-                markdown_content = llm.generate_content(
-                    title=post_data['title'],
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords'],
-                    context=post_data['context'],
-                    word_count=article_length
-                )
-                logger.info("Generated content using LLM")
-
-                # Convert markdown to HTML
-                html_content = content_processor.convert_markdown_to_html(markdown_content)
-                logger.info("Converted markdown to HTML")
-
-                # Add required elements if specified
-                if post_data['must_have_elements']:
-                    required_elements = [elem.strip() for elem in post_data['must_have_elements'].split(',')]
-                    logger.info(f"Adding required elements: {required_elements}")
-                    html_content = content_processor.add_required_elements(html_content, required_elements)
-
-                # Insert images into content (excluding featured image)
-                logger.info("Inserting images into content")
-                html_content = content_processor.insert_images(html_content, content_images)
-
-                # Insert AdSense
-                html_content = content_processor.insert_adsense(html_content)
-                logger.info("Added AdSense to content")
-
-                # Publish to WordPress with featured image
-                logger.info(f"Publishing post: {post_data['title']}")
-                post_id = wordpress.publish_post(
-                    title=post_data['title'],
-                    content=html_content,
-                    featured_image_path=featured_image
-                )
-
-                # Log success
-                logger.info(f"Successfully published post: {post_data['title']} (ID: {post_id})")
+            post_data = clean_sheet_data(post)
+            logger.debug("Processing post: %s", post_data)
 
-            except Exception as e:
-                logger.error(f"Error processing post {post_data.get('title', 'Unknown')}: {str(e)}")
+            # Skip if already published
+            if post_data['status'].lower() == 'published ✅':
+                logger.info("Skipping already published post: %s", post_data['title'])
                 continue
 
+            # Skip if title is empty
+            if not post_data['title']:
+                logger.warning("Skipping post with empty title")
+                continue
+
+            pending_posts.append(post_data)
+
+        # In worker mode the posts are queued for the worker processes, whose progress is relayed to the web log
+        if WORKER_MODE:
+            # Posts created by an earlier run are found by slug in one lookup, before they are queued
+            pending_posts = wordpress.filter_existing_posts(pending_posts)
+            settings = {
+                'wordpress_url': wordpress_url,
+                'wordpress_username': wordpress_username,
+                'wordpress_password': wordpress_password,
+                'num_images': num_images,
+                'article_length': article_length
+            }
+            run_metrics.run_id = publish_with_workers(pending_posts, settings, logger)
+            return
+
+        # The LLM client and image handler are only needed when this process publishes the posts
+        llm = LLMIntegration()
+        image_handler = ImageHandler()
+
+        # Downloaded images go to a workspace that is removed when the run ends
+        run_metrics.run_id = image_handler.start_run().run_id
+
+        # The asyncio pipeline processes the posts concurrently on one event loop instead of publish_posts(),
+        # and checks for existing posts and preloads the site metadata without blocking
+        if ASYNC_PIPELINE and async_pipeline_available():
+            run_async_pipeline(
+                pending_posts, image_handler,
+                wordpress_url=wordpress_url,
+                wordpress_username=wordpress_username,
+                wordpress_password=wordpress_password,
+                num_images=num_images,
+                article_length=article_length
+            )
+            logger.info("Blog publishing process completed")
+            return
+
+        # Posts created by an earlier run are found by slug in one lookup, before any image or LLM work
+        pending_posts = wordpress.filter_existing_posts(pending_posts)
+
+        # Load site categories, tags or media up front so per-post lookups are served from memory
+        if WORDPRESS_METADATA_PRELOAD:
+            try:
+                wordpress.load_site_metadata(WORDPRESS_METADATA_PRELOAD)
+            except Exception as e:
+                logger.warning("Site metadata not preloaded, it will be fetched on first use: %s", e)
+
+        publish_posts(pending_posts, wordpress, llm, image_handler, content_processor,
+                      num_images=num_images, article_length=article_length)
         logger.info("Blog publishing process completed")
 
     except Exception as e:
-        logger.error(f"Fatal error in blog automation process: {str(e)}")
+        logger.error("Fatal error in blog automation process: %s", e)
         raise
+    finally:
+        # Also after an early return or an error, so neither the browser, the run's workspace
+        # nor tracemalloc outlive the run
+        if image_handler is not None:
+            image_handler.close()
+        if run_metrics is not None:
+            run_metrics.finish()
+        if profiler:
+            profile_dir = profiler.finish(run_metrics.run_id)
+            logger.info("Profile of this run written to %s", profile_dir)
 
 def clean_sheet_data(post):
     """Clean and format data from Google Sheets"""
@@ -240,6 +217,7 @@ def generate():
         wordpress_password = request.form.get('wordpress_password', '').strip()
         num_images = int(request.form.get('num_images', '3'))
         article_length = int(request.form.get('article_length', '1000'))
+        profile = request.form.get('profile') == 'on'
 
         # Validate required fields
         missing_fields = []
@@ -272,17 +250,17 @@ def generate():
         # Start the blog automation process in a separate thread
         thread = threading.Thread(
             target=run_blog_automation,
-            args=(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images, article_length)
+            args=(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images, article_length, profile)
         )
         thread.daemon = True
         thread.start()
 
-        logger.info(f"Started blog automation process with Sheet ID: {spreadsheet_id}, WordPress URL: {wordpress_url}")
+        logger.info("Started blog automation process with Sheet ID: %s, WordPress URL: %s", spreadsheet_id, wordpress_url)
         return jsonify({'status': 'success', 'message': 'Blog automation process started'})
 
     except ValueError as e:
         error_message = str(e)
-        logger.error(f"Validation error: {error_message}")
+        logger.error("Validation error: %s", error_message)
         return jsonify({'status': 'error', 'message': error_message})
     except Exception as e:
         error_message = f"Error starting blog automation: {str(e)}"
@@ -309,6 +287,25 @@ def logs():
     response.headers['X-Accel-Buffering'] = 'no'
     return response
 
+@app.route('/metrics')
+def metrics():
+    """Stage durations, byte and token counts of all runs in the Prometheus text format"""
+    return Response(metrics_registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles')
+def profiles():
+    """Runs with a captured profile and the download URLs of their files"""
+    return jsonify([
+        {'run': run['run'], 'files': [url_for('download_profile', run_id=run['run'], filename=name) for name in run['files']]}
+        for run in list_profiles()
+    ])
+
+@app.route('/profiles/<run_id>/<filename>')
+def download_profile(run_id, filename):
+    if filename not in PROFILE_FILES:
+        abort(404)
+    return send_from_directory(os.path.abspath(PROFILE_DIR), f"{run_id}/{filename}", as_attachment=True)
+
 @app.after_request
 def add_header(response):
     """Add headers to both force latest IE rendering engine or Chrome Frame,